@@ -0,0 +1,361 @@
+"""
+AOT coverage report from ark logs written with `--log-debug=AOT`.
+
+run_es2p.sh runs ark with `--log-file=${intermediate_dir}/${test}_ark.log
+--log-debug=AOT --enable-an:force`. This tool streams such logs line by line
+and classifies methods into those that got their code from the .an file and
+those that stayed in (or fell back to) the interpreter, and collects AOT
+files/classes that failed to load. Results are aggregated per test and per
+class, exported as JSON, and two runs (e.g. two option sets) can be diffed to
+catch unexpected AOT fallbacks.
+"""
+
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+from typing import Dict, Iterable, List, Optional
+
+from log_patterns import apply_overrides
+
+
+# Default message patterns. Every pattern names the method (or file/class) it
+# refers to; use --pattern CATEGORY=REGEX to adapt to other runtime versions.
+DEFAULT_PATTERNS = {
+    # Method linked to compiled code from the .an file
+    'aot': [
+        r'Found AOT entrypoint.*?for method:?\s+(?P<method>\S+)',
+        r'AOT code (?:found|used|loaded) for (?:method:?\s+)?(?P<method>\S+)',
+    ],
+    # Method left to the interpreter although AOT was requested
+    'interpreter': [
+        r'(?:No AOT code|AOT code not found|[Nn]o compiled code) for (?:method:?\s+)?(?P<method>\S+)',
+        r'[Ff]all(?:ing)?\s*back to (?:the )?interpreter.*?(?:method:?\s+)(?P<method>\S+)',
+        r'(?P<method>\S+::\S+) (?:is )?(?:not compiled|will be interpreted)',
+    ],
+    # AOT files or classes that could not be loaded
+    'load_failure': [
+        r'[Ff]ailed to load (?:AO[Tt]|an) file:?\s*(?P<file>.*)',
+        r'(?:Cannot|Can\'t|Failed to) (?:open|find|load) (?:AOT|\.an) (?:file|class):?\s*(?P<file>.*)',
+        r'AOT class not found(?: for class)?:?\s*(?P<file>\S+)',
+    ],
+    # Successfully registered AOT files
+    'file_loaded': [
+        r'(?:Loaded|Load|Loading|Added) AO[Tt] file:?\s+(?P<file>\S+)',
+    ],
+}
+
+# Words at least one of which occurs in every line DEFAULT_PATTERNS can match
+DEFAULT_KEYWORDS = ('AOT', 'aot', 'AoT', 'interpret', 'compiled', '.an', 'an file')
+
+ARK_LOG_SUFFIX = "_ark.log"
+
+
+class AotLogPatterns:
+    """Compiled message patterns, grouped by category"""
+
+    def __init__(self, patterns: Optional[Dict[str, List[str]]] = None):
+        patterns = patterns or DEFAULT_PATTERNS
+        self.patterns = {category: [re.compile(p) for p in regexes] for category, regexes in patterns.items()}
+        # Cheap substring prefilter: lines without any of these words are skipped without regex matching.
+        # The keywords only hold for the default regexes, so user patterns are always matched in full.
+        self.keywords = DEFAULT_KEYWORDS if patterns == DEFAULT_PATTERNS else None
+
+    @classmethod
+    def with_overrides(cls, overrides: List[str]) -> 'AotLogPatterns':
+        """Defaults with CATEGORY=REGEX overrides; the first override of a category replaces its defaults"""
+        required = {category: ('method', 'file') for category in DEFAULT_PATTERNS}
+        return cls(apply_overrides(DEFAULT_PATTERNS, overrides, required))
+
+    def classify(self, line: str):
+        """Return (category, subject) for a matching line, or None"""
+        if self.keywords and not any(word in line for word in self.keywords):
+            return None
+        for category, regexes in self.patterns.items():
+            for regex in regexes:
+                match = regex.search(line)
+                if match:
+                    groups = match.groupdict()
+                    subject = groups.get('method') or groups.get('file') or ""
+                    return category, subject.strip()
+        return None
+
+
+def method_class(method: str) -> str:
+    """Class part of a runtime method name ('std.core.Object::<ctor>' -> 'std.core.Object')"""
+    method = method.split('(')[0]
+    if '::' in method:
+        return method.rsplit('::', 1)[0]
+    if '.' in method:
+        return method.rsplit('.', 1)[0]
+    return ""
+
+
+class AotCoverage:
+    """AOT coverage of one test (one ark log)"""
+
+    def __init__(self, test: str):
+        self.test = test
+        self.aot_methods = set()
+        self.interpreted_methods = set()
+        self.load_failures: List[str] = []
+        self.files_loaded: List[str] = []
+        self.lines = 0
+
+    def add(self, category: str, subject: str):
+        if category == 'aot':
+            self.aot_methods.add(subject)
+            self.interpreted_methods.discard(subject)
+        elif category == 'interpreter':
+            if subject not in self.aot_methods:
+                self.interpreted_methods.add(subject)
+        elif category == 'load_failure':
+            if subject not in self.load_failures:
+                self.load_failures.append(subject)
+        elif category == 'file_loaded':
+            if subject not in self.files_loaded:
+                self.files_loaded.append(subject)
+
+    @property
+    def ratio(self) -> Optional[float]:
+        total = len(self.aot_methods) + len(self.interpreted_methods)
+        return len(self.aot_methods) / total if total else None
+
+    def per_class(self) -> Dict[str, Dict[str, int]]:
+        classes: Dict[str, Dict[str, int]] = {}
+        for method in self.aot_methods:
+            classes.setdefault(method_class(method), {'aot': 0, 'interpreter': 0})['aot'] += 1
+        for method in self.interpreted_methods:
+            classes.setdefault(method_class(method), {'aot': 0, 'interpreter': 0})['interpreter'] += 1
+        return dict(sorted(classes.items()))
+
+    def to_json(self) -> Dict[str, object]:
+        return {
+            'test': self.test,
+            'aot': len(self.aot_methods),
+            'interpreter': len(self.interpreted_methods),
+            'ratio': self.ratio,
+            'load_failures': self.load_failures,
+            'files_loaded': self.files_loaded,
+            'classes': self.per_class(),
+            'aot_methods': sorted(self.aot_methods),
+            'interpreted_methods': sorted(self.interpreted_methods),
+        }
+
+    @classmethod
+    def from_json(cls, data: Dict[str, object]) -> 'AotCoverage':
+        coverage = cls(data['test'])
+        coverage.aot_methods = set(data.get('aot_methods', []))
+        coverage.interpreted_methods = set(data.get('interpreted_methods', []))
+        coverage.load_failures = list(data.get('load_failures', []))
+        coverage.files_loaded = list(data.get('files_loaded', []))
+        return coverage
+
+
+def log_test_name(path: str) -> str:
+    name = os.path.basename(path)
+    if name.endswith(ARK_LOG_SUFFIX):
+        return name[:-len(ARK_LOG_SUFFIX)]
+    return os.path.splitext(name)[0]
+
+
+def scan_log(path: str, patterns: Optional[AotLogPatterns] = None,
+             test: Optional[str] = None) -> AotCoverage:
+    """Stream one ark log and collect its AOT coverage"""
+    patterns = patterns or AotLogPatterns()
+    coverage = AotCoverage(test or log_test_name(path))
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            coverage.lines += 1
+            found = patterns.classify(line)
+            if found and found[1]:
+                coverage.add(*found)
+    return coverage
+
+
+def expand_inputs(paths: Iterable[str]) -> List[str]:
+    """Log files from files and directories (directories contribute their *_ark.log files)"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, f"*{ARK_LOG_SUFFIX}"))))
+        else:
+            files.append(path)
+    return files
+
+
+def collect_coverage(paths: Iterable[str], patterns: Optional[AotLogPatterns] = None) -> Dict[str, AotCoverage]:
+    """
+    Coverage per test from logs, directories of logs or saved JSON reports.
+    Logs of the same test (e.g. flaky iterations) are merged.
+    """
+    result: Dict[str, AotCoverage] = {}
+    for path in expand_inputs(paths):
+        if path.endswith('.json'):
+            with open(path, 'r') as f:
+                for data in json.load(f)['tests']:
+                    result[data['test']] = AotCoverage.from_json(data)
+            continue
+
+        coverage = scan_log(path, patterns)
+        existing = result.get(coverage.test)
+        if existing:
+            for method in coverage.aot_methods:
+                existing.add('aot', method)
+            for method in coverage.interpreted_methods:
+                existing.add('interpreter', method)
+            for failure in coverage.load_failures:
+                existing.add('load_failure', failure)
+            for loaded in coverage.files_loaded:
+                existing.add('file_loaded', loaded)
+        else:
+            result[coverage.test] = coverage
+    return result
+
+
+def coverage_report(coverages: Dict[str, AotCoverage]) -> Dict[str, object]:
+    tests = [coverages[name].to_json() for name in sorted(coverages)]
+    aot = sum(t['aot'] for t in tests)
+    interpreted = sum(t['interpreter'] for t in tests)
+    return {
+        'summary': {
+            'tests': len(tests),
+            'aot': aot,
+            'interpreter': interpreted,
+            'ratio': aot / (aot + interpreted) if aot + interpreted else None,
+            'tests_with_load_failures': [t['test'] for t in tests if t['load_failures']],
+        },
+        'tests': tests,
+    }
+
+
+def diff_coverage(base: Dict[str, AotCoverage], new: Dict[str, AotCoverage]) -> Dict[str, object]:
+    """
+    Compare two runs per test.
+
+    `lost` lists methods that ran AOT code in base but not in new (the silent
+    fallbacks we look for), `gained` the opposite.
+    """
+    tests = []
+    for name in sorted(set(base) | set(new)):
+        old_cov, new_cov = base.get(name), new.get(name)
+        if old_cov is None or new_cov is None:
+            tests.append({'test': name, 'only_in': 'base' if new_cov is None else 'new'})
+            continue
+        lost = sorted(old_cov.aot_methods - new_cov.aot_methods)
+        gained = sorted(new_cov.aot_methods - old_cov.aot_methods)
+        new_failures = [f for f in new_cov.load_failures if f not in old_cov.load_failures]
+        if lost or gained or new_failures:
+            tests.append({
+                'test': name,
+                'base_ratio': old_cov.ratio,
+                'new_ratio': new_cov.ratio,
+                'lost': lost,
+                'gained': gained,
+                'new_load_failures': new_failures,
+            })
+    return {
+        'regressions': sum(1 for t in tests if t.get('lost') or t.get('new_load_failures')),
+        'tests': tests,
+    }
+
+
+def _format_ratio(ratio: Optional[float]) -> str:
+    return "  n/a" if ratio is None else f"{ratio * 100:5.1f}%"
+
+
+def print_report(report: Dict[str, object], show_classes: bool = False):
+    print("=== AOT Coverage ===")
+    for test in report['tests']:
+        print(f"{_format_ratio(test['ratio'])}  aot {test['aot']:6}  interp {test['interpreter']:6}  {test['test']}")
+        for failure in test['load_failures']:
+            print(f"         ! load failure: {failure}")
+        if show_classes:
+            for cls, counts in test['classes'].items():
+                print(f"         {counts['aot']:5} / {counts['aot'] + counts['interpreter']:<5} {cls or '<no class>'}")
+    summary = report['summary']
+    print(f"\nTotal: {summary['tests']} test(s), {summary['aot']} AOT method(s), "
+          f"{summary['interpreter']} interpreted, coverage {_format_ratio(summary['ratio']).strip()}")
+
+
+def print_diff(diff: Dict[str, object], limit: int = 20):
+    print("=== AOT Coverage Diff ===")
+    for test in diff['tests']:
+        if 'only_in' in test:
+            print(f"{test['test']}: only in {test['only_in']}")
+            continue
+        print(f"{test['test']}: {_format_ratio(test['base_ratio']).strip()} -> {_format_ratio(test['new_ratio']).strip()}")
+        for method in test['lost'][:limit]:
+            print(f"   - {method}")
+        if len(test['lost']) > limit:
+            print(f"   ... {len(test['lost']) - limit} more lost")
+        for method in test['gained'][:limit]:
+            print(f"   + {method}")
+        if len(test['gained']) > limit:
+            print(f"   ... {len(test['gained']) - limit} more gained")
+        for failure in test['new_load_failures']:
+            print(f"   ! {failure}")
+    print(f"\nTests with AOT regressions: {diff['regressions']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Report AOT coverage from ark logs written with --log-debug=AOT.',
+        epilog='''Examples:
+  %(prog)s build/es2p/intermediate                   # All *_ark.log files of run_es2p.sh
+  %(prog)s test_ark.log --classes                    # Per-class breakdown of one test
+  %(prog)s intermediate -o coverage.json             # Export as JSON
+  %(prog)s new_run/ --baseline old_run/              # Diff against another option set
+  %(prog)s new.json --baseline old.json              # Diff saved reports
+        ''',
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('inputs', nargs='+', help='ark log files, directories with *_ark.log files, or JSON reports')
+    parser.add_argument('-o', '--output', metavar='FILE', help='Write the report (or diff) as JSON to FILE')
+    parser.add_argument('--baseline', nargs='+', metavar='PATH',
+                        help='Logs, directories or a JSON report of the run to compare against')
+    parser.add_argument('--classes', action='store_true', help='Show the per-class breakdown')
+    parser.add_argument('--pattern', action='append', default=[], metavar='CATEGORY=REGEX',
+                        help='Override the log patterns of a category (aot, interpreter, load_failure, '
+                             'file_loaded); the regex must have a (?P<method>...) or (?P<file>...) group')
+    parser.add_argument('--fail-on-regression', action='store_true',
+                        help='With --baseline, exit with code 1 if any test lost AOT methods')
+    args = parser.parse_args()
+
+    try:
+        patterns = AotLogPatterns.with_overrides(args.pattern)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        coverage = collect_coverage(args.inputs, patterns)
+        baseline = collect_coverage(args.baseline, patterns) if args.baseline else None
+    except OSError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if not coverage:
+        print("Error: no ark logs found", file=sys.stderr)
+        sys.exit(1)
+
+    if baseline is not None:
+        result = diff_coverage(baseline, coverage)
+        print_diff(result)
+    else:
+        result = coverage_report(coverage)
+        print_report(result, show_classes=args.classes)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f"\nJSON written to {args.output}")
+
+    if baseline is not None and args.fail_on_regression and result['regressions']:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
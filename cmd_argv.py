@@ -0,0 +1,514 @@
+"""
+Structured argv model for replayed command lines.
+
+A command line is parsed into leading env assignments, an optional shell
+wrapper (`bash -ce "..."`) and one or more simple commands joined by shell
+separators. Each simple command keeps its executable and an ordered list of
+options and positional arguments, so flags can be set, replaced, removed or
+appended without string surgery, and serialized back to a command line.
+Redirections stay attached to their command, and words that were not edited
+are written back exactly as they appeared in the log.
+"""
+
+import fnmatch
+import os
+import re
+import shlex
+from typing import Iterable, List, Optional, Tuple, Union
+
+
+SHELL_NAMES = {"bash", "sh"}
+SEPARATORS = {";", "&&", "||", "|", "&"}
+ENV_ASSIGNMENT_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*=")
+SAFE_TOKEN_RE = re.compile(r"^[A-Za-z0-9_@%+=:,./\-]+$")
+
+# Options that take their value as the next token ("--paoc-output file.an")
+SEPARATE_VALUE_OPTIONS = {
+    "--paoc-panda-files",
+    "--paoc-output",
+    "--aot-files",
+    "--aot-file",
+    "--panda-files",
+    "--boot-panda-files",
+    "--compiler-cross-arch",
+    "--log-file",
+}
+
+
+# A redirection operator at the start of a word: [N]>, [N]>>, [N]<, [N]>&M, &>, ...
+# Duplications (N>&M, N<&-) include their target; other operators take the next word
+REDIRECT_RE = re.compile(r'(?:\d+|&)?(?:>>|>\||<>|>&|<&|>|<)(?:(?<=&)(?:\d+-?|-)(?![^\s;&|<>]))?')
+OPERATOR_RE = re.compile(r'&&|\|\||;;|\|&|[;&|]')
+
+
+class Token(str):
+    """A shell word: its value, with the text it was written as in `raw` and the whitespace before it"""
+
+    def __new__(cls, value: str, raw: Optional[str] = None, redirect: bool = False, space: str = " "):
+        token = super().__new__(cls, value)
+        token.raw = value if raw is None else raw
+        token.redirect = redirect
+        token.space = space
+        return token
+
+
+def _raw(token: str) -> str:
+    return token.raw if isinstance(token, Token) else token
+
+
+def tokenize(command_line: str) -> List[Token]:
+    """
+    Tokenize like a POSIX shell, keeping separators and redirection operators
+    as their own tokens. Every token remembers its original text, so unchanged
+    parts of a command line are written back exactly as they were.
+    """
+    tokens: List[Token] = []
+    i, n = 0, len(command_line)
+    space_start = 0
+    while i < n:
+        if command_line[i].isspace():
+            i += 1
+            continue
+        space = command_line[space_start:i]
+        match = REDIRECT_RE.match(command_line, i) or OPERATOR_RE.match(command_line, i)
+        if match:
+            text = match.group()
+            tokens.append(Token(text, text, redirect=match.re is REDIRECT_RE, space=space))
+            i = space_start = match.end()
+            continue
+
+        start, value = i, []
+        while i < n:
+            ch = command_line[i]
+            if ch.isspace() or ch in ';&|<>':
+                break
+            if ch == "'":
+                end = command_line.find("'", i + 1)
+                if end < 0:
+                    raise ValueError("No closing quotation")
+                value.append(command_line[i + 1:end])
+                i = end + 1
+            elif ch == '"':
+                i += 1
+                while i < n and command_line[i] != '"':
+                    if command_line[i] == '\\' and i + 1 < n and command_line[i + 1] in '"\\$`\n':
+                        i += 1
+                    value.append(command_line[i])
+                    i += 1
+                if i >= n:
+                    raise ValueError("No closing quotation")
+                i += 1
+            elif ch == '\\':
+                if i + 1 < n and command_line[i + 1] != '\n':
+                    value.append(command_line[i + 1])
+                i += 2
+            else:
+                value.append(ch)
+                i += 1
+        tokens.append(Token("".join(value), command_line[start:i], space=space))
+        space_start = i
+    return tokens
+
+
+def quote(token: str) -> str:
+    """
+    Quote a token for the shell.
+
+    Tokens with `$` expansions keep them live by using double quotes, as the
+    replayed command lines rely on e.g. `echo "Exit code: $?"`.
+    """
+    if token and SAFE_TOKEN_RE.match(token):
+        return token
+    if '$' in token and not any(ch in token for ch in '"\\`'):
+        return f'"{token}"'
+    return shlex.quote(token)
+
+
+def _word(token: str) -> str:
+    """A parsed token as originally written, anything else quoted"""
+    return token.raw if isinstance(token, Token) else quote(token)
+
+
+def _quote_assignment(assignment: str) -> str:
+    if isinstance(assignment, Token):
+        return assignment.raw
+    name, value = assignment.split('=', 1)
+    return f"{name}={quote(value) if value else ''}"
+
+
+class ArgItem:
+    """An option (`--name=value`, `--name value`, `-x`), a positional argument or a redirection"""
+
+    def __init__(self, text: str, name: Optional[str] = None, value: Optional[str] = None,
+                 separate: bool = False, raw: Optional[List[str]] = None, redirect: bool = False):
+        self.text = text        # positional token, redirection operator, or the option name as written
+        self.name = name        # option name, None for positionals
+        self.value = value      # option value, or the target of a redirection
+        self.separate = separate
+        self.raw = raw          # original words, None once the item is changed
+        self.redirect = redirect
+
+    @property
+    def is_option(self) -> bool:
+        return self.name is not None
+
+    def tokens(self) -> List[str]:
+        if self.redirect:
+            return [self.text] + ([self.value] if self.value is not None else [])
+        if not self.is_option:
+            return [self.text]
+        if self.value is None:
+            return [self.name]
+        if self.separate:
+            return [self.name, self.value]
+        return [f"{self.name}={self.value}"]
+
+    def words(self) -> List[str]:
+        """Shell words of the item: the original text while unchanged"""
+        if self.raw is not None:
+            return list(self.raw)
+        return [quote(token) for token in self.tokens()]
+
+    def __repr__(self) -> str:
+        return f"ArgItem({' '.join(self.tokens())!r})"
+
+
+def _option_name(name: str) -> str:
+    # Accept "gc-type" as shorthand for "--gc-type"
+    return name if name.startswith('-') else f"--{name}"
+
+
+class CommandArgv:
+    """A simple command: env assignments, executable, ordered options and positionals"""
+
+    def __init__(self, executable: str, items: Optional[List[ArgItem]] = None,
+                 env: Optional[List[str]] = None, trailing: Optional[List[str]] = None,
+                 separate_value_options: Iterable[str] = SEPARATE_VALUE_OPTIONS):
+        self.executable = executable
+        self.items = items or []
+        self.env = env or []
+        # Arguments after `--`, passed through untouched
+        self.trailing = trailing
+        self.separate_value_options = set(separate_value_options)
+        self.modified = False
+
+    @classmethod
+    def from_tokens(cls, tokens: List[str],
+                    separate_value_options: Iterable[str] = SEPARATE_VALUE_OPTIONS) -> 'CommandArgv':
+        tokens = list(tokens)
+        env = []
+        while tokens and ENV_ASSIGNMENT_RE.match(_raw(tokens[0])):
+            env.append(tokens.pop(0))
+        if not tokens:
+            raise ValueError("command has no executable")
+
+        separate = set(separate_value_options)
+        executable = tokens.pop(0)
+        items: List[ArgItem] = []
+        trailing = None
+        i = 0
+        while i < len(tokens):
+            token = tokens[i]
+            raw = [_raw(token)]
+            if getattr(token, 'redirect', False):
+                # Duplications like 2>&1 carry their target; other operators take the next word
+                target = None
+                if not token[-1].isdigit() and not token.endswith('-') and i + 1 < len(tokens):
+                    target = tokens[i + 1]
+                    raw = [raw[0] + getattr(target, 'space', " ") + _raw(target)]
+                    i += 1
+                items.append(ArgItem(token, value=target, raw=raw, redirect=True))
+            elif token == '--':
+                trailing = tokens[i + 1:]
+                break
+            elif token.startswith('-') and len(token) > 1:
+                name, eq, value = token.partition('=')
+                if eq:
+                    items.append(ArgItem(name, name, value, raw=raw))
+                elif name in separate and i + 1 < len(tokens) and tokens[i + 1] != '--':
+                    items.append(ArgItem(name, name, tokens[i + 1], separate=True, raw=raw + [_raw(tokens[i + 1])]))
+                    i += 1
+                else:
+                    items.append(ArgItem(name, name, raw=raw))
+            else:
+                items.append(ArgItem(token, raw=raw))
+            i += 1
+        return cls(executable, items, env, trailing, separate)
+
+    @property
+    def name(self) -> str:
+        return os.path.basename(self.executable)
+
+    @property
+    def options(self) -> List[ArgItem]:
+        return [item for item in self.items if item.is_option]
+
+    @property
+    def positionals(self) -> List[str]:
+        return [item.text for item in self.items if not item.is_option and not item.redirect]
+
+    def find(self, name: str) -> List[ArgItem]:
+        name = _option_name(name)
+        return [item for item in self.items if item.name == name]
+
+    def get_option(self, name: str) -> Optional[str]:
+        """Value of the last occurrence of the option ('' for a bare flag), or None if absent"""
+        found = self.find(name)
+        if not found:
+            return None
+        return found[-1].value if found[-1].value is not None else ""
+
+    def has_option(self, name: str) -> bool:
+        return bool(self.find(name))
+
+    def set_option(self, name: str, value: Optional[str] = None,
+                   separate: Optional[bool] = None) -> 'CommandArgv':
+        """
+        Set an option, replacing it in place if present (duplicates are dropped),
+        otherwise inserting it right after the executable. `separate` writes the
+        value as the next argument; by default a replaced option keeps its form.
+        """
+        name = _option_name(name)
+        found = self.find(name)
+        if found:
+            first = found[0]
+            first.value = value
+            first.raw = None
+            if value is None:
+                first.separate = False
+            elif separate is not None:
+                first.separate = separate
+            self.items = [item for item in self.items if item is first or item.name != name]
+        else:
+            self.items.insert(0, ArgItem(name, name, value, separate=bool(separate) and value is not None))
+        self.modified = True
+        return self
+
+    def remove_option(self, name: str) -> int:
+        """Remove all occurrences of the option (with their values); returns how many were removed"""
+        name = _option_name(name)
+        before = len(self.items)
+        self.items = [item for item in self.items if item.name != name]
+        removed = before - len(self.items)
+        if removed:
+            self.modified = True
+        return removed
+
+    def append(self, *tokens: str) -> 'CommandArgv':
+        """Append arguments at the end (before redirections, `--` and its trailing arguments)"""
+        position = next((i for i, item in enumerate(self.items) if item.redirect), len(self.items))
+        for token in tokens:
+            if token.startswith('-') and len(token) > 1:
+                name, eq, value = token.partition('=')
+                item = ArgItem(name, name, value if eq else None)
+            else:
+                item = ArgItem(token)
+            self.items.insert(position, item)
+            position += 1
+            self.modified = True
+        return self
+
+    def apply_args(self, args: List[str]) -> 'CommandArgv':
+        """
+        Apply user-provided arguments: options override existing ones in place,
+        `^--name` removes an option, everything else is inserted after the
+        executable in the given order. Options that take a separate value
+        (`--aot-files b.an`) consume the next argument, as when parsing.
+        """
+        inserted = []
+        i = 0
+        while i < len(args):
+            token = args[i]
+            if token.startswith('^-'):
+                self.remove_option(token[1:])
+            elif token.startswith('-') and len(token) > 1 and token != '--':
+                name, eq, value = token.partition('=')
+                separate = (not eq and name in self.separate_value_options
+                            and i + 1 < len(args) and args[i + 1] != '--')
+                if separate:
+                    value = args[i + 1]
+                    i += 1
+                elif not eq:
+                    value = None
+                if self.has_option(name):
+                    self.set_option(name, value, separate or None)
+                else:
+                    inserted.append(ArgItem(name, name, value, separate=separate))
+            else:
+                inserted.append(ArgItem(token))
+            i += 1
+        self.items[0:0] = inserted
+        if inserted:
+            self.modified = True
+        return self
+
+    def to_tokens(self) -> List[str]:
+        tokens = list(self.env) + [self.executable]
+        for item in self.items:
+            tokens.extend(item.tokens())
+        if self.trailing is not None:
+            tokens.append('--')
+            tokens.extend(self.trailing)
+        return tokens
+
+    def to_string(self) -> str:
+        words = [_quote_assignment(a) for a in self.env] + [_word(self.executable)]
+        for item in self.items:
+            words.extend(item.words())
+        if self.trailing is not None:
+            words.append('--')
+            words.extend(_word(t) for t in self.trailing)
+        return " ".join(words)
+
+    def __str__(self) -> str:
+        return self.to_string()
+
+    def __repr__(self) -> str:
+        return f"CommandArgv({self.to_string()!r})"
+
+
+class CommandLine:
+    """
+    A full replayed command line: simple commands joined by separators.
+
+    Elements that run through a shell wrapper (`bash -ce "cmd1; cmd2"`) are
+    nested CommandLines with `wrapper` and their own env assignments set.
+    """
+
+    def __init__(self, commands: List[Union[CommandArgv, 'CommandLine']], separators: List[str],
+                 env: Optional[List[str]] = None, wrapper: Optional[List[str]] = None,
+                 script: Optional[str] = None):
+        self.commands = commands
+        self.separators = separators
+        self.env = env or []
+        self.wrapper = wrapper
+        # The wrapper's script argument as parsed, written back verbatim while nothing in it changes
+        self.script = script
+
+    @classmethod
+    def parse(cls, command_line: str,
+              separate_value_options: Iterable[str] = SEPARATE_VALUE_OPTIONS) -> 'CommandLine':
+        return cls._from_tokens(tokenize(command_line), set(separate_value_options))
+
+    @classmethod
+    def _from_tokens(cls, tokens: List[str], separate_value_options) -> 'CommandLine':
+        groups, separators, current = [], [], []
+        for token in tokens:
+            if _raw(token) in SEPARATORS:
+                if current:
+                    groups.append(current)
+                    separators.append(token)
+                    current = []
+            else:
+                current.append(token)
+        if current:
+            groups.append(current)
+        separators = separators[:max(0, len(groups) - 1)]
+        if not groups:
+            raise ValueError("empty command line")
+
+        commands: List[Union[CommandArgv, CommandLine]] = []
+        for index, group in enumerate(groups):
+            env = []
+            while group and ENV_ASSIGNMENT_RE.match(_raw(group[0])):
+                env.append(group.pop(0))
+            if not group or os.path.basename(group[0]) not in SHELL_NAMES:
+                commands.append(CommandArgv.from_tokens(env + group, separate_value_options))
+                continue
+
+            wrapper = [group.pop(0)]
+            while group and group[0].startswith('-'):
+                wrapper.append(group.pop(0))
+            if len(group) == 1:
+                # bash -c "cmd1; cmd2": the script is a single quoted token
+                script_tokens = tokenize(group[0])
+            else:
+                # Quotes were lost in the log ("bash -ce cmd1 args; cmd2"): as in the JTR
+                # parser, the rest of the line is the script
+                script_tokens = list(group)
+                for separator, rest in zip(separators[index:], groups[index + 1:]):
+                    script_tokens += [separator] + rest
+                separators = separators[:index]
+            if not script_tokens:
+                commands.append(CommandArgv.from_tokens(env + wrapper, separate_value_options))
+                continue
+            nested = cls._from_tokens(script_tokens, separate_value_options)
+            nested.env, nested.wrapper = env, wrapper
+            nested.script = group[0] if len(group) == 1 else None
+            commands.append(nested)
+            if len(group) > 1:
+                break
+        return cls(commands, separators)
+
+    def simple_commands(self) -> List[CommandArgv]:
+        """All simple commands, including those inside shell wrappers, in order"""
+        result = []
+        for cmd in self.commands:
+            if isinstance(cmd, CommandLine):
+                result.extend(cmd.simple_commands())
+            else:
+                result.append(cmd)
+        return result
+
+    def find(self, pattern: str = '*') -> List[CommandArgv]:
+        """Simple commands whose executable name matches the fnmatch pattern"""
+        return [cmd for cmd in self.simple_commands() if fnmatch.fnmatch(cmd.name, pattern)]
+
+    def primary(self) -> CommandArgv:
+        """The first real command (skipping `echo`), as reported by Command.get_command_name"""
+        simple = self.simple_commands()
+        for cmd in simple:
+            if cmd.name.lower() != 'echo':
+                return cmd
+        return simple[0]
+
+    @property
+    def modified(self) -> bool:
+        return any(cmd.modified for cmd in self.commands)
+
+    def _script(self) -> str:
+        parts = []
+        for i, cmd in enumerate(self.commands):
+            parts.append(cmd.to_string())
+            if i < len(self.separators):
+                separator = self.separators[i]
+                parts[-1] += separator if separator == ';' else f" {separator}"
+        return " ".join(parts)
+
+    def to_string(self) -> str:
+        if not self.wrapper:
+            return self._script()
+        env = [_quote_assignment(a) for a in self.env]
+        if self.script is not None and not self.modified:
+            script = _word(self.script)
+        else:
+            script = shlex.quote(self._script())
+        return " ".join(env + [_word(t) for t in self.wrapper] + [script])
+
+    def __str__(self) -> str:
+        return self.to_string()
+
+
+def parse_flag_edit(spec: str) -> Tuple[str, str]:
+    """Split "PATTERN:FLAG" (e.g. "ark*:--gc-type=gen-gc") into its parts; PATTERN defaults to '*'"""
+    pattern, sep, flag = spec.partition(':')
+    if not sep or not flag.startswith('-'):
+        if spec.startswith('-'):
+            return '*', spec
+        raise ValueError(f"invalid flag edit '{spec}', expected [PATTERN:]--flag[=value]")
+    return pattern or '*', flag
+
+
+def edit_command_line(command_line: str, pattern: str = '*',
+                      set_flags: Iterable[str] = (), remove_flags: Iterable[str] = (),
+                      append_args: Iterable[str] = ()) -> str:
+    """Apply flag edits to every simple command matching pattern and return the new command line"""
+    parsed = CommandLine.parse(command_line)
+    for cmd in parsed.find(pattern):
+        for flag in remove_flags:
+            cmd.remove_option(flag.partition('=')[0])
+        for flag in set_flags:
+            name, eq, value = flag.partition('=')
+            cmd.set_option(name, value if eq else None)
+        cmd.append(*append_args)
+    return parsed.to_string()
@@ -0,0 +1,439 @@
+"""
+Batched, incremental test execution on a device through hdc.
+
+Tests are compiled on the host (es2panda + ark_aot, as in run_es2p.sh) while the
+previous test runs on the device. Artifacts are pushed only when their SHA-256
+differs from the copy already on the device. The device mutex is retried with
+exponential backoff instead of giving up on the first busy check, and the
+`time -v` output of every device run is turned into the same timing report
+that host runs get from parse_jtr (time, CPUs, peak RSS, CPU usage).
+
+hdc, the device home and the mutex path are taken from HDC_SERVER_IP_PORT,
+HDC_DEVICE_SERIAL and DEV_HOME like in run_es2p.sh, so `hdc` can be replaced
+by a local fake script for testing.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import queue
+import re
+import shlex
+import signal
+import subprocess
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from jtr_commands import Command, format_run_info, parse_cpu_list
+
+
+MUTEX = "/data/local/tmp/mutex"
+EXIT_MARKER_RE = re.compile(r'^Exit: (-?\d+)\s*$', re.MULTILINE)
+
+# `time -v` keys of GNU time and of toybox (OHOS) time
+TIME_V_KEYS = {
+    'Elapsed (wall clock) time (h:mm:ss or m:ss)': 'wall_s',
+    'Real time (s)': 'wall_s',
+    'User time (seconds)': 'user_s',
+    'User time (s)': 'user_s',
+    'System time (seconds)': 'sys_s',
+    'System time (s)': 'sys_s',
+    'Percent of CPU this job got': 'cpu_percent',
+    'Maximum resident set size (kbytes)': 'max_rss_kb',
+    'Max RSS (KiB)': 'max_rss_kb',
+    'Major (requiring I/O) page faults': 'major_faults',
+    'Major faults': 'major_faults',
+    'Minor (reclaiming a frame) page faults': 'minor_faults',
+    'Minor faults': 'minor_faults',
+    'Voluntary context switches': 'voluntary_switches',
+    'Involuntary context switches': 'involuntary_switches',
+    'Exit status': 'exit_status',
+}
+
+
+def _parse_duration(value: str) -> float:
+    """Seconds from "1.23" or the h:mm:ss / m:ss.ss form of GNU time"""
+    seconds = 0.0
+    for part in value.split(':'):
+        seconds = seconds * 60 + float(part)
+    return seconds
+
+
+def parse_time_v(text: str) -> Dict[str, float]:
+    """Resource usage reported by `time -v`; unknown lines are ignored"""
+    timing: Dict[str, float] = {}
+    for line in text.splitlines():
+        key, sep, value = line.strip().rpartition(': ')
+        name = TIME_V_KEYS.get(key) if sep else None
+        if name is None:
+            continue
+        value = value.strip().rstrip('%')
+        try:
+            timing[name] = _parse_duration(value) if name == 'wall_s' else float(value)
+        except ValueError:
+            continue
+    if 'cpu_percent' not in timing and timing.get('wall_s'):
+        timing['cpu_percent'] = (timing.get('user_s', 0.0) + timing.get('sys_s', 0.0)) / timing['wall_s'] * 100
+    return timing
+
+
+def device_run_info(timing: Dict[str, float], cpus: List[int]) -> Dict[str, object]:
+    """Run info in the shape of Command.get_last_run_info, so format_run_info prints device runs like host runs"""
+    info: Dict[str, object] = {'cpus': cpus, 'nice': 0, 'duration': timing.get('wall_s', 0.0), 'device': timing}
+    if 'max_rss_kb' in timing:
+        info['monitor'] = {
+            'samples': 0,
+            'peak_rss_kb': int(timing['max_rss_kb']),
+            'peak_swap_kb': 0,
+            'peak_cpu_percent': round(timing.get('cpu_percent', 0.0), 1),
+            'peak_processes': 1,
+            'host_swap_out_pages': 0,
+            'spikes': [],
+            'swapping': False,
+            'csv': None,
+        }
+    return info
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Hdc:
+    """Thin wrapper over the hdc command line"""
+
+    def __init__(self, binary: str = "hdc", server: Optional[str] = None, serial: Optional[str] = None,
+                 timeout: int = 300):
+        self.binary = binary
+        self.server = server
+        self.serial = serial
+        self.timeout = timeout
+
+    def args(self, *rest: str) -> List[str]:
+        args = [self.binary]
+        if self.server:
+            args += ['-s', self.server]
+        if self.serial:
+            args += ['-t', self.serial]
+        return args + list(rest)
+
+    def _call(self, *rest: str) -> Tuple[int, str]:
+        try:
+            result = subprocess.run(self.args(*rest), capture_output=True, text=True, timeout=self.timeout)
+        except subprocess.TimeoutExpired:
+            return -1, f"hdc timed out after {self.timeout} seconds"
+        return result.returncode, result.stdout + result.stderr
+
+    def shell(self, line: str) -> str:
+        """Run a shell line on the device; hdc does not forward exit codes, so only output is returned"""
+        return self._call('shell', line)[1]
+
+    def send(self, local: str, remote: str):
+        code, output = self._call('file', 'send', local, remote)
+        if code != 0 or 'fail' in output.lower():
+            raise RuntimeError(f"hdc file send {local} failed: {output.strip()}")
+
+
+class DeviceLock:
+    """The mutex file run_es2p.sh uses to share a device between users"""
+
+    def __init__(self, hdc: Hdc, path: str = MUTEX, owner: Optional[str] = None):
+        self.hdc = hdc
+        self.path = path
+        self.owner = owner or os.environ.get('USER', 'unknown')
+        self.held = False
+
+    def try_acquire(self) -> Optional[str]:
+        """Take the lock; returns None on success or the current holder"""
+        # noclobber makes the shell create the file with O_EXCL: of two hosts racing
+        # for the device exactly one redirection succeeds, the other reads the holder
+        path = shlex.quote(self.path)
+        output = self.hdc.shell(f"if (set -C; echo {shlex.quote(self.owner)} > {path}) 2>/dev/null; "
+                                f"then echo LOCKED; else cat {path}; fi")
+        if output.strip().endswith("LOCKED"):
+            self.held = True
+            return None
+        return output.strip() or "unknown"
+
+    def acquire(self, attempts: int = 10, backoff: float = 5.0, max_backoff: float = 120.0,
+                sleep: Callable[[float], None] = time.sleep, log: Callable[[str], None] = print):
+        """Retry with exponential backoff; raises RuntimeError if the device stays busy"""
+        delay = backoff
+        for attempt in range(1, attempts + 1):
+            holder = self.try_acquire()
+            if holder is None:
+                log("Device is free - locked")
+                return
+            if attempt == attempts:
+                break
+            log(f"Device is busy by {holder}, retry {attempt}/{attempts - 1} in {delay:.0f}s")
+            sleep(delay)
+            delay = min(delay * 2, max_backoff)
+        raise RuntimeError(f"device is still locked by {holder} after {attempts} attempts")
+
+    def release(self):
+        if self.held:
+            self.hdc.shell(f"rm -f {shlex.quote(self.path)}")
+            self.held = False
+
+
+class DeviceResult:
+    """Outcome of one test: compilation, artifact sync and the device run"""
+
+    def __init__(self, test: str):
+        self.test = test
+        self.compile_code: Optional[int] = None
+        self.compile_error = ""
+        self.pushed: List[str] = []
+        self.unchanged: List[str] = []
+        self.exit_code: Optional[int] = None
+        self.output = ""
+        self.run_info: Dict[str, object] = {}
+
+    def status(self) -> str:
+        if self.compile_code not in (None, 0):
+            return f"COMPILE FAIL({self.compile_code})"
+        if self.exit_code is None:
+            return "SKIP"
+        return "PASS" if self.exit_code == 0 else f"FAIL({self.exit_code})"
+
+    def as_dict(self) -> Dict[str, object]:
+        return {
+            'test': self.test,
+            'status': self.status(),
+            'exit_code': self.exit_code,
+            'pushed': self.pushed,
+            'unchanged': self.unchanged,
+            'timing': self.run_info.get('device', {}),
+        }
+
+
+class DeviceExecutor:
+    """Compiles tests on the host and runs them on one device, pipelined"""
+
+    def __init__(self, hdc: Hdc, build_dir: str, intermediate_dir: str, dev_home: str,
+                 gen_dir: Optional[str] = None, mutex: str = MUTEX, taskset_mask: str = "3F0",
+                 timeout: int = 300, prefetch: int = 2):
+        self.hdc = hdc
+        self.build_dir = build_dir
+        self.intermediate_dir = intermediate_dir
+        self.dev_home = dev_home
+        self.gen_dir = gen_dir or os.path.join(build_dir, "es2p", "gen")
+        self.lock = DeviceLock(hdc, mutex)
+        self.taskset_mask = taskset_mask
+        self.timeout = timeout
+        self.prefetch = prefetch
+        # Device-side helpers; overridable for devices without them (and for tests)
+        self.pre_command = "hilog -r"
+        self.time_command = "\\time -v"
+        self.taskset = "/system/bin/taskset"
+        self._remote_hashes: Dict[str, str] = {}
+
+    def compile_commands(self, test: str) -> List[Command]:
+        """es2panda and ark_aot invocations for a test, as in the --device branch of run_es2p.sh"""
+        b, out = self.build_dir, os.path.join(self.intermediate_dir, test)
+        es2panda = [f"{b}/bin/es2panda", f"--arktsconfig={b}/tools/es2panda/generated/arktsconfig.json",
+                    "--gen-stdlib=false", "--extension=ets", "--opt-level=2", f"--output={out}.ets.abc",
+                    os.path.join(self.gen_dir, f"{test}.ets")]
+        ark_aot = [f"{b}/bin/ark_aot", "--gc-type=g1-gc",
+                   "--heap-verifier=fail_on_verification:pre:into:before_g1_concurrent:post",
+                   "--full-gc-bombing-frequency=0", "--compiler-check-final=true",
+                   "--compiler-ignore-failures=false", f"--boot-panda-files={b}/plugins/ets/etsstdlib.abc",
+                   "--load-runtimes=ets", "--paoc-panda-files", f"{out}.ets.abc", "--paoc-output", f"{out}.ets.an"]
+        return [Command("es2panda", shlex.join(args), {}, None, test_id=test) for args in (es2panda, ark_aot)]
+
+    def artifacts(self, test: str) -> List[Tuple[str, str]]:
+        local = os.path.join(self.intermediate_dir, f"{test}.ets")
+        remote = f"{self.dev_home}/{test}.ets"
+        return [(local + ".abc", remote + ".abc"), (local + ".an", remote + ".an")]
+
+    def device_line(self, test: str) -> str:
+        """Shell line run on the device; the exit code is echoed because hdc shell drops it"""
+        home, name = self.dev_home, f"{test}.ets"
+        ark = ["--enable-an:force", "--gc-type=g1-gc",
+               "--heap-verifier=fail_on_verification:pre:into:before_g1_concurrent:post",
+               "--full-gc-bombing-frequency=0", f"--boot-panda-files={home}/etsstdlib.abc", "--load-runtimes=ets",
+               "--verification-mode=ahead-of-time", f"--aot-files={home}/{name}.an", "--compiler-enable-jit=false",
+               f"--panda-files={home}/{name}.abc", f"{home}/{name}.abc", f"{test}.ETSGLOBAL::main"]
+        run = [self.time_command]
+        if self.taskset:
+            run.append(f"{self.taskset} -a {self.taskset_mask}")
+        run.append(f"env LD_LIBRARY_PATH={home}/lib {home}/ark {' '.join(ark)}")
+        line = " ".join(run) + "; echo Exit: $?"
+        return f"({self.pre_command}) && {line}" if self.pre_command else line
+
+    def remote_hashes(self, paths: List[str]) -> Dict[str, str]:
+        """SHA-256 of device files (missing files are left out), queried in one shell call"""
+        unknown = [p for p in paths if p not in self._remote_hashes]
+        if unknown:
+            output = self.hdc.shell(f"sha256sum {' '.join(shlex.quote(p) for p in unknown)} 2>/dev/null")
+            for line in output.splitlines():
+                digest, _, path = line.strip().partition('  ')
+                if path in unknown and re.fullmatch(r'[0-9a-f]{64}', digest):
+                    self._remote_hashes[path] = digest
+        return {p: self._remote_hashes[p] for p in paths if p in self._remote_hashes}
+
+    def sync(self, files: List[Tuple[str, str]], result: Optional[DeviceResult] = None):
+        """Push the (local, remote) pairs whose contents differ from the device copy"""
+        remote = self.remote_hashes([r for _, r in files])
+        for local, remote_path in files:
+            digest = file_sha256(local)
+            if remote.get(remote_path) == digest:
+                if result:
+                    result.unchanged.append(os.path.basename(local))
+                continue
+            self.hdc.send(local, remote_path)
+            self._remote_hashes[remote_path] = digest
+            if result:
+                result.pushed.append(os.path.basename(local))
+
+    def _compile(self, result: DeviceResult):
+        for cmd in self.compile_commands(result.test):
+            code, stdout, stderr = cmd.execute(timeout=self.timeout, capture_output=True)
+            result.compile_code = code
+            if code != 0:
+                result.compile_error = (stdout + stderr).strip()
+                return
+
+    def _run_on_device(self, result: DeviceResult):
+        self.sync(self.artifacts(result.test), result)
+        cmd = Command("device", shlex.join(self.hdc.args('shell', self.device_line(result.test))), {}, None,
+                      test_id=result.test)
+        code, stdout, stderr = cmd.execute(timeout=self.timeout, capture_output=True)
+        result.output = stdout + stderr
+        marker = EXIT_MARKER_RE.findall(result.output)
+        result.exit_code = int(marker[-1]) if marker else (code if code != 0 else -1)
+        timing = parse_time_v(result.output)
+        timing['host_duration'] = cmd.get_last_run_info().get('duration', 0.0)
+        result.run_info = device_run_info(timing, parse_cpu_list("0x" + self.taskset_mask))
+
+    def run(self, tests: List[str], on_complete: Optional[Callable[[DeviceResult, int, int], None]] = None,
+            lock_attempts: int = 10, lock_backoff: float = 5.0,
+            log: Callable[[str], None] = print) -> List[DeviceResult]:
+        """
+        Compile and run all tests; on_complete(result, done, total) is called per test.
+
+        Compilation runs `prefetch` tests ahead in a background thread, so the host
+        works on the next test while the device runs the current one.
+        """
+        results = [DeviceResult(test) for test in tests]
+        ready: 'queue.Queue[Optional[DeviceResult]]' = queue.Queue(maxsize=self.prefetch)
+        stop = threading.Event()
+
+        def _compile_ahead():
+            for result in results:
+                if stop.is_set():
+                    break
+                self._compile(result)
+                ready.put(result)
+            ready.put(None)
+
+        compiler = threading.Thread(target=_compile_ahead, daemon=True)
+        compiler.start()
+        try:
+            self.lock.acquire(attempts=lock_attempts, backoff=lock_backoff, log=log)
+            stdlib = os.path.join(self.build_dir, "plugins", "ets", "etsstdlib.abc")
+            if os.path.exists(stdlib):
+                self.sync([(stdlib, f"{self.dev_home}/etsstdlib.abc")])
+
+            done = 0
+            while True:
+                result = ready.get()
+                if result is None:
+                    break
+                if result.compile_code == 0:
+                    self._run_on_device(result)
+                done += 1
+                if on_complete:
+                    on_complete(result, done, len(results))
+        finally:
+            stop.set()
+            # Unblock the compile thread if it waits on a full queue
+            while compiler.is_alive():
+                try:
+                    ready.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            self.lock.release()
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Compile tests on the host and run them on a device via hdc, '
+                    'pushing only changed artifacts.',
+        epilog='''Examples:
+  %(prog)s -B $BUILD_DIR -I $BUILD_DIR/es2p/intermediate Array_1 Array_2 Map_3
+  %(prog)s -B out -I out/es2p/intermediate --lock-attempts 30 --json device.json Array_1
+  %(prog)s --hdc ./fake_hdc.py -B out -I out/es2p/intermediate --dev-home /tmp/dev Array_1
+        ''',
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('tests', nargs='+', help='Test names (files in <build-dir>/es2p/gen without .ets)')
+    parser.add_argument('-B', '--build-dir', required=True, help='Build directory with bin/ and plugins/')
+    parser.add_argument('-I', '--intermediate-dir', required=True, help='Directory for .abc/.an artifacts')
+    parser.add_argument('--gen-dir', help='Directory of generated .ets files (default: <build-dir>/es2p/gen)')
+    parser.add_argument('--dev-home', default=os.environ.get('DEV_HOME'),
+                        help='Device directory with ark and lib/ (default: $DEV_HOME)')
+    parser.add_argument('--hdc', default='hdc', help='hdc binary (default: hdc)')
+    parser.add_argument('--server', default=os.environ.get('HDC_SERVER_IP_PORT'),
+                        help='hdc server (default: $HDC_SERVER_IP_PORT)')
+    parser.add_argument('--serial', default=os.environ.get('HDC_DEVICE_SERIAL'),
+                        help='Device serial (default: $HDC_DEVICE_SERIAL)')
+    parser.add_argument('--mutex', default=MUTEX, help=f'Device lock file (default: {MUTEX})')
+    parser.add_argument('--taskset', default='3F0', metavar='MASK', help='Device CPU mask (default: 3F0)')
+    parser.add_argument('--lock-attempts', type=int, default=10, help='Tries to lock a busy device (default: 10)')
+    parser.add_argument('--lock-backoff', type=float, default=5.0,
+                        help='First retry delay in seconds, doubled per retry (default: 5)')
+    parser.add_argument('--timeout', type=int, default=300, help='Timeout per command in seconds (default: 300)')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Print device output of every test')
+    parser.add_argument('--json', metavar='FILE', help='Write results as JSON')
+    args = parser.parse_args()
+
+    if not args.dev_home:
+        print("Error: --dev-home or DEV_HOME is required", file=sys.stderr)
+        sys.exit(1)
+
+    os.makedirs(args.intermediate_dir, exist_ok=True)
+    executor = DeviceExecutor(Hdc(args.hdc, args.server, args.serial, args.timeout), args.build_dir,
+                              args.intermediate_dir, args.dev_home, args.gen_dir, args.mutex,
+                              args.taskset, args.timeout)
+
+    def _report(result: DeviceResult, done: int, total: int):
+        line = f"[{done}/{total}] {result.status():18} {result.test}"
+        if result.exit_code is not None:
+            line += (f"  pushed {len(result.pushed)}, unchanged {len(result.unchanged)}; "
+                     f"{format_run_info(result.run_info)}")
+        print(line)
+        if result.compile_error:
+            print(result.compile_error)
+        elif args.verbose or (result.exit_code not in (None, 0)):
+            print(result.output.rstrip())
+
+    # Turn SIGTERM/SIGHUP into a normal exit so the device lock is released
+    for sig in (signal.SIGTERM, signal.SIGHUP):
+        signal.signal(sig, lambda signum, frame: sys.exit(128 + signum))
+
+    try:
+        results = executor.run(args.tests, _report, args.lock_attempts, args.lock_backoff)
+    except RuntimeError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    failed = [r for r in results if r.status() != "PASS"]
+    print(f"\n{len(results) - len(failed)}/{len(results)} passed")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump([r.as_dict() for r in results], f, indent=2)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""
+Batched and cached generation of es-checked tests.
+
+`generate-es-checked/main.rb` starts ts-node through npx on every invocation,
+so calling it once per test is slow. This stage groups the requested tests by
+their source yaml (`Array_1` -> `Array.yaml`), runs the generator once per yaml
+with a filter matching all requested names, and records in a manifest in the
+output directory which names were generated from which content hashes of the
+yaml and of the generator sources. A yaml is skipped when none of these
+changed and all requested outputs exist.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+GENERATOR_DIR = "tests/tests-u-runner/tools/generate-es-checked"
+YAML_DIR = "plugins/ets/tests/ets_es_checked"
+MANIFEST = ".gen_manifest.json"
+SKIP_DIRS = {"node_modules", ".git", "__pycache__"}
+
+
+def split_test(test: str) -> Tuple[str, str]:
+    """(yaml, generator name) of a test id, as run_es2p.sh derives them: Array_12 -> (Array, Array_)"""
+    return test.split('_', 1)[0], re.sub(r'[0-9]*$', '', test)
+
+
+def group_tests(tests: List[str]) -> Dict[str, List[str]]:
+    """Requested tests grouped by yaml, keeping the order of first appearance"""
+    groups: Dict[str, List[str]] = {}
+    for test in tests:
+        group = groups.setdefault(split_test(test)[0], [])
+        if test not in group:
+            group.append(test)
+    return groups
+
+
+def combined_filter(tests: List[str]) -> str:
+    """One --filter regex matching the generator names of all tests"""
+    names = sorted(set(split_test(test)[1] for test in tests))
+    if len(names) == 1:
+        return f"^{re.escape(names[0])}$"
+    return "^(" + "|".join(re.escape(name) for name in names) + ")$"
+
+
+def hash_file(path: str, digest=None) -> str:
+    digest = digest or hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_tree(root: str) -> str:
+    """Content hash of all files under root (paths included), skipping node_modules and VCS data"""
+    digest = hashlib.sha256()
+    for directory, dirs, files in os.walk(root):
+        dirs[:] = sorted(d for d in dirs if d not in SKIP_DIRS)
+        for name in sorted(files):
+            path = os.path.join(directory, name)
+            digest.update(os.path.relpath(path, root).encode() + b'\0')
+            hash_file(path, digest)
+    return digest.hexdigest()
+
+
+class GenerationManifest:
+    """Which tests were generated from which yaml and generator hashes"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path, 'r') as f:
+                self.entries: Dict[str, Dict[str, object]] = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def is_fresh(self, yaml: str, yaml_hash: str, generator_hash: str, tests: List[str], out_dir: str) -> bool:
+        entry = self.entries.get(yaml)
+        if not entry or entry.get('yaml') != yaml_hash or entry.get('generator') != generator_hash:
+            return False
+        generated = set(entry.get('tests', []))
+        return all(test in generated and os.path.exists(os.path.join(out_dir, f"{test}.ets")) for test in tests)
+
+    def record(self, yaml: str, yaml_hash: str, generator_hash: str, tests: List[str]):
+        with self._lock:
+            entry = self.entries.get(yaml)
+            if entry and entry.get('yaml') == yaml_hash and entry.get('generator') == generator_hash:
+                tests = sorted(set(entry['tests']) | set(tests))
+            self.entries[yaml] = {'yaml': yaml_hash, 'generator': generator_hash, 'tests': sorted(tests)}
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(self.entries, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+
+
+class GenerationResult:
+    def __init__(self, yaml: str, tests: List[str]):
+        self.yaml = yaml
+        self.tests = tests
+        self.skipped = False
+        self.return_code = 0
+        self.output = ""
+        self.missing: List[str] = []
+
+    def status(self) -> str:
+        if self.skipped:
+            return "CACHED"
+        if self.return_code != 0:
+            return f"FAIL({self.return_code})"
+        return "MISSING" if self.missing else "OK"
+
+
+class EsCheckedGenerator:
+    """Runs generate-es-checked/main.rb once per yaml for the requested tests"""
+
+    def __init__(self, static_root: str, build_dir: str, out_dir: Optional[str] = None,
+                 tmp_dir: Optional[str] = None):
+        self.static_root = static_root
+        self.generator_dir = os.path.join(static_root, GENERATOR_DIR)
+        self.yaml_dir = os.path.join(static_root, YAML_DIR)
+        self.out_dir = out_dir or os.path.join(build_dir, "es2p", "gen")
+        self.tmp_dir = tmp_dir or os.path.join(build_dir, "es2p", "tmp")
+        self.manifest = GenerationManifest(os.path.join(self.out_dir, MANIFEST))
+        self._generator_hash: Optional[str] = None
+
+    def generator_hash(self) -> str:
+        if self._generator_hash is None:
+            self._generator_hash = hash_tree(self.generator_dir)
+        return self._generator_hash
+
+    def yaml_path(self, yaml: str) -> str:
+        return os.path.join(self.yaml_dir, f"{yaml}.yaml")
+
+    def command(self, yaml: str, tests: List[str]) -> List[str]:
+        gen = self.generator_dir
+        return [
+            os.path.join(gen, "main.rb"),
+            "--out", self.out_dir,
+            # Separate tmp dirs so yamls can be generated in parallel
+            "--tmp", os.path.join(self.tmp_dir, yaml),
+            f"--ts-node=npx:--prefix:{gen}:ts-node:-P:{gen}/tsconfig.json",
+            "--filter", combined_filter(tests),
+            self.yaml_path(yaml),
+        ]
+
+    def _generate(self, yaml: str, tests: List[str], force: bool) -> GenerationResult:
+        result = GenerationResult(yaml, tests)
+        yaml_hash = hash_file(self.yaml_path(yaml))
+        if not force and self.manifest.is_fresh(yaml, yaml_hash, self.generator_hash(), tests, self.out_dir):
+            result.skipped = True
+            return result
+
+        os.makedirs(os.path.join(self.tmp_dir, yaml), exist_ok=True)
+        process = subprocess.run(self.command(yaml, tests), capture_output=True, text=True)
+        result.return_code = process.returncode
+        result.output = process.stdout + process.stderr
+        result.missing = [t for t in tests if not os.path.exists(os.path.join(self.out_dir, f"{t}.ets"))]
+        if result.return_code == 0:
+            generated = [t for t in tests if t not in result.missing]
+            self.manifest.record(yaml, yaml_hash, self.generator_hash(), generated)
+        return result
+
+    def generate(self, tests: List[str], force: bool = False, jobs: int = 1,
+                 on_complete: Optional[Callable[[GenerationResult], None]] = None) -> List[GenerationResult]:
+        """Generate all tests, one generator run per yaml and at most `jobs` runs at a time"""
+        groups = group_tests(tests)
+        missing_yamls = [y for y in groups if not os.path.exists(self.yaml_path(y))]
+        if missing_yamls:
+            raise FileNotFoundError(f"no yaml for: {', '.join(self.yaml_path(y) for y in missing_yamls)}")
+        os.makedirs(self.out_dir, exist_ok=True)
+        lock = threading.Lock()
+
+        def _task(yaml: str) -> GenerationResult:
+            result = self._generate(yaml, groups[yaml], force)
+            if on_complete:
+                with lock:
+                    on_complete(result)
+            return result
+
+        with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+            return list(pool.map(_task, groups))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Generate es-checked tests, one generator run per yaml, skipping unchanged yamls.',
+        epilog='''Examples:
+  %(prog)s --static-root $STATIC_ROOT_DIR --build-dir $BUILD_DIR Array_1 Array_7 Map_2
+  %(prog)s --static-root . --build-dir out -j 4 --force Array_1
+        ''',
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('tests', nargs='+', help='Test names, e.g. Array_1 (yaml = part before the first "_")')
+    parser.add_argument('--static-root', required=True, help='Static core root (STATIC_ROOT_DIR)')
+    parser.add_argument('--build-dir', required=True, help='Build directory (BUILD_DIR)')
+    parser.add_argument('--out', help='Output directory (default: <build-dir>/es2p/gen)')
+    parser.add_argument('-j', '--jobs', type=int, default=1, help='Yamls generated in parallel (default: 1)')
+    parser.add_argument('--force', action='store_true', help='Regenerate even if nothing changed')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Print generator output')
+    args = parser.parse_args()
+
+    generator = EsCheckedGenerator(args.static_root, args.build_dir, args.out)
+
+    def _report(result: GenerationResult):
+        print(f"{result.status():8} {result.yaml}.yaml: {' '.join(result.tests)}")
+        if args.verbose or result.status() not in ("OK", "CACHED"):
+            if result.output.strip():
+                print(result.output.rstrip())
+            if result.missing:
+                print(f"Not generated: {' '.join(result.missing)}")
+
+    try:
+        results = generator.generate(args.tests, args.force, args.jobs, _report)
+    except FileNotFoundError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    sys.exit(0 if all(r.status() in ("OK", "CACHED") for r in results) else 1)
+
+
+if __name__ == "__main__":
+    main()
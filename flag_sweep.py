@@ -0,0 +1,340 @@
+"""
+Flag-matrix sweeps over replayed tests.
+
+A sweep takes independent option axes (e.g. gc-type x inlining x
+--compiler-check-final), expands their cartesian product (or a random sample
+of it) and replays every test once per variant, with the variant's flags set on
+the commands matching a name pattern (replacing flags already present, `^--name`
+removes one). The result is a pass/fail and timing
+matrix of variants x tests.
+"""
+
+import fnmatch
+import itertools
+import json
+import os
+import random
+import re
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Set, Tuple
+
+from jtr_commands import Command, ExecutionOptions, TestRunner, with_extra_args
+
+
+class SweepAxis:
+    """One option axis: a name and the alternative argument strings it takes ("" = leave flags as they are)"""
+
+    def __init__(self, name: str, values: List[str]):
+        self.name = name
+        self.values = values
+
+    @classmethod
+    def parse(cls, spec: str) -> 'SweepAxis':
+        """
+        Parse "NAME=VALUE|VALUE|...", e.g.
+        "gc=--gc-type=g1-gc|--gc-type=gen-gc" or "check=--compiler-check-final=true|".
+        """
+        name, sep, values = spec.partition('=')
+        name = name.strip()
+        if not sep or not name or not re.match(r'^[A-Za-z0-9_.-]+$', name):
+            raise ValueError(f"invalid axis '{spec}', expected NAME=VALUE|VALUE|...")
+        alternatives = [v.strip() for v in values.split('|')]
+        if len(alternatives) < 2:
+            raise ValueError(f"axis '{name}' needs at least two alternatives separated by '|'")
+        return cls(name, alternatives)
+
+    def __repr__(self) -> str:
+        return f"SweepAxis({self.name!r}, {self.values!r})"
+
+
+class Variant:
+    """One point of the matrix: the chosen value of every axis"""
+
+    def __init__(self, choices: List[Tuple[str, str]]):
+        self.choices = choices
+
+    @property
+    def extra_args(self) -> str:
+        return " ".join(value for _, value in self.choices if value)
+
+    @property
+    def label(self) -> str:
+        return " ".join(f"{name}={value or '-'}" for name, value in self.choices)
+
+    def as_dict(self) -> Dict[str, str]:
+        return dict(self.choices)
+
+
+def expand_variants(axes: List[SweepAxis], sample: Optional[int] = None, seed: int = 0) -> List[Variant]:
+    """Cartesian product of the axes, or `sample` variants drawn from it without replacement"""
+    combinations = list(itertools.product(*[[(axis.name, v) for v in axis.values] for axis in axes]))
+    if sample is not None and sample < len(combinations):
+        rng = random.Random(seed)
+        picked = sorted(rng.sample(range(len(combinations)), sample))
+        combinations = [combinations[i] for i in picked]
+    return [Variant(list(choice)) for choice in combinations]
+
+
+class SweepCell:
+    """Outcome of one test replayed with one variant"""
+
+    def __init__(self, variant: Variant, test_id: str):
+        self.variant = variant
+        self.test_id = test_id
+        self.passed = False
+        self.return_code: Optional[int] = None
+        self.failed_command: Optional[str] = None
+        self.duration = 0.0
+        self.command_durations: List[Tuple[str, float]] = []
+        # Set when the pair could not be run at all (e.g. the directory copy failed)
+        self.error: Optional[str] = None
+
+    def status(self) -> str:
+        if self.error is not None:
+            return "ERROR"
+        if self.return_code is None:
+            return "SKIP"
+        return "PASS" if self.passed else f"FAIL({self.return_code})"
+
+    def as_dict(self) -> Dict[str, object]:
+        return {
+            'variant': self.variant.as_dict(),
+            'test': self.test_id,
+            'status': self.status(),
+            'return_code': self.return_code,
+            'failed_command': self.failed_command,
+            'error': self.error,
+            'duration': round(self.duration, 3),
+            'commands': [{'name': n, 'duration': round(d, 3)} for n, d in self.command_durations],
+        }
+
+
+def relocate_paths(text: str, directories: Dict[str, str]) -> str:
+    """Replace each source directory (and paths under it) in text with its target"""
+    sources = {source.rstrip('/') or '/': target for source, target in directories.items()}
+    # Longest first, so a nested directory wins over its parent
+    alternatives = "|".join(re.escape(source) for source in sorted(sources, key=len, reverse=True))
+    return re.sub(f"(?:{alternatives})" + r'(?=$|[/\s:;\'"=])', lambda m: sources[m.group(0)], text)
+
+
+def apply_variant(runner: TestRunner, variant: Variant, name_pattern: str,
+                  directories: Optional[Dict[Optional[str], str]] = None) -> List[Command]:
+    """
+    Commands of a test with the variant's flags applied to those matching name_pattern.
+
+    `directories` maps execution directories to private copies: a command whose
+    directory is a key runs in its copy (the None key is used for commands
+    without a directory), and paths under the copied directories in the command
+    lines and environment are rewritten. Other commands keep their directory.
+    """
+    directories = directories or {}
+    sources = {source: target for source, target in directories.items() if source}
+    commands = []
+    for cmd in runner.commands:
+        if variant.extra_args and fnmatch.fnmatch(cmd.get_command_name(), name_pattern):
+            cmd = with_extra_args(cmd, variant.extra_args, name_pattern)
+        else:
+            cmd = Command(section=cmd.section, command=cmd.command, env_vars=cmd.env_vars,
+                          directory=cmd.directory, test_id=cmd.test_id)
+        if sources:
+            cmd.command = relocate_paths(cmd.command, sources)
+            cmd.env_vars = {name: relocate_paths(value, sources) for name, value in cmd.env_vars.items()}
+        if cmd.directory in directories:
+            cmd.directory = directories[cmd.directory]
+        commands.append(cmd)
+    return commands
+
+
+def _safe_name(text: str) -> str:
+    return re.sub(r'[^A-Za-z0-9_.-]+', '_', text).strip('_')[:80] or "unnamed"
+
+
+class FlagSweep:
+    """
+    Runs every (variant, test) pair on a pool of workers.
+
+    Commands of one pair run in order and stop at the first failure, like the
+    `bash -ce` chains they come from. Variants of one test run one at a time, as
+    do tests sharing an execution directory; a worker only picks up a pair whose
+    test and directories are free, so -j stays effective. With `workdir`, each
+    pair runs in private copies of the test's execution directories, with the
+    paths to them rewritten, and variants of one test run in parallel. A pair
+    that cannot be run is recorded as ERROR instead of stopping the sweep.
+    """
+
+    def __init__(self, tests: List[TestRunner], axes: List[SweepAxis], name_pattern: str,
+                 options: Optional[ExecutionOptions] = None, sample: Optional[int] = None,
+                 seed: int = 0, workdir: Optional[str] = None):
+        self.tests = tests
+        self.axes = axes
+        self.name_pattern = name_pattern
+        self.options = options or ExecutionOptions()
+        self.variants = expand_variants(axes, sample, seed)
+        self.workdir = workdir
+        self.cells: List[SweepCell] = []
+
+    def _test_id(self, index: int, runner: TestRunner) -> str:
+        return runner.test_id or f"test{index}"
+
+    def _source_directories(self, runner: TestRunner) -> List[str]:
+        """Distinct execution directories of the test, in command order"""
+        return list(dict.fromkeys(c.directory for c in runner.commands if c.directory))
+
+    def _exclusive_keys(self, runner: TestRunner, test_id: str) -> Set[Tuple[str, str]]:
+        """Resources a pair holds while it runs: its test, and each real execution directory"""
+        sources = self._source_directories(runner)
+        if self.workdir and all(os.path.isdir(source) for source in sources):
+            return set()
+        keys = {('test', test_id)}
+        keys.update(('dir', source) for source in sources)
+        return keys
+
+    def _prepare_directories(self, runner: TestRunner, test_id: str,
+                             variant_index: int) -> Dict[Optional[str], str]:
+        """
+        Copy each execution directory of the test into the work directory.
+
+        A single directory is copied to <workdir>/<test>/vNNN, several ones to
+        numbered subdirectories of it. Commands without a directory run in the
+        first copy, or in an empty vNNN if the test has no existing directory.
+        """
+        target = os.path.abspath(os.path.join(self.workdir, _safe_name(test_id), f"v{variant_index:03d}"))
+        if os.path.exists(target):
+            shutil.rmtree(target)
+        sources = [source for source in self._source_directories(runner) if os.path.isdir(source)]
+        directories: Dict[Optional[str], str] = {}
+        for i, source in enumerate(sources):
+            copy = target if len(sources) == 1 else os.path.join(target, f"{i}_{_safe_name(os.path.basename(source))}")
+            shutil.copytree(source, copy, symlinks=True)
+            directories[source] = copy
+        if not sources:
+            os.makedirs(target)
+        directories[None] = directories[sources[0]] if sources else target
+        return directories
+
+    def _run_cell(self, cell: SweepCell, runner: TestRunner, variant_index: int, cpus: Optional[List[int]]):
+        directories = None
+        if self.workdir:
+            directories = self._prepare_directories(runner, cell.test_id, variant_index)
+        commands = apply_variant(runner, cell.variant, self.name_pattern, directories)
+
+        start = time.monotonic()
+        cell.passed = True
+        cell.return_code = 0
+        for cmd in commands:
+            return_code, _, _ = cmd.execute(timeout=self.options.timeout, capture_output=True, cpus=cpus,
+                                            nice=self.options.nice, ionice=self.options.ionice)
+            cell.command_durations.append((cmd.get_command_name(), cmd.get_last_run_info().get('duration', 0.0)))
+            if return_code != 0:
+                cell.passed = False
+                cell.return_code = return_code
+                cell.failed_command = cmd.get_command_name()
+                break
+        cell.duration = time.monotonic() - start
+
+    def run(self, on_complete=None) -> List[SweepCell]:
+        """Run the whole matrix; on_complete(cell, done, total) is called after each pair"""
+        pending = []
+        for variant_index, variant in enumerate(self.variants):
+            for test_index, runner in enumerate(self.tests):
+                cell = SweepCell(variant, self._test_id(test_index, runner))
+                pending.append((cell, runner, variant_index, self._exclusive_keys(runner, cell.test_id)))
+        self.cells = [cell for cell, _, _, _ in pending]
+        total = len(pending)
+
+        plan = self.options.affinity
+        busy: Set[Tuple[str, str]] = set()
+        ready = threading.Condition()
+        done = [0]
+
+        def _claim():
+            # The first pending pair whose test and directories are free, or None when all are taken
+            with ready:
+                while pending:
+                    for i, pair in enumerate(pending):
+                        if not pair[3] & busy:
+                            busy.update(pair[3])
+                            del pending[i]
+                            return pair
+                    ready.wait()
+                return None
+
+        def _worker(slot: int):
+            cpus = plan.cpus_for_worker(slot) if plan else None
+            while True:
+                pair = _claim()
+                if pair is None:
+                    return
+                cell, runner, variant_index, keys = pair
+                try:
+                    self._run_cell(cell, runner, variant_index, cpus)
+                except Exception as e:
+                    # A broken pair (failed copy, unparsable command) is reported in the matrix
+                    cell.passed = False
+                    cell.error = f"{type(e).__name__}: {e}"
+                finally:
+                    with ready:
+                        busy.difference_update(keys)
+                        done[0] += 1
+                        if on_complete:
+                            on_complete(cell, done[0], total)
+                        ready.notify_all()
+
+        with ThreadPoolExecutor(max_workers=self.options.jobs) as pool:
+            for future in [pool.submit(_worker, slot) for slot in range(self.options.jobs)]:
+                future.result()
+        return self.cells
+
+    def matrix(self) -> List[List[SweepCell]]:
+        """Cells as rows of variants x columns of tests"""
+        width = len(self.tests)
+        return [self.cells[i:i + width] for i in range(0, len(self.cells), width)]
+
+    def format_matrix(self) -> str:
+        """Text table: one row per variant, one column per test, plus totals"""
+        test_ids = [self._test_id(i, r) for i, r in enumerate(self.tests)]
+        headers = [f"T{i + 1}" for i in range(len(test_ids))]
+        rows = []
+        for row in self.matrix():
+            passed = sum(1 for c in row if c.passed)
+            total_time = sum(c.duration for c in row)
+            cells = [f"{c.status()} {c.duration:.2f}s" for c in row]
+            rows.append([row[0].variant.label] + cells + [f"{passed}/{len(row)}", f"{total_time:.2f}s"])
+
+        table = [["variant"] + headers + ["passed", "time"]] + rows
+        widths = [max(len(r[i]) for r in table) for i in range(len(table[0]))]
+        lines = ["  ".join(value.ljust(widths[i]) for i, value in enumerate(r)).rstrip() for r in table]
+        legend = [f"T{i + 1}: {test_id}" for i, test_id in enumerate(test_ids)]
+        return "\n".join(lines + [""] + legend)
+
+    def to_json(self) -> Dict[str, object]:
+        return {
+            'axes': {axis.name: axis.values for axis in self.axes},
+            'pattern': self.name_pattern,
+            'tests': [self._test_id(i, r) for i, r in enumerate(self.tests)],
+            'cells': [cell.as_dict() for cell in self.cells],
+        }
+
+    def write_report(self, path: str):
+        """Write the matrix as JSON (.json) or as one CSV row per cell (any other extension)"""
+        if path.endswith('.json'):
+            with open(path, 'w') as f:
+                json.dump(self.to_json(), f, indent=2)
+            return
+
+        with open(path, 'w') as f:
+            axis_names = [axis.name for axis in self.axes]
+            f.write(",".join(axis_names + ["test", "status", "return_code", "duration"]) + "\n")
+            for cell in self.cells:
+                values = [cell.variant.as_dict()[name] for name in axis_names]
+                values += [cell.test_id, cell.status(), str(cell.return_code), f"{cell.duration:.3f}"]
+                f.write(",".join(_csv_field(v) for v in values) + "\n")
+
+
+def _csv_field(value: str) -> str:
+    if any(ch in value for ch in ',"\n'):
+        return '"' + value.replace('"', '""') + '"'
+    return value
@@ -0,0 +1,367 @@
+"""
+Inlining-decision analyzer for compiler logs written with
+`--log-debug=compiler --compiler-log=inlining` (run_es2p.sh -l/--log).
+
+The log is streamed line by line and turned into a compact table of
+(caller, callee, decision, reason, depth) rows. The table can be filtered
+("which external methods were inlined into X"), exported as CSV/JSON, and
+two runs can be diffed, e.g. with and without
+`--compiler-inline-external-methods-aot`.
+"""
+
+import argparse
+import csv
+import fnmatch
+import json
+import re
+import sys
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from log_patterns import apply_overrides
+
+
+# Runtime log prefix: "[TID 0012ab] D/compiler: "
+LOG_PREFIX_RE = re.compile(r'^\[TID [0-9A-Fa-f]+\]\s+\S/[\w-]+:\s?')
+
+# Default message patterns; use --pattern KIND=REGEX to adapt to other compiler versions.
+# They follow the message wording in the tests and have not been checked against real
+# --compiler-log=inlining output of every compiler version.
+DEFAULT_PATTERNS = {
+    # Start of a new compiled method: every following decision belongs to it
+    'method': [
+        r'(?:Compil(?:e|ing)|Start compiling|Optimiz(?:e|ing)) method:?\s+(?P<caller>\S+)',
+        r'Inlining (?:in|into) method:?\s+(?P<caller>\S+)',
+    ],
+    # An inlining attempt
+    'try': [
+        r'Try to inline\s*(?:\((?P<details>[^)]*)\))?:?\s*(?P<callee>\S+)',
+        r'Inlining candidate:?\s+(?P<callee>\S+)',
+    ],
+    # The current attempt succeeded
+    'inlined': [
+        r'(?:Successfully inlined|Method was inlined|Inlined):?\s*(?P<callee>\S+)?',
+    ],
+    # Explicit rejection; otherwise the last message after an attempt is its reason
+    'rejected': [
+        r'(?:Failed to inline|Inlining failed|Cannot inline|Can\'t inline|Not inlined)'
+        r'(?::?\s*(?P<callee>\S+))?(?:\s*[:,-]\s*(?P<reason>.+))?',
+    ],
+}
+
+# Named groups the parser reads from each kind of message
+REQUIRED_GROUPS = {'method': ('caller',), 'try': ('callee',)}
+
+INLINED = "inlined"
+REJECTED = "rejected"
+
+
+class InlineDecision:
+    """One inlining attempt of callee into caller"""
+
+    __slots__ = ('caller', 'callee', 'decision', 'reason', 'depth', 'external')
+
+    def __init__(self, caller: str, callee: str, decision: str, reason: str, depth: int, external: bool):
+        self.caller = caller
+        self.callee = callee
+        self.decision = decision
+        self.reason = reason
+        self.depth = depth
+        self.external = external
+
+    def as_row(self) -> Tuple[str, str, str, str, int, bool]:
+        return (self.caller, self.callee, self.decision, self.reason, self.depth, self.external)
+
+    def __repr__(self) -> str:
+        return f"InlineDecision({self.caller} <- {self.callee}: {self.decision}, {self.reason!r}, depth={self.depth})"
+
+
+def method_module(method: str) -> str:
+    """Leading package component of a method name ('std.core.String::length' -> 'std')"""
+    return method.split('::')[0].split('.')[0]
+
+
+def is_external(caller: str, callee: str, details: str = "") -> bool:
+    """Whether callee lives outside the caller's file: flagged by the log, or from another package"""
+    if 'external' in details:
+        return True
+    return bool(caller) and method_module(caller) != method_module(callee)
+
+
+class InlineLogParser:
+    """
+    Streaming parser; feed lines, get decisions.
+
+    Attempts are tracked per depth: an attempt is closed as inlined by a success
+    message, or as rejected when a new attempt at the same or lower depth starts,
+    a new method starts or the log ends. Unless an explicit rejection message
+    gives a reason, the last message logged for the attempt is used.
+
+    The default patterns are guesses at the log wording; check a real log and
+    pass overrides where they differ.
+    """
+
+    def __init__(self, patterns: Optional[Dict[str, List[str]]] = None):
+        patterns = patterns or DEFAULT_PATTERNS
+        self.patterns = {kind: [re.compile(p) for p in regexes] for kind, regexes in patterns.items()}
+        self._strings: Dict[str, str] = {}
+        self._caller = ""
+        # depth -> [callee, details, last message]
+        self._pending: Dict[int, list] = {}
+
+    def _intern(self, text: str) -> str:
+        # Method names repeat a lot; share one string object per name
+        return self._strings.setdefault(text, text)
+
+    def _match(self, kind: str, text: str):
+        for regex in self.patterns[kind]:
+            match = regex.search(text)
+            if match:
+                return match
+        return None
+
+    def _close(self, depth: int, decision: str, reason: str = "") -> Optional[InlineDecision]:
+        pending = self._pending.pop(depth, None)
+        if pending is None:
+            return None
+        callee, details, last_message = pending
+        if decision == REJECTED and not reason:
+            reason = last_message or "unknown"
+        caller = self._caller
+        # Nested attempts are inlined into the callee being inlined one level up
+        parent = self._pending.get(depth - 1)
+        if parent is not None:
+            caller = parent[0]
+        return InlineDecision(caller, callee, decision, self._intern(reason), depth,
+                              is_external(caller, callee, details))
+
+    def _close_from(self, depth: int) -> List[InlineDecision]:
+        closed = []
+        for d in sorted((d for d in self._pending if d >= depth), reverse=True):
+            decision = self._close(d, REJECTED)
+            if decision:
+                closed.append(decision)
+        return closed
+
+    def feed(self, line: str) -> List[InlineDecision]:
+        """Process one log line and return the decisions it completed"""
+        text = LOG_PREFIX_RE.sub('', line.rstrip('\n'))
+        stripped = text.lstrip(' ')
+        if not stripped:
+            return []
+        indent_depth = (len(text) - len(stripped)) // 2
+
+        match = self._match('method', stripped)
+        if match:
+            closed = self._close_from(0)
+            self._caller = self._intern(match.group('caller'))
+            return closed
+
+        match = self._match('try', stripped)
+        if match:
+            details = match.groupdict().get('details') or ""
+            depth_match = re.search(r'depth=(\d+)', details)
+            depth = int(depth_match.group(1)) if depth_match else indent_depth
+            closed = self._close_from(depth)
+            self._pending[depth] = [self._intern(match.group('callee')), details, ""]
+            return closed
+
+        if not self._pending:
+            return []
+
+        for kind, outcome in (('inlined', INLINED), ('rejected', REJECTED)):
+            match = self._match(kind, stripped)
+            if match:
+                depth = self._depth_of(match.groupdict().get('callee'))
+                reason = (match.groupdict().get('reason') or stripped).strip() if outcome == REJECTED else ""
+                closed = self._close_from(depth + 1)
+                decision = self._close(depth, outcome, reason)
+                return closed + ([decision] if decision else [])
+
+        # Any other message is the most recent explanation for the innermost open attempt
+        self._pending[max(self._pending)][2] = stripped
+        return []
+
+    def _depth_of(self, callee: Optional[str]) -> int:
+        """Depth of the open attempt for callee; the innermost attempt if the message names none"""
+        if callee:
+            for depth in sorted(self._pending, reverse=True):
+                if self._pending[depth][0] == callee:
+                    return depth
+        return max(self._pending)
+
+    def finish(self) -> List[InlineDecision]:
+        """Close attempts still open at the end of the log"""
+        return self._close_from(0)
+
+
+def parse_inline_log(lines: Iterable[str], patterns: Optional[Dict[str, List[str]]] = None) -> Iterator[InlineDecision]:
+    parser = InlineLogParser(patterns)
+    for line in lines:
+        yield from parser.feed(line)
+    yield from parser.finish()
+
+
+def load_decisions(path: str, patterns: Optional[Dict[str, List[str]]] = None) -> List[InlineDecision]:
+    """Decisions from a compiler log, or from a CSV table written by this tool"""
+    if path.endswith('.csv'):
+        with open(path, newline='') as f:
+            reader = csv.DictReader(f)
+            return [InlineDecision(r['caller'], r['callee'], r['decision'], r['reason'],
+                                   int(r['depth']), r['external'] == 'True') for r in reader]
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        return list(parse_inline_log(f, patterns))
+
+
+def filter_decisions(decisions: Iterable[InlineDecision], caller: Optional[str] = None,
+                     callee: Optional[str] = None, decision: Optional[str] = None,
+                     external: Optional[bool] = None) -> List[InlineDecision]:
+    """Select decisions by caller/callee fnmatch patterns, decision and externality"""
+    result = []
+    for d in decisions:
+        if caller and not fnmatch.fnmatch(d.caller, caller):
+            continue
+        if callee and not fnmatch.fnmatch(d.callee, callee):
+            continue
+        if decision and d.decision != decision:
+            continue
+        if external is not None and d.external != external:
+            continue
+        result.append(d)
+    return result
+
+
+def _outcomes(decisions: Iterable[InlineDecision]) -> Dict[Tuple[str, str], Tuple[int, int, str]]:
+    """(caller, callee) -> (times inlined, times rejected, last rejection reason)"""
+    result: Dict[Tuple[str, str], List] = {}
+    for d in decisions:
+        entry = result.setdefault((d.caller, d.callee), [0, 0, ""])
+        if d.decision == INLINED:
+            entry[0] += 1
+        else:
+            entry[1] += 1
+            entry[2] = d.reason
+    return {key: tuple(value) for key, value in result.items()}
+
+
+def diff_decisions(base: Iterable[InlineDecision], new: Iterable[InlineDecision]) -> Dict[str, List[Dict[str, str]]]:
+    """
+    Call sites whose outcome changed between two runs.
+
+    `newly_inlined`: rejected (or not attempted) in base, inlined in new;
+    `no_longer_inlined`: the opposite, with the reason from the new run.
+    """
+    old_outcomes, new_outcomes = _outcomes(base), _outcomes(new)
+    newly_inlined, no_longer_inlined = [], []
+    for key in sorted(set(old_outcomes) | set(new_outcomes)):
+        old_inlined = old_outcomes.get(key, (0, 0, ""))[0] > 0
+        new_entry = new_outcomes.get(key, (0, 0, "not attempted"))
+        new_inlined = new_entry[0] > 0
+        row = {'caller': key[0], 'callee': key[1]}
+        if new_inlined and not old_inlined:
+            row['base_reason'] = old_outcomes.get(key, (0, 0, "not attempted"))[2]
+            newly_inlined.append(row)
+        elif old_inlined and not new_inlined:
+            row['reason'] = new_entry[2]
+            no_longer_inlined.append(row)
+    return {'newly_inlined': newly_inlined, 'no_longer_inlined': no_longer_inlined}
+
+
+def write_table(decisions: List[InlineDecision], path: str):
+    """Write decisions as CSV (.csv) or JSON lines of rows (anything else)"""
+    columns = ['caller', 'callee', 'decision', 'reason', 'depth', 'external']
+    with open(path, 'w', newline='') as f:
+        if path.endswith('.csv'):
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            writer.writerows(d.as_row() for d in decisions)
+        else:
+            for d in decisions:
+                f.write(json.dumps(dict(zip(columns, d.as_row()))) + "\n")
+
+
+def print_summary(decisions: List[InlineDecision], top: int = 10):
+    inlined = sum(1 for d in decisions if d.decision == INLINED)
+    external = sum(1 for d in decisions if d.decision == INLINED and d.external)
+    print("=== Inlining Summary ===")
+    print(f"Attempts: {len(decisions)}, inlined: {inlined} ({external} external), "
+          f"rejected: {len(decisions) - inlined}")
+    print(f"Callers: {len(set(d.caller for d in decisions))}")
+    reasons = Counter(d.reason for d in decisions if d.decision == REJECTED)
+    if reasons:
+        print("\nTop rejection reasons:")
+        for reason, count in reasons.most_common(top):
+            print(f"{count:8}  {reason}")
+
+
+def print_decisions(decisions: List[InlineDecision]):
+    for d in decisions:
+        flag = " [external]" if d.external else ""
+        reason = f" ({d.reason})" if d.reason else ""
+        print(f"{'  ' * d.depth}{d.caller} <- {d.callee}: {d.decision}{reason}{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Analyze inlining decisions from --compiler-log=inlining output.',
+        epilog='''Examples:
+  %(prog)s Test_ark_aot.log                                   # Summary and top rejection reasons
+  %(prog)s aot.log --caller "*ETSGLOBAL::main" --inlined --external  # External methods inlined into main
+  %(prog)s aot.log -o inlining.csv                            # Export the table
+  %(prog)s with_ext.log --baseline without_ext.log            # What changed between two runs
+        ''',
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('log', help='Compiler log, or a CSV table written with -o')
+    parser.add_argument('--baseline', metavar='LOG', help='Diff against another log (or CSV table)')
+    parser.add_argument('--caller', metavar='PATTERN', help='Only decisions for callers matching PATTERN')
+    parser.add_argument('--callee', metavar='PATTERN', help='Only decisions for callees matching PATTERN')
+    decision_group = parser.add_mutually_exclusive_group()
+    decision_group.add_argument('--inlined', action='store_true', help='Only successful inlinings')
+    decision_group.add_argument('--rejected', action='store_true', help='Only rejected attempts')
+    parser.add_argument('--external', action='store_true', help='Only callees from other files/packages')
+    parser.add_argument('-o', '--output', metavar='FILE', help='Write the (filtered) table as CSV or JSON lines')
+    parser.add_argument('--pattern', action='append', default=[], metavar='KIND=REGEX',
+                        help='Override the patterns of a message kind (method, try, inlined, rejected)')
+    args = parser.parse_args()
+
+    try:
+        patterns = apply_overrides(DEFAULT_PATTERNS, args.pattern, REQUIRED_GROUPS)
+    except ValueError as e:
+        parser.error(str(e))
+
+    try:
+        decisions = load_decisions(args.log, patterns)
+        baseline = load_decisions(args.baseline, patterns) if args.baseline else None
+    except OSError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    decision = INLINED if args.inlined else REJECTED if args.rejected else None
+    selected = filter_decisions(decisions, args.caller, args.callee, decision, True if args.external else None)
+
+    if baseline is not None:
+        base_selected = filter_decisions(baseline, args.caller, args.callee, None,
+                                         True if args.external else None)
+        diff = diff_decisions(base_selected, filter_decisions(decisions, args.caller, args.callee, None,
+                                                              True if args.external else None))
+        print("=== Inlining Diff ===")
+        print(f"Newly inlined: {len(diff['newly_inlined'])}")
+        for row in diff['newly_inlined']:
+            print(f"   + {row['caller']} <- {row['callee']} (was: {row['base_reason']})")
+        print(f"No longer inlined: {len(diff['no_longer_inlined'])}")
+        for row in diff['no_longer_inlined']:
+            print(f"   - {row['caller']} <- {row['callee']} ({row['reason']})")
+    elif args.caller or args.callee or decision or args.external:
+        print_decisions(selected)
+        print(f"\n{len(selected)} decision(s)")
+    else:
+        print_summary(decisions)
+
+    if args.output:
+        write_table(selected, args.output)
+        print(f"\nTable written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,486 @@
+"""
+Indexed browser for compiler dumps produced by run_es2p.sh.
+
+With -C/--compiler-regex, ark_aot writes one `.ir` file per method and pass to
+`${test}_ir_dump/` and a single `${test}_disasm.txt`; --debug-dump adds
+`ark_aotdump` output (`${test}.ets.an.dump`) and the `ark_disasm` bytecode
+listing (`${test}.ets.abc.asm`). This tool indexes these artifacts by test,
+method and pass using memory-mapped reads, so multi-GB dumps are never loaded
+as a whole. It answers "method M after pass P", reports instruction counts and
+code sizes per method, and diffs two dump folders to show where code
+generation changed.
+
+The index is cached in `.ir_dump_index.json` inside the folder and rebuilt
+only for files whose size or mtime changed.
+"""
+
+import argparse
+import fnmatch
+import json
+import mmap
+import os
+import re
+import sys
+from typing import Dict, List, Optional, Tuple
+
+
+INDEX_FILE = ".ir_dump_index.json"
+INDEX_VERSION = 3
+
+# The dump layouts below follow the samples in the tests; they have not been
+# checked against every ark_aot version.
+
+# "<graph id>_pass_<index>_<method>_<pass>.ir"
+IR_FILE_RE = re.compile(r'^(?P<id>\d+)_pass_(?P<index>\d+)_(?P<rest>.+)\.ir$')
+# Method and pass names inside an IR dump, when the file name is not enough
+IR_METHOD_RE = re.compile(rb'^\s*[Mm]ethod(?: name)?:\s*(?P<method>\S+)', re.MULTILINE)
+IR_PASS_RE = re.compile(rb'^\s*[Pp]ass(?: name)?:\s*(?P<pass>\S+)', re.MULTILINE)
+# IR instruction lines: "    12.i32  Add  v10, v11 -> (v13)"; basic blocks: "BB 3  preds: ..."
+IR_INST_RE = re.compile(rb'^\s*\d+\.\S*\s+[A-Za-z]', re.MULTILINE)
+IR_BLOCK_RE = re.compile(rb'^BB\s+\d+', re.MULTILINE)
+
+# Disassembly: sections start with a METHOD_INFO block naming the method
+DISASM_HEADER_RE = re.compile(rb'^METHOD_INFO:\s*\n\s*name:\s*(?P<method>\S+)|^[Mm]ethod:\s*(?P<method2>\S+)',
+                              re.MULTILINE)
+DISASM_INST_RE = re.compile(rb'^\s*(?:0x)?[0-9a-fA-F]{2,}:\s+\S', re.MULTILINE)
+# Code size line of the METHOD_INFO header, i.e. before the DISASSEMBLY: marker of the section
+DISASM_SIZE_RE = re.compile(rb'^\s*(?:code[_ ]size|CODE_SIZE|size)\s*[:=]\s*(?P<size>\d+)\s*$', re.MULTILINE)
+DISASM_BODY_MARKER = b'DISASSEMBLY:'
+
+# ark_aotdump: a method name followed by its code size on the same line
+AOTDUMP_METHOD_RE = re.compile(rb'(?P<method>[\w.$<>]+::[\w$<>]+)[^\n]*?(?:code[_ ]size|size)\s*[:=]\s*(?P<size>\d+)')
+
+# ark_disasm panda assembly: ".function i32 Test1.ETSGLOBAL.main(i32 a0) <static> {" up to a "}" line,
+# one indented mnemonic per instruction; labels, comments and ".catch" directives are not counted
+ASM_FUNCTION_RE = re.compile(rb'^\.function\s+\S+\s+(?P<method>[^\s(]+)\(', re.MULTILINE)
+ASM_FUNCTION_END = b'\n}'
+ASM_INST_RE = re.compile(rb'^[ \t]+[a-z][\w.]*(?:[ \t]|$)', re.MULTILINE)
+
+# Artifact names per test, run_es2p.sh writes them all to the intermediate dir
+TEST_SUFFIXES = ('_ir_dump', '_disasm.txt', '.disasm', '.ets.an.dump', '.an.dump', '.ets.abc.asm', '.abc.asm')
+
+
+def _map(path: str):
+    """Read-only memory map of a file, or None for empty files"""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _count(pattern, data, start: int = 0, end: Optional[int] = None) -> int:
+    """Number of matches of pattern in data[start:end], without collecting them"""
+    return sum(1 for _ in pattern.finditer(data, start, len(data) if end is None else end))
+
+
+def artifact_test(path: str) -> str:
+    """Test an artifact belongs to, from its path relative to the dump folder ('' if unknown)"""
+    first = path.replace(os.sep, '/').split('/')[0]
+    for suffix in TEST_SUFFIXES:
+        if first.endswith(suffix):
+            return first[:-len(suffix)]
+    return ''
+
+
+def _asm_method_name(name: str) -> str:
+    """Runtime spelling of a panda assembly function name ('Test1.ETSGLOBAL.main' -> 'Test1.ETSGLOBAL::main')"""
+    record, dot, method = name.rpartition('.')
+    return f"{record}::{method}" if dot else name
+
+
+def _split_ir_name(rest: str) -> Tuple[str, str]:
+    """Split '<method>_<pass>' from an IR file name; the pass is the last '_' component"""
+    method, _, pass_name = rest.rpartition('_')
+    return method, pass_name
+
+
+class IrEntry:
+    """One IR dump file: a method after a pass"""
+
+    def __init__(self, path: str, method: str, pass_name: str, index: int,
+                 instructions: int, blocks: int):
+        self.path = path
+        self.method = method
+        self.pass_name = pass_name
+        self.index = index
+        self.instructions = instructions
+        self.blocks = blocks
+
+    def to_json(self) -> list:
+        return [self.path, self.method, self.pass_name, self.index, self.instructions, self.blocks]
+
+    @classmethod
+    def from_json(cls, data: list) -> 'IrEntry':
+        return cls(*data)
+
+
+class DisasmEntry:
+    """A method section of a disassembly, aotdump or bytecode file (byte range, instruction count, code size)"""
+
+    def __init__(self, path: str, method: str, start: int, end: int, instructions: int,
+                 code_size: Optional[int]):
+        self.path = path
+        self.method = method
+        self.start = start
+        self.end = end
+        self.instructions = instructions
+        self.code_size = code_size
+
+    def to_json(self) -> list:
+        return [self.path, self.method, self.start, self.end, self.instructions, self.code_size]
+
+    @classmethod
+    def from_json(cls, data: list) -> 'DisasmEntry':
+        return cls(*data)
+
+
+def index_ir_file(path: str) -> IrEntry:
+    name = os.path.basename(path)
+    match = IR_FILE_RE.match(name)
+    method, pass_name, index = "", "", 0
+    if match:
+        index = int(match.group('index'))
+        method, pass_name = _split_ir_name(match.group('rest'))
+
+    data = _map(path)
+    instructions = blocks = 0
+    if data is not None:
+        with data:
+            instructions = _count(IR_INST_RE, data)
+            blocks = _count(IR_BLOCK_RE, data)
+            # Prefer the names written inside the dump over the mangled file name
+            head = data[:4096]
+            found = IR_METHOD_RE.search(head)
+            if found:
+                method = found.group('method').decode('utf-8', 'replace')
+            found = IR_PASS_RE.search(head)
+            if found:
+                pass_name = found.group('pass').decode('utf-8', 'replace')
+    if not method:
+        method = os.path.splitext(name)[0]
+    return IrEntry(path, method, pass_name, index, instructions, blocks)
+
+
+def index_disasm_file(path: str) -> List[DisasmEntry]:
+    data = _map(path)
+    if data is None:
+        return []
+    entries = []
+    with data:
+        headers = list(DISASM_HEADER_RE.finditer(data))
+        for i, header in enumerate(headers):
+            start = header.start()
+            end = headers[i + 1].start() if i + 1 < len(headers) else len(data)
+            body = data.find(DISASM_BODY_MARKER, start, end)
+            size_match = DISASM_SIZE_RE.search(data, start, body if body >= 0 else end)
+            method = (header.group('method') or header.group('method2')).decode('utf-8', 'replace')
+            entries.append(DisasmEntry(path, method, start, end, _count(DISASM_INST_RE, data, start, end),
+                                       int(size_match.group('size')) if size_match else None))
+    return entries
+
+
+def index_asm_file(path: str) -> List[DisasmEntry]:
+    """Functions of an ark_disasm listing with their bytecode instruction counts (no code size)"""
+    data = _map(path)
+    if data is None:
+        return []
+    entries = []
+    with data:
+        for header in ASM_FUNCTION_RE.finditer(data):
+            start = header.start()
+            close = data.find(ASM_FUNCTION_END, header.end())
+            end = len(data) if close < 0 else close + len(ASM_FUNCTION_END)
+            # Skip the header line itself, its attributes could look like an instruction
+            body = data.find(b'\n', header.end(), end)
+            method = _asm_method_name(header.group('method').decode('utf-8', 'replace'))
+            instructions = _count(ASM_INST_RE, data, body, end) if body >= 0 else 0
+            entries.append(DisasmEntry(path, method, start, end, instructions, None))
+    return entries
+
+
+def index_aotdump_file(path: str) -> List[DisasmEntry]:
+    data = _map(path)
+    if data is None:
+        return []
+    with data:
+        return [DisasmEntry(path, m.group('method').decode('utf-8', 'replace'), m.start(), m.end(), 0,
+                            int(m.group('size')))
+                for m in AOTDUMP_METHOD_RE.finditer(data)]
+
+
+# Section indexers per DumpIndex._kind
+SECTION_INDEXERS = {'disasm': index_disasm_file, 'aotdump': index_aotdump_file, 'bytecode': index_asm_file}
+
+
+def _file_key(path: str) -> List[float]:
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime]
+
+
+class DumpIndex:
+    """Index of all IR, disassembly, aotdump and bytecode files under a folder"""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.ir: List[IrEntry] = []
+        self.disasm: List[DisasmEntry] = []
+        self.aotdump: List[DisasmEntry] = []
+        self.bytecode: List[DisasmEntry] = []
+        self._files: Dict[str, List[float]] = {}
+
+    @classmethod
+    def build(cls, root: str, use_cache: bool = True) -> 'DumpIndex':
+        """Index root, reusing cached entries of files that did not change"""
+        index = cls(root)
+        cached = index._load_cache() if use_cache else None
+        cached_files = cached['files'] if cached else {}
+        cached_ir = {e[0]: e for e in cached['ir']} if cached else {}
+        cached_sections: Dict[str, list] = {}
+        if cached:
+            for e in cached['disasm'] + cached['aotdump'] + cached['bytecode']:
+                cached_sections.setdefault(e[0], []).append(e)
+
+        for directory, _, files in os.walk(root):
+            for name in sorted(files):
+                path = os.path.join(directory, name)
+                rel = os.path.relpath(path, root)
+                kind = cls._kind(name)
+                if kind is None:
+                    continue
+                key = _file_key(path)
+                index._files[rel] = key
+                reuse = cached_files.get(rel) == key
+                if kind == 'ir':
+                    entry = IrEntry.from_json(cached_ir[rel]) if reuse and rel in cached_ir else None
+                    if entry is None:
+                        entry = index_ir_file(path)
+                        entry.path = rel
+                    index.ir.append(entry)
+                else:
+                    if reuse and rel in cached_sections:
+                        sections = [DisasmEntry.from_json(e) for e in cached_sections[rel]]
+                    else:
+                        sections = SECTION_INDEXERS[kind](path)
+                        for section in sections:
+                            section.path = rel
+                    getattr(index, kind).extend(sections)
+
+        index.ir.sort(key=lambda e: (e.method, e.index))
+        if use_cache:
+            index._save_cache()
+        return index
+
+    @staticmethod
+    def _kind(name: str) -> Optional[str]:
+        if name.endswith('.ir'):
+            return 'ir'
+        if name.endswith('_disasm.txt') or name.endswith('.disasm'):
+            return 'disasm'
+        if name.endswith('.an.dump'):
+            return 'aotdump'
+        if name.endswith('.abc.asm'):
+            return 'bytecode'
+        return None
+
+    def _cache_path(self) -> str:
+        return os.path.join(self.root, INDEX_FILE)
+
+    def _load_cache(self) -> Optional[dict]:
+        try:
+            with open(self._cache_path(), 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return data if data.get('version') == INDEX_VERSION else None
+
+    def _save_cache(self):
+        data = {
+            'version': INDEX_VERSION,
+            'files': self._files,
+            'ir': [e.to_json() for e in self.ir],
+            'disasm': [e.to_json() for e in self.disasm],
+            'aotdump': [e.to_json() for e in self.aotdump],
+            'bytecode': [e.to_json() for e in self.bytecode],
+        }
+        try:
+            with open(self._cache_path(), 'w') as f:
+                json.dump(data, f)
+        except OSError:
+            # Read-only dump folders are fine, the index is just not cached
+            pass
+
+    def methods(self) -> List[str]:
+        return sorted(set(e.method for e in self.ir) | set(e.method for e in self.disasm)
+                      | set(e.method for e in self.aotdump) | set(e.method for e in self.bytecode))
+
+    def find_ir(self, method: str = '*', pass_name: str = '*') -> List[IrEntry]:
+        """IR dumps matching method and pass (fnmatch patterns), in pass order"""
+        return [e for e in self.ir if fnmatch.fnmatch(e.method, method) and fnmatch.fnmatch(e.pass_name, pass_name)]
+
+    def find_disasm(self, method: str = '*') -> List[DisasmEntry]:
+        return [e for e in self.disasm if fnmatch.fnmatch(e.method, method)]
+
+    def find_bytecode(self, method: str = '*') -> List[DisasmEntry]:
+        return [e for e in self.bytecode if fnmatch.fnmatch(e.method, method)]
+
+    def read(self, entry) -> str:
+        """Text of an IR dump or a disassembly section, read through mmap"""
+        path = os.path.join(self.root, entry.path)
+        data = _map(path)
+        if data is None:
+            return ""
+        with data:
+            if isinstance(entry, DisasmEntry):
+                return data[entry.start:entry.end].decode('utf-8', 'replace')
+            return data[:].decode('utf-8', 'replace')
+
+    def stats(self) -> Dict[Tuple[str, str], Dict[str, object]]:
+        """
+        Per (test, method): number of passes dumped, IR instructions after the
+        first and last dumped pass, bytecode and disassembly instruction counts
+        and code size. Methods of the same name in different tests stay apart.
+        """
+        result: Dict[Tuple[str, str], Dict[str, object]] = {}
+
+        def method_stats(entry) -> Dict[str, object]:
+            return result.setdefault((artifact_test(entry.path), entry.method), {'passes': 0})
+
+        for entry in self.ir:
+            stats = method_stats(entry)
+            if stats['passes'] == 0:
+                stats['ir_first'] = entry.instructions
+            stats['passes'] += 1
+            stats['ir_last'] = entry.instructions
+            stats['last_pass'] = entry.pass_name
+        for entry in self.bytecode:
+            stats = method_stats(entry)
+            stats['bytecode_instructions'] = stats.get('bytecode_instructions', 0) + entry.instructions
+        for entry in self.disasm:
+            stats = method_stats(entry)
+            stats['disasm_instructions'] = stats.get('disasm_instructions', 0) + entry.instructions
+            if entry.code_size is not None:
+                stats['code_size'] = entry.code_size
+        for entry in self.aotdump:
+            stats = method_stats(entry)
+            stats.setdefault('code_size', entry.code_size)
+        return dict(sorted(result.items()))
+
+
+DIFF_METRICS = ('bytecode_instructions', 'ir_last', 'disasm_instructions', 'code_size')
+
+MethodStats = Dict[Tuple[str, str], Dict[str, object]]
+
+
+def diff_stats(base: MethodStats, new: MethodStats) -> List[Dict[str, object]]:
+    """Methods whose final IR size, instruction count or code size changed, largest change first"""
+    rows = []
+    for test, method in sorted(set(base) | set(new)):
+        old_stats, new_stats = base.get((test, method)), new.get((test, method))
+        if old_stats is None or new_stats is None:
+            rows.append({'test': test, 'method': method, 'only_in': 'base' if new_stats is None else 'new'})
+            continue
+        changes = {}
+        for metric in DIFF_METRICS:
+            old_value, new_value = old_stats.get(metric), new_stats.get(metric)
+            if old_value is not None and new_value is not None and old_value != new_value:
+                changes[metric] = (old_value, new_value)
+        if changes:
+            rows.append({'test': test, 'method': method, 'changes': changes})
+
+    def weight(row):
+        return -max((abs(b - a) for a, b in row.get('changes', {}).values()), default=0)
+
+    return sorted(rows, key=weight)
+
+
+def _qualified(test: str, method: str) -> str:
+    return f"{test}: {method}" if test else method
+
+
+def print_stats(stats: MethodStats):
+    print(f"{'bytecode':>8} {'passes':>6} {'ir first':>9} {'ir last':>8} {'asm insts':>9} {'code size':>9}  method")
+    for (test, method), s in stats.items():
+        def fmt(key):
+            return str(s[key]) if s.get(key) is not None else "-"
+        print(f"{fmt('bytecode_instructions'):>8} {s['passes']:>6} {fmt('ir_first'):>9} {fmt('ir_last'):>8} "
+              f"{fmt('disasm_instructions'):>9} {fmt('code_size'):>9}  {_qualified(test, method)}")
+
+
+def print_diff(rows: List[Dict[str, object]]):
+    for row in rows:
+        if 'only_in' in row:
+            print(f"{_qualified(row['test'], row['method'])}: only in {row['only_in']}")
+            continue
+        changes = ", ".join(f"{metric} {a} -> {b} ({b - a:+d})" for metric, (a, b) in row['changes'].items())
+        print(f"{_qualified(row['test'], row['method'])}: {changes}")
+    print(f"\n{len(rows)} method(s) changed")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Index and browse IR dumps, disassembly and aotdump output by method and pass.',
+        epilog='''Examples:
+  %(prog)s build/es2p/intermediate --list                         # Indexed methods
+  %(prog)s intermediate --method "*ETSGLOBAL::main" --pass Lowering --show  # IR after a pass
+  %(prog)s intermediate --method "*::main" --disasm               # Disassembly of a method
+  %(prog)s intermediate --method "*::main" --bytecode             # Its ark_disasm bytecode
+  %(prog)s intermediate --stats                                   # Sizes per method
+  %(prog)s new_intermediate --baseline old_intermediate           # Where codegen changed
+        ''',
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('folder', help='Dump folder (e.g. the run_es2p.sh intermediate dir)')
+    parser.add_argument('--method', default='*', metavar='PATTERN', help='Method name pattern')
+    parser.add_argument('--pass', dest='pass_name', default='*', metavar='PATTERN', help='Pass name pattern')
+    parser.add_argument('--list', action='store_true', help='List matching IR dumps')
+    parser.add_argument('--show', action='store_true', help='Print matching IR dumps')
+    parser.add_argument('--disasm', action='store_true', help='Print the disassembly of matching methods')
+    parser.add_argument('--bytecode', action='store_true', help='Print the bytecode (.abc.asm) of matching methods')
+    parser.add_argument('--stats', action='store_true', help='Print instruction counts and code sizes')
+    parser.add_argument('--baseline', metavar='FOLDER', help='Diff statistics against another dump folder')
+    parser.add_argument('--json', metavar='FILE', help='Write --stats or --baseline results as JSON')
+    parser.add_argument('--no-cache', action='store_true', help=f'Do not read or write {INDEX_FILE}')
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.folder):
+        print(f"Error: '{args.folder}' is not a directory", file=sys.stderr)
+        sys.exit(1)
+
+    index = DumpIndex.build(args.folder, use_cache=not args.no_cache)
+    result = None
+
+    if args.baseline:
+        baseline = DumpIndex.build(args.baseline, use_cache=not args.no_cache)
+        result = diff_stats(
+            {k: s for k, s in baseline.stats().items() if fnmatch.fnmatch(k[1], args.method)},
+            {k: s for k, s in index.stats().items() if fnmatch.fnmatch(k[1], args.method)})
+        print_diff(result)
+    elif args.stats:
+        stats = {k: s for k, s in index.stats().items() if fnmatch.fnmatch(k[1], args.method)}
+        print_stats(stats)
+        # JSON objects need string keys
+        result = [{'test': test, 'method': method, **s} for (test, method), s in stats.items()]
+    elif args.show:
+        for entry in index.find_ir(args.method, args.pass_name):
+            print(f"=== {entry.method} after {entry.pass_name} ({entry.path}) ===")
+            print(index.read(entry))
+    elif args.disasm:
+        for entry in index.find_disasm(args.method):
+            print(index.read(entry))
+    elif args.bytecode:
+        for entry in index.find_bytecode(args.method):
+            print(index.read(entry))
+    else:
+        entries = index.find_ir(args.method, args.pass_name)
+        for entry in entries:
+            print(f"{entry.index:5} {entry.instructions:7} {entry.pass_name:30} {entry.method}  ({entry.path})")
+        print(f"\n{len(entries)} IR dump(s), {len(index.disasm)} disassembled method(s), "
+              f"{len(index.methods())} method(s) indexed")
+
+    if args.json and result is not None:
+        with open(args.json, 'w') as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+"""
+Benchmarks for the parse_jtr parser and executor (jtr_commands).
+
+Measures, over a synthetic corpus from jtr_corpus.py (or an existing directory
+of .jtr files):
+
+- parse: parse_commands throughput (files/s, MB/s, commands/s), plus the time
+  spent in parse_standard_format and parse_rerun_block per section
+- memory: bytes retained per parsed command (tracemalloc)
+- filter: get_commands_by_name latency on one runner holding every command
+- spawn: run_commands throughput with a stub binary, i.e. the executor's own
+  per-command overhead
+
+Results can be saved as a JSON baseline; with --baseline the run fails (exit
+code 1) when any metric is worse than the baseline by more than --threshold.
+"""
+
+import argparse
+import json
+import os
+import re
+import stat
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import jtr_corpus
+from jtr_commands import (
+    Command,
+    ExecutionOptions,
+    TestRunner,
+    parse_commands,
+    parse_rerun_block,
+    parse_standard_format,
+    run_commands,
+)
+
+
+# Metric name -> (unit, True if higher is better)
+METRICS: Dict[str, Tuple[str, bool]] = {
+    'parse.files_per_s': ('files/s', True),
+    'parse.mb_per_s': ('MB/s', True),
+    'parse.commands_per_s': ('cmd/s', True),
+    'parse.standard_us_per_section': ('us', False),
+    'parse.rerun_us_per_section': ('us', False),
+    'memory.bytes_per_command': ('B', False),
+    'filter.ms_per_call': ('ms', False),
+    'spawn.commands_per_s': ('cmd/s', True),
+}
+BENCHMARKS = ('parse', 'memory', 'filter', 'spawn')
+FILTER_PATTERNS = ('ark', 'ark*', '*aot*', 'javac', 'no_such_tool')
+DEFAULT_THRESHOLD = 0.25
+
+_RERUN_RE = re.compile(r'----------rerun:.*?----------(.*?)----------', re.DOTALL)
+
+
+def corpus_texts(corpus_dir: Optional[str], files: int, preset: str, seed: int) -> Iterator[str]:
+    """Texts of the benchmark corpus, read from corpus_dir or generated lazily"""
+    if corpus_dir is None:
+        for _, text in jtr_corpus.iter_corpus(files, preset, seed):
+            yield text
+        return
+    paths = []
+    for root, _, names in os.walk(corpus_dir):
+        paths.extend(os.path.join(root, name) for name in names if name.endswith('.jtr'))
+    for path in sorted(paths)[:files]:
+        with open(path, encoding='utf-8', errors='replace') as f:
+            yield f.read()
+
+
+def _split_sections(text: str) -> Iterator[Tuple[str, str]]:
+    # Same split as parse_commands, done outside the timed region
+    sections = re.split(r'#section:([^\n]+)', text)
+    for i in range(1, len(sections), 2):
+        yield sections[i].strip(), sections[i + 1] if i + 1 < len(sections) else ""
+
+
+def bench_parse(texts: Iterator[str]) -> Dict[str, float]:
+    """Throughput of parse_commands and time per section of the two section parsers"""
+    files = commands = size = 0
+    total = 0.0
+    standard = [0.0, 0]
+    rerun = [0.0, 0]
+    clock = time.perf_counter
+    for text in texts:
+        start = clock()
+        runner = parse_commands(text)
+        total += clock() - start
+        files += 1
+        size += len(text)
+        commands += runner.count()
+
+        for name, content in _split_sections(text):
+            if '----------rerun:' in content:
+                match = _RERUN_RE.search(content)
+                if match:
+                    block = match.group(1).strip()
+                    start = clock()
+                    parse_rerun_block(block, name)
+                    rerun[0] += clock() - start
+                    rerun[1] += 1
+            elif 'Command is:' in content:
+                start = clock()
+                parse_standard_format(content, name)
+                standard[0] += clock() - start
+                standard[1] += 1
+
+    total = total or 1e-9
+    result = {
+        'parse.files': files,
+        'parse.commands': commands,
+        'parse.seconds': total,
+        'parse.files_per_s': files / total,
+        'parse.mb_per_s': size / 1e6 / total,
+        'parse.commands_per_s': commands / total,
+    }
+    if standard[1]:
+        result['parse.standard_us_per_section'] = standard[0] / standard[1] * 1e6
+    if rerun[1]:
+        result['parse.rerun_us_per_section'] = rerun[0] / rerun[1] * 1e6
+    return result
+
+
+def bench_memory(texts: Iterator[str]) -> Dict[str, float]:
+    """Memory retained by the parsed commands, per command"""
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        runners = [parse_commands(text) for text in texts]
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    commands = sum(runner.count() for runner in runners) or 1
+    return {
+        'memory.commands': commands,
+        'memory.bytes_per_command': (retained - baseline) / commands,
+        'memory.peak_mb': (peak - baseline) / 1e6,
+    }
+
+
+def bench_filter(texts: Iterator[str], patterns=FILTER_PATTERNS, repeat: int = 3) -> Dict[str, float]:
+    """Best-of-repeat latency of get_commands_by_name over every command of the corpus"""
+    runner = TestRunner()
+    for text in texts:
+        runner.commands.extend(parse_commands(text).commands)
+    result: Dict[str, float] = {'filter.commands': runner.count()}
+    timings = []
+    for pattern in patterns:
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            matched = runner.get_commands_by_name(pattern)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        result[f'filter.ms.{pattern}'] = best * 1e3
+        result[f'filter.matches.{pattern}'] = len(matched)
+        timings.append(best)
+    result['filter.ms_per_call'] = sum(timings) / len(timings) * 1e3
+    return result
+
+
+def write_stub(directory: str) -> str:
+    """An executable that exits immediately, standing in for the real tools"""
+    path = os.path.join(directory, 'ark')
+    with open(path, 'w') as f:
+        f.write("#!/bin/sh\nexit 0\n")
+    os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR)
+    return path
+
+
+def bench_spawn(count: int = 200, jobs: int = 1, env_vars: int = 6) -> Dict[str, float]:
+    """Commands per second through run_commands when the command itself costs nothing"""
+    with tempfile.TemporaryDirectory() as tmp:
+        stub = write_stub(tmp)
+        env = {f"SYNTH_VAR_{i}": str(i) for i in range(env_vars)}
+        commands = [Command(section="bench", command=f"{stub} --boot-panda-files=a.abc --run {i}",
+                            env_vars=env, directory=tmp) for i in range(count)]
+        start = time.perf_counter()
+        results = run_commands(commands, ExecutionOptions(timeout=60, jobs=jobs), keep_output=False)
+        elapsed = time.perf_counter() - start or 1e-9
+    failed = sum(1 for _, rc, _, _ in results if rc != 0)
+    return {
+        'spawn.commands': count,
+        'spawn.jobs': jobs,
+        'spawn.failed': failed,
+        'spawn.commands_per_s': count / elapsed,
+    }
+
+
+def run_benchmarks(benchmarks=BENCHMARKS, corpus_dir: Optional[str] = None, files: int = 1000,
+                   preset: str = 'mixed', seed: int = 0, memory_files: int = 500,
+                   spawn_count: int = 200, jobs: int = 1, log=None) -> Dict[str, object]:
+    """Run the selected benchmarks and return {'config': ..., 'metrics': ...}"""
+    metrics: Dict[str, float] = {}
+    for name in benchmarks:
+        if log:
+            log(f"Running {name}...")
+        if name == 'parse':
+            metrics.update(bench_parse(corpus_texts(corpus_dir, files, preset, seed)))
+        elif name == 'memory':
+            metrics.update(bench_memory(corpus_texts(corpus_dir, min(files, memory_files), preset, seed)))
+        elif name == 'filter':
+            metrics.update(bench_filter(corpus_texts(corpus_dir, files, preset, seed)))
+        elif name == 'spawn':
+            metrics.update(bench_spawn(spawn_count, jobs))
+        else:
+            raise ValueError(f"unknown benchmark: {name}")
+    config = {'corpus': corpus_dir or f"synthetic:{preset}", 'files': files, 'seed': seed,
+              'memory_files': memory_files, 'spawn_count': spawn_count, 'jobs': jobs,
+              'python': sys.version.split()[0]}
+    return {'config': config, 'metrics': metrics}
+
+
+def compare_results(current: Dict[str, object], baseline: Dict[str, object],
+                    threshold: float = DEFAULT_THRESHOLD) -> List[Tuple[str, float, float, float, bool]]:
+    """
+    (metric, baseline, current, change, regressed) for each tracked metric in both runs.
+
+    change is the relative change in the "better" direction, so a negative value is a
+    slowdown (or growth, for lower-is-better metrics); below -threshold it regresses.
+    """
+    rows = []
+    for name, (_, higher_is_better) in METRICS.items():
+        old = baseline['metrics'].get(name)
+        new = current['metrics'].get(name)
+        if not old or new is None:
+            continue
+        change = (new - old) / old if higher_is_better else (old - new) / old
+        rows.append((name, old, new, change, change < -threshold))
+    return rows
+
+
+def format_results(results: Dict[str, object]) -> str:
+    lines = []
+    for name, value in results['metrics'].items():
+        unit = METRICS.get(name, ('', True))[0]
+        number = f"{value:.0f}" if isinstance(value, int) or value >= 1000 else f"{value:.3f}"
+        lines.append(f"  {name:40} {number:>14} {unit}")
+    return "\n".join(lines)
+
+
+def format_comparison(rows: List[Tuple[str, float, float, float, bool]]) -> str:
+    lines = [f"  {'metric':40} {'baseline':>12} {'current':>12} {'change':>8}"]
+    for name, old, new, change, regressed in rows:
+        lines.append(f"  {name:40} {old:12.3f} {new:12.3f} {change:+7.1%}{'  REGRESSION' if regressed else ''}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark parse_jtr parsing, memory, filtering and command spawning.',
+        epilog='''Examples:
+  %(prog)s
+  %(prog)s --files 100000 --preset mixed --only parse,filter
+  %(prog)s --corpus examples/jtr --only parse,memory
+  %(prog)s --save bench_baseline.json
+  %(prog)s --baseline bench_baseline.json --threshold 0.2
+        ''',
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('--corpus', metavar='DIR', help='Benchmark .jtr files from DIR instead of a synthetic corpus')
+    parser.add_argument('--files', type=int, default=1000, help='Number of files (default: 1000)')
+    parser.add_argument('--preset', choices=sorted(jtr_corpus.PRESETS) + ['mixed'], default='mixed',
+                        help='Synthetic corpus preset (default: mixed)')
+    parser.add_argument('--seed', type=int, default=0, help='Synthetic corpus seed (default: 0)')
+    parser.add_argument('--only', metavar='LIST', default=','.join(BENCHMARKS),
+                        help=f'Comma-separated benchmarks to run (default: {",".join(BENCHMARKS)})')
+    parser.add_argument('--memory-files', type=int, default=500, metavar='N',
+                        help='Files held in memory by the memory benchmark (default: 500)')
+    parser.add_argument('--spawn-count', type=int, default=200, metavar='N',
+                        help='Stub commands run by the spawn benchmark (default: 200)')
+    parser.add_argument('-j', '--jobs', type=int, default=1, help='Workers for the spawn benchmark (default: 1)')
+    parser.add_argument('--save', metavar='FILE', help='Write the results as JSON')
+    parser.add_argument('--baseline', metavar='FILE', help='Compare with saved results; exit 1 on regression')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help=f'Allowed relative slowdown before a metric regresses (default: {DEFAULT_THRESHOLD})')
+    parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+
+    args = parser.parse_args()
+    benchmarks = [name.strip() for name in args.only.split(',') if name.strip()]
+    unknown = [name for name in benchmarks if name not in BENCHMARKS]
+    if unknown:
+        print(f"Error: unknown benchmark(s): {', '.join(unknown)}", file=sys.stderr)
+        sys.exit(1)
+    if args.corpus and not os.path.isdir(args.corpus):
+        print(f"Error: corpus directory not found: {args.corpus}", file=sys.stderr)
+        sys.exit(1)
+
+    baseline = None
+    if args.baseline:
+        try:
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error: cannot read baseline {args.baseline}: {e}", file=sys.stderr)
+            sys.exit(1)
+
+    log = None if args.json else lambda message: print(message, file=sys.stderr)
+    results = run_benchmarks(benchmarks, args.corpus, args.files, args.preset, args.seed,
+                             args.memory_files, args.spawn_count, args.jobs, log)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"Corpus: {results['config']['corpus']}")
+        print(format_results(results))
+
+    if baseline:
+        rows = compare_results(results, baseline, args.threshold)
+        if not args.json:
+            print(f"\nAgainst {args.baseline} (threshold {args.threshold:.0%}):")
+            print(format_comparison(rows))
+        regressions = [row[0] for row in rows if row[4]]
+        if regressions:
+            print(f"Regressed: {', '.join(regressions)}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Thin client for jtr_daemon.py.
+
+Sends one request over the daemon's UNIX socket and prints the streamed
+progress and the result. Uses only the standard library and does not import
+parse_jtr, so a call costs little more than interpreter startup. `run` exits
+with 1 if any command failed, which makes it usable as a bisect predicate.
+"""
+
+import argparse
+import json
+import os
+import socket
+import sys
+from typing import Callable, Dict, Optional
+
+
+def default_socket_path() -> str:
+    # Same default as jtr_daemon.default_socket_path, duplicated to keep this client import-free
+    if os.environ.get('JTR_DAEMON_SOCKET'):
+        return os.environ['JTR_DAEMON_SOCKET']
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR') or '/tmp'
+    return os.path.join(runtime_dir, f"jtr_daemon-{os.environ.get('USER', 'user')}.sock")
+
+
+class DaemonError(Exception):
+    """The daemon rejected a request"""
+
+
+def request(socket_path: str, message: Dict[str, object],
+            on_event: Optional[Callable[[Dict[str, object]], None]] = None) -> object:
+    """Send a request and return its result; progress events go to on_event"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        sock.sendall((json.dumps(message) + "\n").encode())
+        with sock.makefile('r', encoding='utf-8') as stream:
+            for line in stream:
+                reply = json.loads(line)
+                if 'event' in reply:
+                    if on_event:
+                        on_event(reply)
+                    continue
+                if not reply.get('ok'):
+                    raise DaemonError(reply.get('error', 'unknown error'))
+                return reply.get('result')
+    raise DaemonError("connection closed without a result")
+
+
+def _print_result_event(event: Dict[str, object], verbose: bool):
+    mark = "✓" if event['return_code'] == 0 else f"✗ ({event['return_code']})"
+    print(f"[{event['index']}/{event['total']}] {mark} {event['name']} {event['duration']:.2f}s  {event['test']}")
+    if verbose or event['return_code'] != 0:
+        for stream in ('stdout', 'stderr'):
+            if event[stream].strip():
+                print(event[stream].rstrip())
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Query and replay JTR corpora held by a running jtr_daemon.py.',
+        epilog='''Examples:
+  %(prog)s status
+  %(prog)s query --test "*StrictMath*" --name ark
+  %(prog)s run --test "*angrad*" "ark --gc-type=gen-gc ^--heap-verifier"
+  %(prog)s sweep "ark*" --axis "gc=--gc-type=g1-gc|--gc-type=gen-gc" --test "*angrad*"
+  %(prog)s load new_results/
+        ''',
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('--socket', default=default_socket_path(), help='Daemon socket path')
+    parser.add_argument('--json', action='store_true', help='Print the raw JSON result')
+    sub = parser.add_subparsers(dest='op', required=True)
+
+    sub.add_parser('status', help='Loaded tests and command names')
+    sub.add_parser('stop', help='Stop the daemon')
+    load = sub.add_parser('load', help='Ingest .jtr files or directories')
+    load.add_argument('paths', nargs='+')
+
+    def add_selection(p):
+        p.add_argument('--test', action='append', dest='tests', metavar='PATTERN',
+                       help='Test id or file path pattern (repeatable, default: all)')
+
+    def add_scheduling(p):
+        p.add_argument('-j', '--jobs', type=int, default=1, help='Parallel workers (default: 1)')
+        p.add_argument('--timeout', type=int, default=300, help='Timeout per command (default: 300)')
+        p.add_argument('--cpus', metavar='LIST', help='CPUs to run on')
+        p.add_argument('--reserve-cpus', type=int, default=0, metavar='N', help='CPUs reserved for --measure')
+        p.add_argument('--measure', metavar='PATTERN', help='Commands run alone on the reserved CPUs')
+        p.add_argument('--nice', type=int, metavar='N', help='Niceness increment')
+
+    query = sub.add_parser('query', help='List commands')
+    add_selection(query)
+    query.add_argument('--name', default='*', metavar='PATTERN', help='Command name pattern')
+    query.add_argument('--section', default='*', metavar='PATTERN', help='Section pattern')
+
+    run = sub.add_parser('run', help='Execute commands, like parse_jtr.py --run')
+    add_selection(run)
+    add_scheduling(run)
+    run.add_argument('specs', nargs='*', metavar='"cmd [args...]"', help='Run specs (default: all commands)')
+    run.add_argument('-v', '--verbose', action='store_true', help='Print output of passing commands too')
+
+    sweep = sub.add_parser('sweep', help='Flag-matrix sweep, like parse_jtr.py --sweep')
+    add_selection(sweep)
+    add_scheduling(sweep)
+    sweep.add_argument('pattern', help='Command name pattern the variants apply to')
+    sweep.add_argument('--axis', action='append', default=[], dest='axes', metavar='NAME=V1|V2|...')
+    sweep.add_argument('--sample', type=int, metavar='N')
+    sweep.add_argument('--seed', type=int, default=0)
+    sweep.add_argument('--sweep-workdir', dest='workdir', metavar='DIR')
+
+    args = parser.parse_args()
+    message = {k: v for k, v in vars(args).items() if k not in ('socket', 'json', 'verbose') and v is not None}
+    if args.op == 'load':
+        message['paths'] = [os.path.abspath(p) for p in args.paths]
+
+    on_event = None
+    if not args.json:
+        if args.op == 'run':
+            on_event = lambda event: _print_result_event(event, args.verbose)
+        elif args.op == 'sweep':
+            on_event = lambda event: print(f"[{event['done']}/{event['total']}] {event['status']:8} "
+                                           f"{event['duration']:8.2f}s  {event['variant']}  {event['test']}")
+
+    try:
+        result = request(args.socket, message, on_event)
+    except OSError as e:
+        print(f"Error: cannot reach daemon at {args.socket}: {e}", file=sys.stderr)
+        sys.exit(2)
+    except DaemonError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(2)
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    elif args.op == 'query':
+        for row in result:
+            print(f"{row['name']:20} {row['section']:20} {row['test']}")
+            print(f"    {row['command']}")
+        print(f"\n{len(result)} command(s)")
+    elif args.op == 'run':
+        print(f"\n{result['total'] - result['failed']}/{result['total']} succeeded")
+    elif args.op == 'sweep':
+        print("\n" + result['matrix'])
+    elif args.op == 'status':
+        print(f"pid {result['pid']}, up {result['uptime']}s, {result['tests']} test(s), "
+              f"{result['commands']} command(s)")
+        for name, count in result['command_names'].items():
+            print(f"  {count:6}  {name}")
+    elif args.op == 'load':
+        print(f"Loaded {len(result['loaded'])} file(s)")
+    else:
+        print(result)
+
+    if args.op == 'run' and result['failed']:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
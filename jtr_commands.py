@@ -0,0 +1,1210 @@
+"""
+Parsing and execution of the commands recorded in JTR files.
+
+The library behind parse_jtr.py: Command and TestRunner, the parsers for the
+standard and rerun section formats, and the batch executor with its scheduling
+options. Other tools import this module rather than the parse_jtr script.
+"""
+
+import re
+import subprocess
+import sys
+import os
+from typing import List, Dict, Optional, Tuple, Callable
+import shlex
+import shutil
+import threading
+import time
+import queue
+import fnmatch
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+
+from proc_monitor import ProcessTreeSampler, format_summary
+from cmd_argv import CommandLine, parse_flag_edit
+from perf_wrap import build_perf_args, parse_perf_stat_csv, perf_output_suffix, format_perf_counters
+from progress import ProgressDisplay
+
+
+SHELL_NAMES = {"bash", "sh"}
+SHELL_SEPARATORS = {";", "&&", "||"}
+ENV_ASSIGNMENT_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*=")
+IONICE_CLASSES = {"none": 0, "realtime": 1, "best-effort": 2, "idle": 3}
+
+
+def parse_cpu_list(spec: str) -> List[int]:
+    """
+    Parse a CPU set in taskset syntax.
+
+    Accepts a list form ("0-3,8,10-11") or a hex mask ("0x3F0", as used with
+    `taskset -a 3F0` on the device).
+    """
+    spec = spec.strip()
+    if not spec:
+        raise ValueError("empty CPU list")
+
+    if spec.lower().startswith('0x'):
+        mask = int(spec, 16)
+        return [bit for bit in range(mask.bit_length()) if mask & (1 << bit)]
+
+    cpus = set()
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            start, end = part.split('-', 1)
+            first, last = int(start), int(end)
+            if first > last:
+                raise ValueError(f"invalid CPU range '{part}'")
+            cpus.update(range(first, last + 1))
+        else:
+            cpus.add(int(part))
+    if not cpus:
+        raise ValueError(f"empty CPU list '{spec}'")
+    return sorted(cpus)
+
+
+def format_cpu_list(cpus) -> str:
+    """Format CPUs back into compact taskset list syntax (e.g. '0-3,8')."""
+    ranges = []
+    for cpu in sorted(set(cpus)):
+        if ranges and cpu == ranges[-1][1] + 1:
+            ranges[-1][1] = cpu
+        else:
+            ranges.append([cpu, cpu])
+    return ",".join(str(a) if a == b else f"{a}-{b}" for a, b in ranges)
+
+
+def parse_ionice(spec: str) -> Tuple[int, Optional[int]]:
+    """Parse an ionice spec "CLASS[:LEVEL]", where CLASS is a number or name (e.g. "idle", "2:7")."""
+    class_part, _, level_part = spec.partition(':')
+    class_part = class_part.strip().lower()
+    if class_part in IONICE_CLASSES:
+        io_class = IONICE_CLASSES[class_part]
+    else:
+        io_class = int(class_part)
+    if io_class not in IONICE_CLASSES.values():
+        raise ValueError(f"invalid ionice class '{class_part}'")
+    level = int(level_part) if level_part.strip() else None
+    if level is not None and not 0 <= level <= 7:
+        raise ValueError(f"ionice level must be in 0..7, got {level}")
+    return io_class, level
+
+
+class CpuAffinityPlan:
+    """
+    Distributes host cores between parallel workers.
+
+    The last `reserved` cores are kept aside for measurement runs, so timed
+    commands do not compete with the rest of the batch; the remaining cores
+    are split into contiguous, disjoint sets, one per worker.
+    """
+
+    def __init__(self, cpus: List[int], workers: int = 1, reserved: int = 0):
+        cpus = sorted(set(cpus))
+        if not cpus:
+            raise ValueError("no CPUs available for the affinity plan")
+        if reserved < 0 or reserved >= len(cpus):
+            raise ValueError(f"cannot reserve {reserved} of {len(cpus)} CPU(s): "
+                             "at least one core must stay available for workers")
+
+        self.cpus = cpus
+        self.measurement_cpus = cpus[len(cpus) - reserved:] if reserved else []
+        shared = cpus[:len(cpus) - reserved]
+        workers = max(1, workers)
+
+        self.worker_cpus: List[List[int]] = []
+        if workers >= len(shared):
+            # More workers than cores: each worker gets one core, cores are reused
+            for i in range(workers):
+                self.worker_cpus.append([shared[i % len(shared)]])
+        else:
+            chunk, extra = divmod(len(shared), workers)
+            start = 0
+            for i in range(workers):
+                size = chunk + (1 if i < extra else 0)
+                self.worker_cpus.append(shared[start:start + size])
+                start += size
+
+    def cpus_for_worker(self, worker: int) -> List[int]:
+        return self.worker_cpus[worker % len(self.worker_cpus)]
+
+    def cpus_for_measurement(self) -> List[int]:
+        """Cores for measurement runs; the first worker set (idle meanwhile) if none are reserved."""
+        return self.measurement_cpus or self.worker_cpus[0]
+
+    def __str__(self) -> str:
+        workers = ", ".join(format_cpu_list(c) for c in self.worker_cpus)
+        reserved = format_cpu_list(self.measurement_cpus) if self.measurement_cpus else "-"
+        return f"CpuAffinityPlan(workers=[{workers}], measurement={reserved})"
+
+
+class ExecutionOptions:
+    """Scheduling options shared by the batch executors"""
+
+    def __init__(self, timeout: int = 300, jobs: int = 1,
+                 affinity: Optional[CpuAffinityPlan] = None,
+                 measure_pattern: Optional[str] = None,
+                 nice: Optional[int] = None,
+                 ionice: Optional[Tuple[int, Optional[int]]] = None,
+                 monitor_dir: Optional[str] = None,
+                 monitor_interval: float = 0.1,
+                 perf_mode: Optional[str] = None,
+                 perf_pattern: str = '*',
+                 perf_dir: Optional[str] = None,
+                 perf_events: Optional[List[str]] = None,
+                 run_tag: Optional[str] = None):
+        self.timeout = timeout
+        self.jobs = max(1, jobs)
+        self.affinity = affinity
+        self.measure_pattern = measure_pattern
+        self.nice = nice
+        self.ionice = ionice
+        self.monitor_dir = monitor_dir
+        self.monitor_interval = monitor_interval
+        self.perf_mode = perf_mode
+        self.perf_pattern = perf_pattern
+        self.perf_dir = perf_dir
+        self.perf_events = perf_events
+        # Distinguishes the output files of repeated batches (e.g. --run-arg-cycle variants)
+        self.run_tag = run_tag
+
+    def output_name(self, index: int, cmd: 'Command', suffix: str) -> str:
+        """File name for per-command output: [tag_]index_name + suffix"""
+        name = re.sub(r'[^A-Za-z0-9_.-]', '_', cmd.get_command_name()) or "command"
+        tag = f"{self.run_tag}_" if self.run_tag else ""
+        return f"{tag}{index:05d}_{name}{suffix}"
+
+    def monitor_path(self, index: int, cmd: 'Command') -> Optional[str]:
+        """CSV path of the resource time series for the index-th command, if monitoring is on"""
+        if not self.monitor_dir:
+            return None
+        return os.path.join(self.monitor_dir, self.output_name(index, cmd, ".csv"))
+
+    def perf_output(self, index: int, cmd: 'Command') -> Optional[str]:
+        """perf output path for the index-th command, or None if it is not profiled"""
+        if not self.perf_mode or not fnmatch.fnmatch(cmd.get_command_name(), self.perf_pattern):
+            return None
+        return os.path.join(self.perf_dir or ".", self.output_name(index, cmd, perf_output_suffix(self.perf_mode)))
+
+    def is_measurement(self, cmd: 'Command') -> bool:
+        return bool(self.measure_pattern) and fnmatch.fnmatch(cmd.get_command_name(), self.measure_pattern)
+
+
+def _tokenize_shell_command(command_str: str) -> List[str]:
+    """Tokenize a shell-like command string respecting quotes and separators."""
+    if not command_str:
+        return []
+
+    lexer = shlex.shlex(command_str, posix=True, punctuation_chars=';&|')
+    lexer.whitespace_split = True
+    lexer.commenters = ''
+    return list(lexer)
+
+
+def _is_shell_token(token: str) -> bool:
+    base = os.path.basename(token)
+    return base in SHELL_NAMES
+
+
+def _is_env_assignment(token: str) -> bool:
+    return bool(ENV_ASSIGNMENT_RE.match(token))
+
+
+def _strip_leading_env(tokens: List[str]) -> List[str]:
+    stripped = list(tokens)
+    while stripped and _is_env_assignment(stripped[0]):
+        stripped.pop(0)
+    return stripped
+
+
+def _leading_env_assignments(tokens: List[str]) -> List[str]:
+    prefix = []
+    for token in tokens:
+        if _is_env_assignment(token):
+            prefix.append(token)
+        else:
+            break
+    return prefix
+
+
+def _strip_shell_wrapper(tokens: List[str]) -> List[str]:
+    tokens = list(tokens)
+    tokens = _strip_leading_env(tokens)
+    if not tokens:
+        return []
+
+    if _is_shell_token(tokens[0]):
+        tokens = tokens[1:]
+        while tokens and tokens[0].startswith('-'):
+            tokens.pop(0)
+        remainder = ' '.join(tokens).strip()
+        if not remainder:
+            return []
+        return _tokenize_shell_command(remainder)
+
+    return tokens
+
+
+def _find_real_command_token(tokens: List[str]) -> Optional[str]:
+    tokens = _strip_leading_env(tokens)
+    if not tokens:
+        return None
+
+    if _is_shell_token(tokens[0]):
+        return _find_real_command_token(_strip_shell_wrapper(tokens))
+
+    if tokens[0].lower() == 'echo':
+        return None
+
+    return tokens[0]
+
+
+def _expand_wrapped_command(tokens: List[str]) -> List[List[str]]:
+    """Expand shell wrappers (bash/sh) and return actual command token lists."""
+    remaining = list(tokens)
+    env_prefix = []
+    while remaining and _is_env_assignment(remaining[0]):
+        env_prefix.append(remaining.pop(0))
+
+    if not remaining:
+        return []
+
+    if _is_shell_token(remaining[0]):
+        remaining.pop(0)
+        while remaining and remaining[0].startswith('-'):
+            remaining.pop(0)
+        remainder = ' '.join(remaining).strip()
+        if not remainder:
+            return []
+        inner_tokens = _tokenize_shell_command(remainder)
+        inner_commands = _split_tokens_into_commands(inner_tokens)
+        expanded = []
+        for inner in inner_commands:
+            if inner:
+                expanded.append(env_prefix + inner)
+        return expanded
+
+    return [env_prefix + remaining]
+
+
+def _split_tokens_into_commands(tokens: List[str]) -> List[List[str]]:
+    commands = []
+    current = []
+    for token in tokens:
+        if token in SHELL_SEPARATORS:
+            if current:
+                commands.extend(_expand_wrapped_command(current))
+                current = []
+        else:
+            current.append(token)
+
+    if current:
+        commands.extend(_expand_wrapped_command(current))
+
+    return [cmd for cmd in commands if cmd]
+
+
+def _split_command_line(command_line: str) -> List[List[str]]:
+    tokens = _tokenize_shell_command(command_line)
+    return _split_tokens_into_commands(tokens)
+
+
+def _prefix_command_line(command_str: str, prefix: List[str]) -> str:
+    """
+    Run command_str under a wrapper program (e.g. ionice, perf).
+
+    Leading env assignments stay in front of the wrapper. Command lines that rely
+    on the shell (separators, pipes, expansions) are wrapped as `/bin/sh -c`.
+    """
+    wrapper = " ".join(shlex.quote(arg) for arg in prefix)
+    needs_shell = any(ch in command_str for ch in '$`|&;<>(){}*?')
+    if not needs_shell:
+        try:
+            tokens = _tokenize_shell_command(command_str)
+        except ValueError:
+            tokens = []
+        env_prefix = _leading_env_assignments(tokens)
+        rest = tokens[len(env_prefix):]
+        if rest:
+            env_words = [f"{name}={shlex.quote(value)}"
+                         for name, value in (assignment.split('=', 1) for assignment in env_prefix)]
+            return " ".join(env_words + [wrapper] + [shlex.quote(token) for token in rest])
+    return f"{wrapper} /bin/sh -c {shlex.quote(command_str)}"
+
+
+def build_commands_from_command_line(command_line: str, section: str,
+                                     env_vars: Dict[str, str],
+                                     directory: Optional[str]) -> List['Command']:
+    """Split a command line into separate Command objects for each real command."""
+    commands = []
+    tokenized_commands = _split_command_line(command_line)
+    env_prefix = _leading_env_assignments(tokenized_commands[0]) if tokenized_commands else []
+
+    for cmd_tokens in tokenized_commands:
+        cmd_tokens_with_env = list(cmd_tokens)
+        if env_prefix and not cmd_tokens_with_env:
+            continue
+        if env_prefix and not _is_env_assignment(cmd_tokens_with_env[0]):
+            cmd_tokens_with_env = env_prefix + cmd_tokens_with_env
+
+        real_token = _find_real_command_token(cmd_tokens_with_env)
+        if not real_token:
+            continue
+        if os.path.basename(real_token).lower() == 'echo':
+            continue
+
+        command_text = ' '.join(cmd_tokens_with_env).strip()
+        commands.append(
+            Command(
+                section=section,
+                command=command_text,
+                env_vars=dict(env_vars),
+                directory=directory
+            )
+        )
+
+    return commands
+
+
+class Command:
+    """Class representing a parsed command from test runner output"""
+    
+    def __init__(self, section: str, command: str, env_vars: Dict[str, str] = None, 
+                 directory: str = None, test_id: str = None):
+        self.section = section
+        self.command = command
+        self.env_vars = env_vars or {}
+        self.directory = directory
+        self.test_id = test_id
+        self._last_result = None
+        self._last_run_info: Dict[str, object] = {}
+    
+    def execute(self, timeout: int = 300, capture_output: bool = True,
+                cpus: Optional[List[int]] = None, nice: Optional[int] = None,
+                ionice: Optional[Tuple[int, Optional[int]]] = None,
+                monitor_interval: Optional[float] = None,
+                monitor_path: Optional[str] = None,
+                perf_mode: Optional[str] = None,
+                perf_output: Optional[str] = None,
+                perf_events: Optional[List[str]] = None) -> Tuple[int, str, str]:
+        """
+        Execute the command and return (return_code, stdout, stderr)
+        
+        Args:
+            timeout: Command timeout in seconds
+            capture_output: Whether to capture output or let it go to terminal
+            cpus: Pin the command (and its children) to these CPUs
+            nice: Niceness increment applied to the command
+            ionice: (class, level) I/O scheduling priority, applied via `ionice`
+            monitor_interval: Sample the process tree every N seconds (see proc_monitor)
+            monitor_path: CSV file for the sampled time series
+            perf_mode: Run under `perf stat` or `perf record`, writing to perf_output
+            perf_events: Events passed to perf with -e
+        
+        Returns:
+            Tuple of (return_code, stdout, stderr)
+        """
+        # Prepare environment
+        env = os.environ.copy()
+        env.update(self.env_vars)
+        
+        # Prepare working directory
+        cwd = self.directory if self.directory else None
+        
+        command_str = self.command
+        run_info: Dict[str, object] = {}
+        if perf_mode:
+            command_str = _prefix_command_line(command_str, build_perf_args(perf_mode, perf_output, perf_events))
+            run_info['perf'] = {'mode': perf_mode, 'output': perf_output}
+        if ionice is not None:
+            if shutil.which('ionice'):
+                io_class, io_level = ionice
+                ionice_args = ['ionice', '-c', str(io_class)]
+                if io_level is not None and io_class in (1, 2):
+                    ionice_args += ['-n', str(io_level)]
+                command_str = _prefix_command_line(command_str, ionice_args)
+                run_info['ionice'] = ionice
+            else:
+                run_info['ionice'] = None
+
+        # Affinity and niceness are applied by wrapper programs rather than a preexec_fn,
+        # which is unsafe with the worker threads of run_commands. The settings are
+        # inherited by the whole process tree; without the wrappers they are set on
+        # the child right after it is spawned.
+        pid_cpus = pid_nice = None
+        if nice:
+            if shutil.which('nice'):
+                command_str = _prefix_command_line(command_str, ['nice', '-n', str(nice)])
+            else:
+                pid_nice = nice
+        if cpus:
+            if shutil.which('taskset'):
+                command_str = _prefix_command_line(command_str, ['taskset', '-c', format_cpu_list(cpus)])
+            else:
+                pid_cpus = cpus
+        run_info['start'] = time.time()
+        start = time.monotonic()
+
+        try:
+            pipe = subprocess.PIPE if capture_output else None
+            process = subprocess.Popen(
+                command_str,
+                shell=True,
+                env=env,
+                cwd=cwd,
+                stdout=pipe,
+                stderr=pipe,
+                text=True
+            )
+            if pid_cpus:
+                os.sched_setaffinity(process.pid, pid_cpus)
+            if pid_nice:
+                os.setpriority(os.PRIO_PROCESS, process.pid, os.getpriority(os.PRIO_PROCESS, 0) + pid_nice)
+            sampler = None
+            if monitor_interval:
+                sampler = ProcessTreeSampler(process.pid, monitor_interval, monitor_path)
+                sampler.start()
+            try:
+                stdout, stderr = process.communicate(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.communicate()
+                raise
+            finally:
+                if sampler:
+                    sampler.stop()
+                    run_info['monitor'] = sampler.summary()
+            self._last_result = (process.returncode, stdout or "", stderr or "")
+                
+        except subprocess.TimeoutExpired:
+            error_msg = f"Command timed out after {timeout} seconds"
+            self._last_result = (-1, "", error_msg)
+        except Exception as e:
+            error_msg = f"Command execution failed: {str(e)}"
+            self._last_result = (-1, "", error_msg)
+        
+        run_info['duration'] = time.monotonic() - start
+        if perf_mode == 'stat':
+            try:
+                with open(perf_output, 'r') as f:
+                    run_info['perf']['counters'] = parse_perf_stat_csv(f.read())
+            except OSError:
+                run_info['perf']['counters'] = {}
+        if cpus:
+            run_info['cpus'] = sorted(cpus)
+        run_info['nice'] = nice or 0
+        self._last_run_info = run_info
+
+        return self._last_result
+    
+    def get_last_result(self) -> Optional[Tuple[int, str, str]]:
+        """Get the result of the last execution"""
+        return self._last_result
+
+    def get_last_run_info(self) -> Dict[str, object]:
+        """Get details of the last execution (cpus, nice, ionice, duration, monitor summary, perf)"""
+        return self._last_run_info
+    
+    def is_success(self) -> bool:
+        """Check if the last execution was successful"""
+        return self._last_result is not None and self._last_result[0] == 0
+    
+    def get_command_name(self) -> str:
+        """Extract a representative command name, unwrapping shell helpers."""
+        command_str = self.command.strip()
+        if not command_str:
+            return ""
+
+        tokens = _tokenize_shell_command(command_str)
+        real_token = _find_real_command_token(tokens)
+
+        def _format_name(token: str) -> str:
+            if '/' in token:
+                return token.split('/')[-1]
+            return token
+
+        if real_token:
+            return _format_name(real_token)
+
+        fallback_parts = command_str.split()
+        if not fallback_parts:
+            return ""
+        return _format_name(fallback_parts[0])
+    
+    def to_bash_string(self) -> str:
+        """Generate bash command string"""
+        parts = []
+        
+        # Add directory change if specified
+        if self.directory:
+            parts.append(f"cd {self.directory}")
+        
+        # Add environment variables and command
+        env_prefix = ""
+        if self.env_vars:
+            env_parts = []
+            for var, value in self.env_vars.items():
+                env_parts.append(f"{var}={value}")
+            env_prefix = " ".join(env_parts) + " "
+        
+        command_line = f"{env_prefix}{self.command}"
+        parts.append(command_line)
+        
+        return " && ".join(parts) if len(parts) > 1 else parts[0]
+    
+    def __str__(self) -> str:
+        cmd_name = self.get_command_name()
+        return f"Command(name='{cmd_name}', section='{self.section}', cmd='{self.command[:50]}...', env_vars={len(self.env_vars)}, dir='{self.directory}')"
+    
+    def __repr__(self) -> str:
+        return self.__str__()
+
+
+CommandResult = Tuple[Command, int, str, str]
+
+
+def run_commands(commands: List[Command], options: Optional[ExecutionOptions] = None,
+                 capture_output: bool = True,
+                 on_start: Optional[Callable[[int, Command], None]] = None,
+                 on_complete: Optional[Callable[[int, CommandResult], None]] = None,
+                 keep_output: bool = True) -> List[CommandResult]:
+    """
+    Execute commands according to the scheduling options.
+
+    With jobs > 1 commands run on a pool of workers, each pinned to its own CPU
+    set when an affinity plan is given. Commands matching the measurement pattern
+    are serialized: on the reserved cores if there are any, otherwise they take
+    every worker slot so nothing else runs alongside them. Callbacks receive the 1-based index of
+    the command and are never called concurrently. Results keep the input order.
+    With keep_output=False, stdout and stderr are dropped once on_complete has
+    seen them, so memory does not grow with the output of long runs.
+    """
+    options = options or ExecutionOptions()
+    plan = options.affinity
+    report_lock = threading.Lock()
+    measurement_lock = threading.Lock()
+    worker_slots: 'queue.Queue[int]' = queue.Queue()
+    for slot in range(options.jobs):
+        worker_slots.put(slot)
+
+    def _run(index: int, cmd: Command) -> CommandResult:
+        if options.is_measurement(cmd):
+            with measurement_lock:
+                cpus = plan.cpus_for_measurement() if plan else None
+                if plan and plan.measurement_cpus:
+                    return _execute(index, cmd, cpus)
+                # No reserved cores: wait until every worker is idle and keep them idle
+                slots = [worker_slots.get() for _ in range(options.jobs)]
+                try:
+                    return _execute(index, cmd, cpus)
+                finally:
+                    for slot in slots:
+                        worker_slots.put(slot)
+
+        slot = worker_slots.get()
+        try:
+            cpus = plan.cpus_for_worker(slot) if plan else None
+            return _execute(index, cmd, cpus)
+        finally:
+            worker_slots.put(slot)
+
+    def _execute(index: int, cmd: Command, cpus: Optional[List[int]]) -> CommandResult:
+        if on_start:
+            with report_lock:
+                on_start(index, cmd)
+        monitor_path = options.monitor_path(index, cmd)
+        perf_output = options.perf_output(index, cmd)
+        if perf_output:
+            os.makedirs(os.path.dirname(perf_output), exist_ok=True)
+        return_code, stdout, stderr = cmd.execute(timeout=options.timeout, capture_output=capture_output,
+                                                  cpus=cpus, nice=options.nice, ionice=options.ionice,
+                                                  monitor_interval=options.monitor_interval if monitor_path else None,
+                                                  monitor_path=monitor_path,
+                                                  perf_mode=options.perf_mode if perf_output else None,
+                                                  perf_output=perf_output,
+                                                  perf_events=options.perf_events)
+        result = (cmd, return_code, stdout, stderr)
+        if on_complete:
+            with report_lock:
+                on_complete(index, result)
+        if not keep_output:
+            cmd._last_result = (return_code, "", "")
+            result = (cmd, return_code, "", "")
+        return result
+
+    if options.jobs == 1:
+        return [_run(i, cmd) for i, cmd in enumerate(commands, 1)]
+
+    with ThreadPoolExecutor(max_workers=options.jobs) as pool:
+        futures = [pool.submit(_run, i, cmd) for i, cmd in enumerate(commands, 1)]
+        return [future.result() for future in futures]
+
+
+def describe_run_info(cmd: Command) -> str:
+    """Short human-readable description of where and how a command was run"""
+    return format_run_info(cmd.get_last_run_info())
+
+
+def format_run_info(info: Dict[str, object]) -> str:
+    """Format a run info dict (see Command.get_last_run_info) as one line"""
+    if not info:
+        return ""
+    parts = []
+    if info.get('cpus'):
+        parts.append(f"cpus: {format_cpu_list(info['cpus'])}")
+    if info.get('nice'):
+        parts.append(f"nice: {info['nice']}")
+    if 'ionice' in info:
+        io = info['ionice']
+        parts.append(f"ionice: {io[0]}" + (f":{io[1]}" if io[1] is not None else "") if io else "ionice: unavailable")
+    parts.append(f"time: {info.get('duration', 0.0):.2f}s")
+    if info.get('monitor'):
+        parts.append(format_summary(info['monitor']))
+    perf = info.get('perf')
+    if perf:
+        if perf.get('counters'):
+            parts.append(f"perf: {format_perf_counters(perf['counters'])}")
+        else:
+            parts.append(f"perf {perf['mode']}: {perf['output']}")
+    return ", ".join(parts)
+
+
+class TestRunner:
+    """Class for managing parsed test runner commands"""
+    
+    def __init__(self, commands: List[Command] = None, test_id: str = None):
+        self.commands = commands or []
+        self.test_id = test_id
+    
+    def add_command(self, command: Command):
+        """Add a command to the test runner"""
+        self.commands.append(command)
+    
+    def get_commands(self) -> List[Command]:
+        """Get all commands"""
+        return self.commands
+    
+    def get_commands_by_section(self, section_pattern: str) -> List[Command]:
+        """Get commands that match a section pattern"""
+        return [cmd for cmd in self.commands if fnmatch.fnmatch(cmd.section, section_pattern)]
+    
+    def get_commands_by_name(self, name_pattern: str) -> List[Command]:
+        """Get commands that match a command name pattern (e.g., 'ark', 'java')"""
+        return [cmd for cmd in self.commands if fnmatch.fnmatch(cmd.get_command_name(), name_pattern)]
+    
+    def get_sections(self) -> List[str]:
+        """Get all unique section names"""
+        return list(set(cmd.section for cmd in self.commands))
+    
+    def get_command_names(self) -> List[str]:
+        """Get all unique command names"""
+        return list(set(cmd.get_command_name() for cmd in self.commands))
+    
+    def count(self) -> int:
+        """Get total number of commands"""
+        return len(self.commands)
+    
+    def execute_all(self, timeout: int = 300, capture_output: bool = True, raw_output: bool = False,
+                    options: Optional[ExecutionOptions] = None,
+                    exporters: Optional[List[object]] = None, progress: bool = False,
+                    progress_interval: Optional[float] = None) -> List[Tuple[Command, int, str, str]]:
+        """
+        Execute all commands and return results
+
+        Args:
+            options: Scheduling options (parallel jobs, CPU affinity, nice/ionice).
+                     When given, its timeout takes precedence over `timeout`.
+            exporters: Result exporters (see result_export) fed as commands complete.
+                       Output is then not kept in the returned results.
+            progress: Show a live progress view (see progress) instead of per-command lines
+        
+        Returns:
+            List of tuples (command, return_code, stdout, stderr)
+        """
+        def conditional_print_local(*args_print, **kwargs):
+            """Print only if not in raw output mode"""
+            if not raw_output:
+                print(*args_print, **kwargs)
+        
+        options = options or ExecutionOptions(timeout=timeout)
+        parallel = options.jobs > 1
+        display = None
+        if progress and not raw_output:
+            display = ProgressDisplay(self.commands, options.jobs, interval=progress_interval)
+
+        conditional_print_local("\n=== Executing All Commands ===")
+        if parallel:
+            conditional_print_local(f"Running on {options.jobs} workers")
+        if options.affinity:
+            conditional_print_local(f"Affinity: {options.affinity}")
+        
+        def on_start(i, cmd):
+            if display:
+                display.start(i, cmd)
+                return
+            conditional_print_local(f"\n{i}. Executing section: {cmd.section}")
+            conditional_print_local(f"   Command: {cmd.to_bash_string()}")
+            
+        def on_complete(i, result):
+            cmd, return_code, stdout, stderr = result
+            for exporter in exporters or []:
+                exporter.add(i, cmd, return_code, stdout, stderr)
+            if display:
+                display.complete(i, cmd, return_code)
+                if return_code != 0:
+                    display.log(f"✗ {i}. {cmd.get_command_name()} ({cmd.section}): code {return_code}")
+                return
+            # In raw output mode, output is already forwarded, so no need to print results
+            if raw_output:
+                return
+            if parallel:
+                conditional_print_local(f"\n{i}. Finished section: {cmd.section}")
+            if return_code == 0:
+                conditional_print_local("   ✓ Success")
+            else:
+                conditional_print_local(f"   ✗ Failed (return code: {return_code})")
+                if stderr:
+                    conditional_print_local(f"   Error: {stderr}")
+            if options.affinity or options.nice or options.ionice or options.monitor_dir or options.perf_mode:
+                conditional_print_local(f"   Run: {describe_run_info(cmd)}")
+            
+        with display or contextlib.nullcontext():
+            results = run_commands(self.commands, options, capture_output=capture_output,
+                                   on_start=on_start, on_complete=on_complete, keep_output=not exporters)
+        
+        # Summary
+        if not raw_output:
+            successful = sum(1 for _, rc, _, _ in results if rc == 0)
+            failed = len(results) - successful
+            
+            conditional_print_local("\n=== Execution Summary ===")
+            conditional_print_local(f"Total commands: {len(results)}")
+            conditional_print_local(f"Successful: {successful}")
+            conditional_print_local(f"Failed: {failed}")
+            
+            if failed > 0:
+                conditional_print_local("\nFailed commands:")
+                for cmd, rc, stdout, stderr in results:
+                    if rc != 0:
+                        conditional_print_local(f"- {cmd.get_command_name()} ({cmd.section}): code {rc}")
+        
+        return results
+    
+    def execute_interactively(self, raw_output: bool = False):
+        """Execute commands interactively with user prompts"""
+        def conditional_print_local(*args_print, **kwargs):
+            """Print only if not in raw output mode"""
+            if not raw_output:
+                print(*args_print, **kwargs)
+        
+        conditional_print_local("\n=== Interactive Command Execution ===")
+        
+        for i, cmd in enumerate(self.commands, 1):
+            conditional_print_local(f"\n{i}. Section: {cmd.section}")
+            conditional_print_local(f"   Command: {cmd.to_bash_string()}")
+            
+            while True:
+                if raw_output:
+                    # In raw output mode, just execute without prompts
+                    return_code, stdout, stderr = cmd.execute(capture_output=False)
+                    break
+                
+                choice = input("Execute? (y/n/s/q) [y=yes, n=no, s=show details, q=quit]: ").lower().strip()
+                
+                if choice == 'q':
+                    conditional_print_local("Quitting...")
+                    return
+                elif choice == 'n':
+                    conditional_print_local("Skipped.")
+                    break
+                elif choice == 's':
+                    conditional_print_local(f"   Section: {cmd.section}")
+                    conditional_print_local(f"   Command: {cmd.command}")
+                    conditional_print_local(f"   Env vars: {cmd.env_vars}")
+                    conditional_print_local(f"   Directory: {cmd.directory}")
+                    continue
+                elif choice in ['y', '']:
+                    conditional_print_local("Executing...")
+                    return_code, stdout, stderr = cmd.execute()
+                    
+                    conditional_print_local(f"Return code: {return_code}")
+                    if stdout:
+                        conditional_print_local("STDOUT:")
+                        conditional_print_local(stdout)
+                    if stderr:
+                        conditional_print_local("STDERR:")
+                        conditional_print_local(stderr)
+                    
+                    if cmd.is_success():
+                        conditional_print_local("✓ Command completed successfully")
+                    else:
+                        conditional_print_local("✗ Command failed")
+                    break
+                else:
+                    conditional_print_local("Invalid choice. Please enter y, n, s, or q.")
+    
+    def to_bash_script(self) -> str:
+        """Generate bash script from all commands"""
+        script_lines = ["#!/bin/bash", ""]
+        
+        for cmd in self.commands:
+            script_lines.append(f"# Section: {cmd.section}")
+            script_lines.append(cmd.to_bash_string())
+            script_lines.append("")  # Empty line for readability
+        
+        return "\n".join(script_lines)
+    
+    def print_info(self):
+        """Print information about all commands"""
+        print("\n=== Parsed Commands ===")
+        for i, cmd in enumerate(self.commands, 1):
+            print(f"\n{i}. {cmd}")
+            print(f"   Bash: {cmd.to_bash_string()}")
+        
+        print(f"\n=== Summary ===")
+        print(f"Total commands: {self.count()}")
+        print(f"Sections: {self.get_sections()}")
+        print(f"Command names: {self.get_command_names()}")
+        
+        print(f"\n=== Usage ===")
+        print("You can now work with TestRunner and Command objects:")
+        print("- runner.execute_all() - Execute all commands")
+        print("- runner.execute_interactively() - Execute commands interactively")
+        print("- runner.get_commands_by_section('pattern') - Filter commands by section")
+        print("- runner.get_commands_by_name('pattern') - Filter commands by name")
+        print("- runner.to_bash_script() - Generate bash script")
+        print("- cmd.get_command_name() - Get command name (e.g., 'ark')")
+        print("- cmd.execute() - Execute individual command")
+    
+    def __len__(self) -> int:
+        return len(self.commands)
+    
+    def __iter__(self):
+        return iter(self.commands)
+    
+    def __getitem__(self, index):
+        return self.commands[index]
+
+
+def parse_test_id(text) -> Optional[str]:
+    """Extract the test id (the `test=` property of the test result), e.g. 'api/java_lang/StrictMath/index.html#angrad'"""
+    match = re.search(r'^test=(.*)$', text, re.MULTILINE)
+    if not match:
+        return None
+    # JTR properties escape ':', '=' and '#' with a backslash
+    return re.sub(r'\\(.)', r'\1', match.group(1).strip())
+
+
+def parse_commands(text, test_id: Optional[str] = None) -> TestRunner:
+    """Parse test runner output and extract all commands as TestRunner object"""
+    runner = TestRunner(test_id=test_id or parse_test_id(text))
+    
+    # Find all sections
+    sections = re.split(r'#section:([^\n]+)', text)
+    
+    for i in range(1, len(sections), 2):
+        section_name = sections[i].strip()
+        section_content = sections[i + 1] if i + 1 < len(sections) else ""
+        
+        if '----------rerun:' in section_content:
+            # Parse section with rerun block
+            # Handle cases where rerun line has additional info: ----------rerun:(25/7222)*----------
+            rerun_match = re.search(r'----------rerun:.*?----------(.*?)----------', section_content, re.DOTALL)
+            if rerun_match:
+                rerun_content = rerun_match.group(1).strip()
+                command = parse_rerun_block(rerun_content, section_name)
+                if command:
+                    runner.add_command(command)
+        
+        elif 'Command is:' in section_content:
+            # Parse standard format sections
+            commands = parse_standard_format(section_content, section_name)
+            for command in commands:
+                runner.add_command(command)
+
+    for command in runner.commands:
+        command.test_id = runner.test_id
+    
+    return runner
+
+
+def parse_rerun_block(rerun_content, section_name) -> Optional[Command]:
+    """Parse rerun block from compile section and return Command object"""
+    lines = rerun_content.split('\n')
+    env_vars = {}
+    cmd_parts = []
+    current_dir = None
+    
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+            
+        # Remove trailing backslashes
+        if line.endswith('\\\\'):
+            line = line[:-2].strip()
+        
+        # Check for cd command
+        if line.startswith('cd '):
+            current_dir = line.split(' ', 1)[1].rstrip(' &&')
+        # Check for environment variables (format: VAR=value, but not command arguments)
+        elif ('=' in line and not line.startswith('/') and not line.startswith('-') 
+              and ' ' not in line.split('=')[0] and not cmd_parts):
+            var, value = line.split('=', 1)
+            env_vars[var.strip()] = value.strip()
+        # Check for command parts
+        elif line.startswith('/') or (cmd_parts and not line.startswith('cd')) or (not cmd_parts and not line.startswith('cd') and '=' not in line):
+            cmd_parts.append(line)
+    
+    if cmd_parts:
+        command_str = ' '.join(cmd_parts)
+        return Command(
+            section=section_name,
+            command=command_str,
+            env_vars=env_vars,
+            directory=current_dir
+        )
+    
+    return None
+
+
+def parse_standard_format(section_content, section_name) -> List[Command]:
+    """Parse standard format sections and return Command objects."""
+    command_str = None
+    env_vars = {}
+    directory = None
+    command_lines: List[str] = []
+
+    lines = section_content.split('\n')
+    i = 0
+
+    while i < len(lines):
+        line = lines[i].strip()
+
+        if line.startswith('command:'):
+            command_lines.append(line.replace('command:', '', 1).strip())
+
+        if line.startswith('Command is:'):
+            command_str = line.replace('Command is:', '').strip()
+
+        elif line == 'Command environment is:':
+            # Read environment variables until we hit another section or empty line
+            i += 1
+            while i < len(lines):
+                env_line = lines[i].strip()
+                if not env_line or env_line.startswith('Execution directory is:'):
+                    break
+                if ENV_ASSIGNMENT_RE.match(env_line):
+                    var, value = env_line.split('=', 1)
+                    env_vars[var.strip()] = value.strip()
+                else:
+                    break
+                i += 1
+            i -= 1  # Adjust for the outer loop increment
+
+        elif line.startswith('Execution directory is:'):
+            directory = line.replace('Execution directory is:', '').strip()
+
+        i += 1
+
+    commands: List[Command] = []
+
+    if command_str:
+        sources = [command_str]
+    else:
+        sources = command_lines
+
+    for source in sources:
+        commands.extend(build_commands_from_command_line(source, section_name, env_vars, directory))
+
+    if not commands and command_str:
+        commands.append(
+            Command(
+                section=section_name,
+                command=command_str,
+                env_vars=env_vars,
+                directory=directory
+            )
+        )
+
+    return commands
+
+
+def with_extra_args(cmd: Command, extra_args: str, name_pattern: Optional[str] = None) -> Command:
+    """
+    Return a copy of cmd with user-provided arguments applied to its executable.
+
+    Options replace existing occurrences in place (e.g. `--gc-type=gen-gc` replaces
+    `--gc-type=g1-gc`), `^--name` removes an option and other arguments are inserted
+    right after the executable. Inside shell wrappers the arguments go to the simple
+    commands matching name_pattern, by default the command reported by get_command_name.
+    """
+    command_line = CommandLine.parse(cmd.command)
+    targets = command_line.find(name_pattern) if name_pattern else []
+    if not targets:
+        targets = command_line.find(cmd.get_command_name())[:1] or [command_line.primary()]
+
+    args = shlex.split(extra_args)
+    for target in targets:
+        target.apply_args(args)
+
+    return Command(
+        section=cmd.section,
+        command=command_line.to_string(),
+        env_vars=cmd.env_vars,
+        directory=cmd.directory,
+        test_id=cmd.test_id
+    )
+
+
+def apply_flag_edits(runner: TestRunner, set_flags: List[str], drop_flags: List[str],
+                     warn: Optional[Callable[[str], None]] = None) -> int:
+    """
+    Apply --set-flag/--drop-flag edits ("PATTERN:--flag[=value]") to all commands of the
+    runner in place; returns the number of commands changed.
+
+    Commands that cannot be parsed (e.g. a bare `VAR=value` line) are left as they
+    are; `warn` is told about those whose name matches one of the edit patterns.
+    """
+    edits = [('set', *parse_flag_edit(spec)) for spec in set_flags]
+    edits += [('drop', *parse_flag_edit(spec)) for spec in drop_flags]
+    changed = 0
+    for cmd in runner.commands:
+        try:
+            command_line = CommandLine.parse(cmd.command)
+        except ValueError as e:
+            if warn and any(fnmatch.fnmatch(cmd.get_command_name(), pattern) for _, pattern, _ in edits):
+                warn(f"Warning: flag edits skip '{cmd.command}' ({cmd.section}): {e}")
+            continue
+        modified = False
+        for action, pattern, flag in edits:
+            name, eq, value = flag.partition('=')
+            for target in command_line.find(pattern):
+                if action == 'set':
+                    target.set_option(name, value if eq else None)
+                    modified = True
+                elif target.remove_option(name):
+                    modified = True
+        if modified:
+            cmd.command = command_line.to_string()
+            changed += 1
+    return changed
+
+
+def execute_commands_by_names(runner: TestRunner, command_specs: List[Tuple[str, str]], raw_output: bool = False,
+                              options: Optional[ExecutionOptions] = None, exporters: Optional[List[object]] = None,
+                              progress: bool = False, progress_interval: Optional[float] = None):
+    """Execute specific commands by their names in order"""
+    def conditional_print_local(*args_print, **kwargs):
+        """Print only if not in raw output mode"""
+        if not raw_output:
+            print(*args_print, **kwargs)
+    
+    if not command_specs:
+        conditional_print_local("Error: No command names specified for --run option", file=sys.stderr)
+        sys.exit(1)
+    
+    def format_spec(p, a):
+        return f'"{p} {a}"'.strip() if a else p
+        
+    conditional_print_local(f"\n=== Executing Commands by Names ===")
+    conditional_print_local(f"Requested commands: {', '.join([format_spec(p, a) for p, a in command_specs])}")
+    
+    # Find commands for each name (supporting patterns)
+    commands_to_execute = []
+    for name_pattern, extra_args in command_specs:
+        matching_commands = runner.get_commands_by_name(name_pattern)
+        if not matching_commands:
+            conditional_print_local(f"Warning: No commands found matching pattern '{name_pattern}'")
+        else:
+            conditional_print_local(f"Pattern '{name_pattern}' matched {len(matching_commands)} command(s):")
+            if extra_args:
+                conditional_print_local(f"   ... with extra args: '{extra_args}'")
+            
+            for cmd in matching_commands:
+                conditional_print_local(f"   - {cmd.get_command_name()} ({cmd.section})")
+                
+                if extra_args:
+                    commands_to_execute.append(with_extra_args(cmd, extra_args))
+                else:
+                    commands_to_execute.append(cmd)
+    
+    if not commands_to_execute:
+        conditional_print_local("No commands to execute", file=sys.stderr)
+        sys.exit(1)
+    
+    options = options or ExecutionOptions()
+    parallel = options.jobs > 1
+    if parallel:
+        conditional_print_local(f"\nExecuting {len(commands_to_execute)} command(s) on {options.jobs} workers...")
+    else:
+        conditional_print_local(f"\nExecuting {len(commands_to_execute)} command(s) in order...")
+    if options.affinity:
+        conditional_print_local(f"Affinity: {options.affinity}")
+    display = None
+    if progress and not raw_output:
+        display = ProgressDisplay(commands_to_execute, options.jobs, interval=progress_interval)
+    
+    def on_start(i, cmd):
+        if display:
+            display.start(i, cmd)
+            return
+        conditional_print_local(f"\n{i}. Executing: {cmd.get_command_name()} (section: {cmd.section})")
+        conditional_print_local(f"   Command: {cmd.to_bash_string()}")
+        
+    def on_complete(i, result):
+        cmd, return_code, stdout, stderr = result
+        for exporter in exporters or []:
+            exporter.add(i, cmd, return_code, stdout, stderr)
+        if display:
+            display.complete(i, cmd, return_code)
+            if return_code != 0:
+                display.log(f"✗ {i}. {cmd.get_command_name()} ({cmd.section}): code {return_code}")
+            return
+        # In raw output mode, output is already forwarded, so no need to print results
+        if raw_output:
+            return
+        if parallel:
+            conditional_print_local(f"\n{i}. Finished: {cmd.get_command_name()} (section: {cmd.section})")
+        if return_code == 0:
+            conditional_print_local("   ✓ Success")
+        else:
+            conditional_print_local(f"   ✗ Failed (return code: {return_code})")
+            if stderr:
+                conditional_print_local(f"   Error: {stderr}")
+        if options.affinity or options.nice or options.ionice or options.monitor_dir or options.perf_mode:
+            conditional_print_local(f"   Run: {describe_run_info(cmd)}")
+        
+    # Execute commands in order
+    with display or contextlib.nullcontext():
+        results = run_commands(commands_to_execute, options, capture_output=not raw_output,
+                               on_start=on_start, on_complete=on_complete, keep_output=not exporters)
+    
+    # Summary
+    if not raw_output:
+        successful = sum(1 for _, rc, _, _ in results if rc == 0)
+        failed = len(results) - successful
+        
+        conditional_print_local("\n=== Execution Summary ===")
+        conditional_print_local(f"Total executed: {len(results)}")
+        conditional_print_local(f"Successful: {successful}")
+        conditional_print_local(f"Failed: {failed}")
+        
+        if failed > 0:
+            conditional_print_local("\nFailed commands:")
+            for cmd, rc, stdout, stderr in results:
+                if rc != 0:
+                    conditional_print_local(f"- {cmd.get_command_name()} ({cmd.section}): code {rc}")
+
+
+def parse_run_specs(run_specs_list: List[str]) -> List[Tuple[str, str]]:
+    """Parse a list of run spec strings into (name_pattern, extra_args) tuples."""
+    command_specs = []
+    for spec in run_specs_list:
+        parts = spec.strip().split(maxsplit=1)
+        name_pattern = parts[0]
+        extra_args = parts[1] if len(parts) > 1 else ""
+        command_specs.append((name_pattern, extra_args))
+    return command_specs
@@ -0,0 +1,297 @@
+"""
+Synthetic JTR corpus generator.
+
+Writes .jtr files modeled on examples/jtr: a JCK-style header, a c2abc section,
+a `bash -ce` section chaining ark_aot/ark invocations and, optionally,
+jtreg-style `----------rerun:` sections (cd, env assignments and a
+backslash-continued command). The size knobs cover the shapes that stress
+parse_jtr: long `bash -ce` chains, large out1 logs and many environment
+variables. Generation is deterministic for a given seed, and each file
+records how many commands parse_commands should find in it, which makes the
+corpus usable both for benchmarks (jtr_bench.py) and for correctness checks.
+"""
+
+import argparse
+import os
+import random
+import sys
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+ARK_HOME = "/media/share/panda/aosp/out/panda/root_fs/host/debug"
+SUITE_ROOT = "/media/share/panda/jck_local"
+BOOT_FILES = ":".join(f"{ARK_HOME}/libcore/{jar}.jar" for jar in
+                      ("core-oj", "core-libart", "okhttp", "bouncycastle", "conscrypt", "apache-xml", "core-icu4j"))
+PACKAGES = ("java_lang/StrictMath", "java_util/concurrent/atomic", "java_lang/annotation", "java_io/File",
+            "java_net/URI", "java_util/regex", "java_text/Format", "java_math/BigDecimal")
+FILES_PER_DIR = 1000
+
+# Marker line with the expected command count, placed in the testdescription block
+EXPECTED_KEY = "syntheticCommands"
+
+
+class CorpusOptions:
+    """Size knobs of a generated corpus"""
+
+    def __init__(self, chain: int = 2, out1_lines: int = 10, env_vars: int = 6, rerun_sections: int = 0,
+                 rerun_args: int = 8):
+        self.chain = chain
+        self.out1_lines = out1_lines
+        self.env_vars = env_vars
+        self.rerun_sections = rerun_sections
+        self.rerun_args = rerun_args
+
+    def to_dict(self) -> Dict[str, int]:
+        return dict(vars(self))
+
+
+# Named presets; `mixed` varies the shape per file
+PRESETS: Dict[str, CorpusOptions] = {
+    'small': CorpusOptions(chain=2, out1_lines=10, env_vars=6),
+    'chains': CorpusOptions(chain=12, out1_lines=10, env_vars=6),
+    'logs': CorpusOptions(chain=2, out1_lines=1000, env_vars=6),
+    'env': CorpusOptions(chain=2, out1_lines=10, env_vars=200),
+    'rerun': CorpusOptions(chain=1, out1_lines=10, env_vars=6, rerun_sections=3, rerun_args=24),
+}
+
+
+def _test_names(rng: random.Random, index: int) -> Tuple[str, str, str]:
+    package = PACKAGES[index % len(PACKAGES)]
+    test = f"test{index:06d}{rng.choice('abcdefgh')}"
+    klass = f"javasoft.sqe.tests.api.{package.replace('_', '.').replace('/', '.')}.{test}Tests"
+    return package, test, klass
+
+
+def _env_block(rng: random.Random, count: int) -> List[str]:
+    lines = [f"LD_LIBRARY_PATH=/usr/lib:{ARK_HOME}/lib:{ARK_HOME}/libcore_lib",
+             f"ANDROID_DATA={ARK_HOME}/sysroot/data",
+             f"ANDROID_TZDATA_ROOT={ARK_HOME}/sysroot",
+             f"ANDROID_I18N_ROOT={ARK_HOME}/sysroot",
+             f"ICU_DATA={ARK_HOME}/sysroot/etc/icu",
+             "TSAN_OPTIONS="]
+    for i in range(len(lines), count):
+        lines.append(f"SYNTH_VAR_{i}={'/opt/synth' if i % 3 else ''}{rng.randrange(1 << 30):x}")
+    return lines[:count]
+
+
+def _chain(test: str, klass: str, length: int) -> List[str]:
+    """Tool invocations of a `bash -ce` line: alternating ark_aot/ark, each with its flags"""
+    tools = []
+    for step in range(length):
+        if step % 2 == 0:
+            tools.append(f"{ARK_HOME}/bin/ark_aot --boot-panda-files={BOOT_FILES} --load-runtimes=java "
+                         f"--enable-an --load-in-boot --compiler-check-final=true --paoc-panda-files {test}Tests.abc "
+                         f"--paoc-output {test}Tests_{step}.aot --compiler-cross-arch x86_64")
+        else:
+            tools.append(f"{ARK_HOME}/bin/ark --boot-panda-files={BOOT_FILES} --load-runtimes=java "
+                         f"--aot-file={test}Tests_{step - 1}.aot --enable-an --load-in-boot {test}Tests.abc "
+                         f"{klass.replace('.', '/')}::main -- -TestCaseID ALL")
+    return tools
+
+
+def _rerun_section(rng: random.Random, name: str, workdir: str, test: str, options: CorpusOptions) -> List[str]:
+    # jtreg writes one token per line, continued with a literal `\\`
+    body = [f"cd {workdir}/scratch/{name} && \\\\",
+            "HOME=/home/jck \\\\",
+            "LANG=C \\\\",
+            f"PATH=/bin:/usr/bin:{ARK_HOME}/bin \\\\",
+            f"/opt/jdk/bin/javac \\\\"]
+    for i in range(options.rerun_args):
+        body.append(f"        -J-Dsynth.option{i}={rng.randrange(1000)} \\\\")
+    body.append(f"        -d {workdir}/classes/{name} \\\\")
+    body.append(f"        {workdir}/src/{test}Tests.java")
+    return ([f"#section:{name}",
+             f"----------messages:(1/{rng.randrange(20, 200)})----------",
+             f"command: compile {workdir}/src/{test}Tests.java",
+             f"----------rerun:({len(body)}/{sum(len(line) + 1 for line in body)})*----------"]
+            + body
+            + ["----------System.out:(0/0)----------",
+               "----------System.err:(0/0)----------",
+               "result: Passed. Compilation successful",
+               ""])
+
+
+def expected_commands(options: CorpusOptions) -> int:
+    """Commands parse_commands finds in a file generated with these options"""
+    return 1 + options.chain + options.rerun_sections
+
+
+def generate_jtr(index: int, options: CorpusOptions, seed: int = 0) -> str:
+    """Text of the index-th synthetic .jtr file"""
+    rng = random.Random(seed * 1000003 + index)
+    package, test, klass = _test_names(rng, index)
+    workdir = f"{SUITE_ROOT}/precompile/api/{package}/index_html_{test}"
+    env = _env_block(rng, options.env_vars)
+    failed = rng.random() < 0.1
+    status = "Failed. test cases: 1; passed: 0; failed: 1" if failed else "Passed. test cases: 1; passed: 1"
+    escaped_status = status.replace(':', '\\:')
+
+    lines = ["#Test Results (version 2)",
+             "#Thu Nov 13 12:00:05 UTC 2025",
+             "#-----testdescription-----",
+             f"$file={SUITE_ROOT}/tests/api/{package}/index.html",
+             f"$root={SUITE_ROOT}/tests",
+             f"{EXPECTED_KEY}={expected_commands(options)}",
+             "executeArgs=-TestCaseID ALL",
+             f"executeClass={klass}",
+             f"id={test}",
+             "keywords=positive runtime",
+             f"source={test}Tests.java",
+             "",
+             "#-----environment-----",
+             "aot=true",
+             f"ark.home={ARK_HOME}",
+             "ark.options=--enable-an --load-in-boot",
+             f"testsuite.root={SUITE_ROOT}",
+             "",
+             "#-----testresult-----",
+             "environment=panda_amd64",
+             f"execStatus={escaped_status}",
+             f"sections=script_messages {''.join(f'compile{i} ' for i in range(options.rerun_sections))}"
+             "c2abc.ark_amd64.libcore12 testExecute.aot.ark_amd64.libcore12",
+             f"test=api/{package}/index.html\\#{test}",
+             "timeoutSeconds=600",
+             f"totalTime={rng.randrange(100, 5000)}",
+             "",
+             "#section:script_messages",
+             "----------messages:(1/24)----------",
+             "Executing test class...",
+             ""]
+
+    for i in range(options.rerun_sections):
+        lines += _rerun_section(rng, f"compile{i}", workdir, test, options)
+
+    lines += ["#section:c2abc.ark_amd64.libcore12",
+              "----------messages:(1/551)----------",
+              f"command: com.huawei.cqa.javatest.lib.ProcessCommandExt -v -execDir {workdir}",
+              "----------out1:(4/459)----------",
+              f"Command is: {ARK_HOME}/bin/c2abc {workdir}/classes/{test}Tests.class --output {test}Tests.abc",
+              "Command environment is:",
+              env[0],
+              f"Execution directory is {workdir}",
+              "----------out2:(0/0)----------",
+              "result: Passed. OK",
+              ""]
+
+    chain = "; ".join(_chain(test, klass, options.chain) + ["echo Exit code: $?"])
+    log = [f"System W 11-13 20:00:05 {rng.randrange(1 << 20)} {rng.randrange(1 << 20)} "
+           f"ClassLoader referenced unknown path: {workdir}/lib{i}" for i in range(options.out1_lines)]
+    lines += ["#section:testExecute.aot.ark_amd64.libcore12",
+              "----------messages:(1/2508)----------",
+              f"command: com.huawei.cqa.javatest.lib.ProcessCommandExt -v -execDir {workdir}",
+              f"----------out1:({len(env) + len(log) + 4}/{sum(map(len, log)) + len(chain)})----------",
+              f"Command is: bash -ce {chain}",
+              "Command environment is:"]
+    lines += env
+    lines += [f"Execution directory is {workdir}"]
+    lines += log
+    lines += [f"STATUS:{status}",
+              "----------out2:(0/0)----------",
+              f"result: {status}",
+              "",
+              "",
+              f"test result: {status}",
+              ""]
+    return "\n".join(lines)
+
+
+def options_for(preset: str, index: int) -> CorpusOptions:
+    """Options of the index-th file of a preset; `mixed` cycles through the others"""
+    if preset == 'mixed':
+        names = sorted(PRESETS)
+        return PRESETS[names[index % len(names)]]
+    return PRESETS[preset]
+
+
+def corpus_path(out_dir: str, index: int) -> str:
+    # Bucket into subdirectories so 100k-file corpora stay listable
+    return os.path.join(out_dir, f"{index // FILES_PER_DIR:03d}", f"index_synth{index:06d}.jtr")
+
+
+def iter_corpus(count: int, preset: str = 'small', seed: int = 0,
+                options: Optional[CorpusOptions] = None) -> Iterator[Tuple[int, str]]:
+    """(index, text) of each file of a corpus, generated lazily"""
+    for index in range(count):
+        yield index, generate_jtr(index, options or options_for(preset, index), seed)
+
+
+def write_corpus(out_dir: str, count: int, preset: str = 'small', seed: int = 0,
+                 options: Optional[CorpusOptions] = None) -> Dict[str, int]:
+    """Write a corpus to out_dir and return its totals"""
+    totals = {'files': 0, 'bytes': 0, 'commands': 0}
+    for index, text in iter_corpus(count, preset, seed, options):
+        path = corpus_path(out_dir, index)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        totals['files'] += 1
+        totals['bytes'] += len(text)
+        totals['commands'] += expected_commands(options or options_for(preset, index))
+    return totals
+
+
+def read_expected_commands(text: str) -> Optional[int]:
+    """Expected command count recorded in a generated file, None for real .jtr files"""
+    marker = f"\n{EXPECTED_KEY}="
+    start = text.find(marker)
+    if start < 0:
+        return None
+    start += len(marker)
+    return int(text[start:text.index("\n", start)])
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Generate a synthetic .jtr corpus modeled on examples/jtr.',
+        epilog='''Presets:
+  small   one c2abc command and a 2-command bash -ce chain, short logs
+  chains  12-command bash -ce chains
+  logs    1000-line out1 logs
+  env     200 environment variables per command
+  rerun   jtreg-style rerun sections with long continued command lines
+  mixed   cycles through all of the above
+
+Examples:
+  %(prog)s corpus/ --count 1000
+  %(prog)s corpus/ --count 100000 --preset mixed --seed 7
+  %(prog)s corpus/ --count 100 --chain 30 --out1-lines 20000 --env-vars 500 --rerun 2
+        ''',
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('out_dir', help='Directory to write the corpus to')
+    parser.add_argument('--count', type=int, default=1000, help='Number of files (default: 1000)')
+    parser.add_argument('--preset', choices=sorted(PRESETS) + ['mixed'], default='small',
+                        help='Shape of the files (default: small)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+    parser.add_argument('--chain', type=int, metavar='N', help='Tools per bash -ce chain (overrides the preset)')
+    parser.add_argument('--out1-lines', type=int, metavar='N', help='Log lines per out1 block')
+    parser.add_argument('--env-vars', type=int, metavar='N', help='Environment variables per command')
+    parser.add_argument('--rerun', type=int, metavar='N', help='Rerun sections per file')
+    parser.add_argument('--rerun-args', type=int, metavar='N', help='Continued argument lines per rerun block')
+
+    args = parser.parse_args()
+    if args.count < 0:
+        print("Error: --count must not be negative", file=sys.stderr)
+        sys.exit(1)
+
+    options = None
+    overrides = {'chain': args.chain, 'out1_lines': args.out1_lines, 'env_vars': args.env_vars,
+                 'rerun_sections': args.rerun, 'rerun_args': args.rerun_args}
+    if any(v is not None for v in overrides.values()):
+        if args.preset == 'mixed':
+            print("Error: size overrides cannot be combined with --preset mixed", file=sys.stderr)
+            sys.exit(1)
+        values = PRESETS[args.preset].to_dict()
+        values.update({k: v for k, v in overrides.items() if v is not None})
+        if values['chain'] < 1 or values['env_vars'] < 1:
+            print("Error: --chain and --env-vars must be at least 1", file=sys.stderr)
+            sys.exit(1)
+        options = CorpusOptions(**values)
+
+    totals = write_corpus(args.out_dir, args.count, args.preset, args.seed, options)
+    print(f"Wrote {totals['files']} file(s), {totals['bytes'] / 1e6:.1f} MB, "
+          f"{totals['commands']} command(s) to {args.out_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,410 @@
+"""
+Long-running replay server for JTR corpora.
+
+Loads .jtr files once, keeps their TestRunner objects and a command-name index
+in memory, and serves requests from jtr_client.py over a UNIX socket, so
+scripts calling the replay tool thousands of times (e.g. bisecting) skip
+interpreter startup and reparsing. A watched directory is polled for new or
+changed .jtr files, which are ingested incrementally.
+
+Protocol: one JSON request per connection line, e.g.
+{"op": "run", "tests": ["*angrad*"], "specs": ["ark --gc-type=gen-gc"]};
+the server answers with JSON lines: zero or more {"event": ...} progress
+records, then {"ok": true, "result": ...} or {"ok": false, "error": "..."}.
+"""
+
+import argparse
+import fnmatch
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from flag_sweep import FlagSweep, SweepAxis
+from jtr_commands import (Command, CpuAffinityPlan, ExecutionOptions, TestRunner, parse_commands, parse_cpu_list,
+                          parse_run_specs, parse_test_id, run_commands, with_extra_args)
+
+
+OUTPUT_TAIL = 4000
+
+
+def default_socket_path() -> str:
+    if os.environ.get('JTR_DAEMON_SOCKET'):
+        return os.environ['JTR_DAEMON_SOCKET']
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR') or '/tmp'
+    return os.path.join(runtime_dir, f"jtr_daemon-{os.environ.get('USER', 'user')}.sock")
+
+
+class JtrCorpus:
+    """Parsed .jtr files by path, with lookups by test id and command name"""
+
+    def __init__(self):
+        self.tests: Dict[str, TestRunner] = {}
+        self._stamps: Dict[str, Tuple[int, float]] = {}
+        # command name -> path -> command indexes, and path -> names of its commands in order
+        self._by_name: Dict[str, Dict[str, List[int]]] = {}
+        self._names: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+
+    def ingest(self, path: str) -> Optional[TestRunner]:
+        """Parse a file (again, if it changed since the last ingest); None if it has no commands"""
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        stamp = (st.st_size, st.st_mtime)
+        with self._lock:
+            if self._stamps.get(path) == stamp:
+                return self.tests.get(path)
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            text = f.read()
+        default_id = os.path.splitext(os.path.basename(path))[0]
+        runner = parse_commands(text, test_id=parse_test_id(text) or default_id)
+        # Names are computed once per ingest, outside the lock
+        names = [cmd.get_command_name() for cmd in runner.commands]
+        with self._lock:
+            self._stamps[path] = stamp
+            self._unindex(path)
+            if runner.count():
+                self.tests[path] = runner
+                self._index(path, names)
+            else:
+                self.tests.pop(path, None)
+        return runner if runner.count() else None
+
+    def remove(self, path: str):
+        with self._lock:
+            self._stamps.pop(path, None)
+            self.tests.pop(path, None)
+            self._unindex(path)
+
+    def _reject(self, path: str, stamp: Tuple[int, float]):
+        with self._lock:
+            self._stamps[path] = stamp
+            self.tests.pop(path, None)
+            self._unindex(path)
+
+    def _index(self, path: str, names: List[str]):
+        self._names[path] = names
+        for i, name in enumerate(names):
+            self._by_name.setdefault(name, {}).setdefault(path, []).append(i)
+
+    def _unindex(self, path: str):
+        for name in set(self._names.pop(path, ())):
+            paths = self._by_name[name]
+            del paths[path]
+            if not paths:
+                del self._by_name[name]
+
+    def scan(self, directory: str, log: Optional[Callable[[str], None]] = None) -> Tuple[List[str], List[str]]:
+        """
+        Ingest new or changed .jtr files under directory and drop deleted ones; returns (ingested, removed).
+
+        Files that vanish while being scanned are dropped, files that fail to
+        parse are reported to log and hold no tests until they change again.
+        """
+        found = set()
+        ingested = []
+        for root, _, files in os.walk(directory):
+            for name in files:
+                if not name.endswith('.jtr'):
+                    continue
+                path = os.path.abspath(os.path.join(root, name))
+                try:
+                    st = os.stat(path)
+                    stamp = (st.st_size, st.st_mtime)
+                    if self._stamps.get(path) != stamp:
+                        self.ingest(path)
+                        ingested.append(path)
+                except OSError:
+                    # Deleted or replaced between listing and reading; the next scan picks up a new file
+                    continue
+                except Exception as e:
+                    if log:
+                        log(f"Cannot parse {path}: {e}")
+                    self._reject(path, stamp)
+                found.add(path)
+        prefix = os.path.abspath(directory) + os.sep
+        removed = [p for p in list(self._stamps) if p.startswith(prefix) and p not in found]
+        for path in removed:
+            self.remove(path)
+        return ingested, removed
+
+    def select(self, patterns: Optional[List[str]] = None) -> List[Tuple[str, TestRunner]]:
+        """(path, runner) of tests whose id or path matches any pattern (all tests if none given)"""
+        with self._lock:
+            items = sorted(self.tests.items())
+        if not patterns:
+            return items
+        return [(path, runner) for path, runner in items
+                if any(fnmatch.fnmatch(runner.test_id or "", p) or fnmatch.fnmatch(path, p) for p in patterns)]
+
+    def command_names(self) -> Dict[str, int]:
+        with self._lock:
+            return {name: sum(len(indexes) for indexes in paths.values())
+                    for name, paths in sorted(self._by_name.items())}
+
+    def find_by_name(self, pattern: str) -> List[Tuple[str, int, Command]]:
+        """(path, index, command) of commands whose name matches pattern, via the name index"""
+        with self._lock:
+            refs = [(path, i) for name, paths in self._by_name.items() if fnmatch.fnmatch(name, pattern)
+                    for path, indexes in paths.items() for i in indexes]
+            return [(path, i, self.tests[path].commands[i]) for path, i in sorted(refs)]
+
+    def count(self) -> Tuple[int, int]:
+        with self._lock:
+            return len(self.tests), sum(r.count() for r in self.tests.values())
+
+
+def _copy_command(cmd: Command) -> Command:
+    # Results are stored on Command objects; runs work on copies so the corpus stays read-only
+    return Command(section=cmd.section, command=cmd.command, env_vars=cmd.env_vars,
+                   directory=cmd.directory, test_id=cmd.test_id)
+
+
+def options_from_request(request: Dict[str, object]) -> ExecutionOptions:
+    """ExecutionOptions from the scheduling fields of a request (names as in parse_jtr's CLI)"""
+    jobs = int(request.get('jobs', 1))
+    affinity = None
+    if request.get('cpus'):
+        affinity = CpuAffinityPlan(parse_cpu_list(str(request['cpus'])), jobs, int(request.get('reserve_cpus', 0)))
+    return ExecutionOptions(timeout=int(request.get('timeout', 300)), jobs=jobs, affinity=affinity,
+                            measure_pattern=request.get('measure'), nice=request.get('nice'))
+
+
+class ReplayService:
+    """Request handlers; `send` streams progress events back to the client"""
+
+    def __init__(self, corpus: JtrCorpus):
+        self.corpus = corpus
+        self.started = time.time()
+        # Runs share the machine: one at a time, while queries are answered concurrently
+        self.run_lock = threading.Lock()
+
+    def handle(self, request: Dict[str, object], send: Callable[[Dict[str, object]], None]) -> object:
+        op = request.get('op')
+        handler = getattr(self, f"op_{op}", None)
+        if handler is None:
+            raise ValueError(f"unknown op '{op}'")
+        return handler(request, send)
+
+    def op_status(self, request, send):
+        tests, commands = self.corpus.count()
+        return {'pid': os.getpid(), 'uptime': round(time.time() - self.started, 1),
+                'tests': tests, 'commands': commands, 'command_names': self.corpus.command_names()}
+
+    def op_load(self, request, send):
+        loaded = []
+        for path in request.get('paths', []):
+            if os.path.isdir(path):
+                loaded += self.corpus.scan(path)[0]
+            elif self.corpus.ingest(path) is not None:
+                loaded.append(os.path.abspath(path))
+        return {'loaded': loaded}
+
+    def op_query(self, request, send):
+        rows = []
+        name = request.get('name', '*')
+        section = request.get('section', '*')
+        selected = dict(self.corpus.select(request.get('tests')))
+        for path, i, cmd in self.corpus.find_by_name(name):
+            if path in selected and fnmatch.fnmatch(cmd.section, section):
+                rows.append({'test': cmd.test_id, 'file': path, 'index': i, 'section': cmd.section,
+                             'name': cmd.get_command_name(), 'command': cmd.to_bash_string()})
+        return rows
+
+    def _selected_commands(self, request) -> List[Command]:
+        selected = self.corpus.select(request.get('tests'))
+        specs = parse_run_specs(request.get('specs') or [])
+        if not specs:
+            return [_copy_command(cmd) for _, runner in selected for cmd in runner.commands]
+        commands = []
+        for pattern, extra_args in specs:
+            for _, runner in selected:
+                for cmd in runner.get_commands_by_name(pattern):
+                    commands.append(with_extra_args(cmd, extra_args) if extra_args else _copy_command(cmd))
+        return commands
+
+    def op_run(self, request, send):
+        commands = self._selected_commands(request)
+        if not commands:
+            raise ValueError("no commands match the request")
+        options = options_from_request(request)
+
+        def on_complete(i, result):
+            cmd, return_code, stdout, stderr = result
+            send({'event': 'result', 'index': i, 'total': len(commands), 'test': cmd.test_id,
+                  'section': cmd.section, 'name': cmd.get_command_name(), 'return_code': return_code,
+                  'duration': round(cmd.get_last_run_info().get('duration', 0.0), 3),
+                  'stdout': stdout[-OUTPUT_TAIL:], 'stderr': stderr[-OUTPUT_TAIL:]})
+
+        with self.run_lock:
+            results = run_commands(commands, options, capture_output=True, on_complete=on_complete)
+        failed = sum(1 for _, rc, _, _ in results if rc != 0)
+        return {'total': len(results), 'failed': failed}
+
+    def op_sweep(self, request, send):
+        tests = [runner for _, runner in self.corpus.select(request.get('tests'))]
+        if not tests:
+            raise ValueError("no tests match the request")
+        axes = [SweepAxis.parse(spec) for spec in request.get('axes', [])]
+        if not axes:
+            raise ValueError("sweep needs at least one axis")
+        sweep = FlagSweep(tests, axes, request.get('pattern', '*'), options_from_request(request),
+                          request.get('sample'), int(request.get('seed', 0)), request.get('workdir'))
+
+        def on_complete(cell, done, total):
+            send({'event': 'cell', 'done': done, 'total': total, 'variant': cell.variant.label,
+                  'test': cell.test_id, 'status': cell.status(), 'duration': round(cell.duration, 3),
+                  'error': cell.error})
+
+        with self.run_lock:
+            sweep.run(on_complete)
+        result = sweep.to_json()
+        result['matrix'] = sweep.format_matrix()
+        return result
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        service: ReplayService = self.server.service
+        write_lock = threading.Lock()
+
+        def send(message: Dict[str, object]):
+            with write_lock:
+                self.wfile.write((json.dumps(message) + "\n").encode())
+                self.wfile.flush()
+
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+                if request.get('op') == 'stop':
+                    send({'ok': True, 'result': 'stopping'})
+                    threading.Thread(target=self.server.shutdown, daemon=True).start()
+                    return
+                send({'ok': True, 'result': service.handle(request, send)})
+            except Exception as e:
+                # A bad request must not take the server down; report it to the client
+                try:
+                    message = str(e) if isinstance(e, ValueError) else f"{type(e).__name__}: {e}"
+                    send({'ok': False, 'error': message})
+                except OSError:
+                    return
+
+
+class ReplayServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, service: ReplayService):
+        self.service = service
+        # Create the socket owner-only, a chmod after bind leaves a window where others can connect
+        umask = os.umask(0o177)
+        try:
+            super().__init__(socket_path, _Handler)
+        finally:
+            os.umask(umask)
+        os.chmod(socket_path, 0o600)
+
+
+def _claim_socket(path: str):
+    """Remove a stale socket file; fail if a server is still listening on it"""
+    if not os.path.exists(path):
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except OSError:
+        os.unlink(path)
+        return
+    finally:
+        probe.close()
+    raise RuntimeError(f"a server is already listening on {path}")
+
+
+def watch(corpus: JtrCorpus, directories: List[str], interval: float, stop: threading.Event,
+          log: Callable[[str], None]):
+    """Poll directories for new, changed or removed .jtr files until stop is set"""
+    while not stop.wait(interval):
+        for directory in directories:
+            try:
+                ingested, removed = corpus.scan(directory, log)
+            except Exception as e:
+                # Keep watching, the directory may come back
+                log(f"Watch error in {directory}: {e}")
+                continue
+            if ingested or removed:
+                log(f"Watch: {len(ingested)} ingested, {len(removed)} removed in {directory}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Keep JTR corpora in memory and serve query/run/sweep requests over a UNIX socket.',
+        epilog='''Examples:
+  %(prog)s examples/jtr/*.jtr &                    # Serve a fixed corpus
+  %(prog)s --watch work/ &                         # Serve and ingest new .jtr files from work/
+  jtr_client.py query --test "*angrad*" --name ark
+  jtr_client.py run --test "*angrad*" "ark --gc-type=gen-gc"
+        ''',
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('input_files', nargs='*', metavar='input_file', help='.jtr files to load at startup')
+    parser.add_argument('--socket', default=default_socket_path(),
+                        help='Socket path (default: $JTR_DAEMON_SOCKET or $XDG_RUNTIME_DIR/jtr_daemon-$USER.sock)')
+    parser.add_argument('--watch', action='append', default=[], metavar='DIR',
+                        help='Directory to poll for .jtr files (repeatable)')
+    parser.add_argument('--watch-interval', type=float, default=2.0, metavar='SEC',
+                        help='Polling interval for --watch (default: 2)')
+    args = parser.parse_args()
+
+    def log(message: str):
+        print(f"[{time.strftime('%H:%M:%S')}] {message}", file=sys.stderr, flush=True)
+
+    corpus = JtrCorpus()
+    start = time.monotonic()
+    for path in args.input_files:
+        try:
+            corpus.ingest(path)
+        except OSError as e:
+            print(f"Error: cannot read '{path}': {e}", file=sys.stderr)
+            sys.exit(1)
+    for directory in args.watch:
+        if not os.path.isdir(directory):
+            print(f"Error: '{directory}' is not a directory", file=sys.stderr)
+            sys.exit(1)
+        corpus.scan(directory, log)
+    tests, commands = corpus.count()
+    log(f"Loaded {tests} test(s), {commands} command(s) in {time.monotonic() - start:.2f}s")
+
+    try:
+        _claim_socket(args.socket)
+        server = ReplayServer(args.socket, ReplayService(corpus))
+    except (RuntimeError, OSError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    stop = threading.Event()
+    if args.watch:
+        threading.Thread(target=watch, args=(corpus, args.watch, args.watch_interval, stop, log),
+                         daemon=True).start()
+    signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(target=server.shutdown).start())
+
+    log(f"Listening on {args.socket}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        server.server_close()
+        if os.path.exists(args.socket):
+            os.unlink(args.socket)
+        log("Stopped")
+
+
+if __name__ == "__main__":
+    main()
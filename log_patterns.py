@@ -0,0 +1,41 @@
+"""
+Message pattern overrides shared by the log analyzers (aot_coverage, inline_log).
+
+Both tools match log lines against per-category lists of regexes and accept
+`--pattern CATEGORY=REGEX` to adapt them to other runtime versions. The first
+override of a category replaces its default regexes, further ones are added.
+"""
+
+import re
+from typing import Dict, List, Optional, Sequence
+
+
+def apply_overrides(defaults: Dict[str, List[str]], overrides: List[str],
+                    required_groups: Optional[Dict[str, Sequence[str]]] = None) -> Dict[str, List[str]]:
+    """
+    Defaults with CATEGORY=REGEX overrides applied.
+
+    required_groups maps a category to named groups of which a regex of that
+    category needs at least one. Raises ValueError for an unknown category, an
+    invalid regex or a regex without a required group.
+    """
+    patterns = {category: list(regexes) for category, regexes in defaults.items()}
+    replaced = set()
+    for spec in overrides:
+        category, sep, regex = spec.partition('=')
+        if not sep or category not in patterns:
+            raise ValueError(f"invalid pattern '{spec}', expected one of "
+                             f"{', '.join(patterns)} followed by =REGEX")
+        try:
+            compiled = re.compile(regex)
+        except re.error as e:
+            raise ValueError(f"invalid regex '{regex}': {e}")
+        groups = (required_groups or {}).get(category)
+        if groups and not any(group in compiled.groupindex for group in groups):
+            needed = " or ".join(f"(?P<{group}>...)" for group in groups)
+            raise ValueError(f"pattern '{regex}' for {category} needs a {needed} group")
+        if category not in replaced:
+            patterns[category] = []
+            replaced.add(category)
+        patterns[category].append(regex)
+    return patterns
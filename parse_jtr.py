@@ -1,705 +1,40 @@
 import re
-import subprocess
 import sys
 import os
 import argparse
-from typing import List, Dict, Optional, Tuple
+from typing import List
 import shlex
 import json
-
-
-SHELL_NAMES = {"bash", "sh"}
-SHELL_SEPARATORS = {";", "&&", "||"}
-ENV_ASSIGNMENT_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*=")
-
-
-def _tokenize_shell_command(command_str: str) -> List[str]:
-    """Tokenize a shell-like command string respecting quotes and separators."""
-    if not command_str:
-        return []
-
-    lexer = shlex.shlex(command_str, posix=True, punctuation_chars=';&|')
-    lexer.whitespace_split = True
-    lexer.commenters = ''
-    return list(lexer)
-
-
-def _is_shell_token(token: str) -> bool:
-    base = os.path.basename(token)
-    return base in SHELL_NAMES
-
-
-def _is_env_assignment(token: str) -> bool:
-    return bool(ENV_ASSIGNMENT_RE.match(token))
-
-
-def _strip_leading_env(tokens: List[str]) -> List[str]:
-    stripped = list(tokens)
-    while stripped and _is_env_assignment(stripped[0]):
-        stripped.pop(0)
-    return stripped
-
-
-def _leading_env_assignments(tokens: List[str]) -> List[str]:
-    prefix = []
-    for token in tokens:
-        if _is_env_assignment(token):
-            prefix.append(token)
-        else:
-            break
-    return prefix
-
-
-def _strip_shell_wrapper(tokens: List[str]) -> List[str]:
-    tokens = list(tokens)
-    tokens = _strip_leading_env(tokens)
-    if not tokens:
-        return []
-
-    if _is_shell_token(tokens[0]):
-        tokens = tokens[1:]
-        while tokens and tokens[0].startswith('-'):
-            tokens.pop(0)
-        remainder = ' '.join(tokens).strip()
-        if not remainder:
-            return []
-        return _tokenize_shell_command(remainder)
-
-    return tokens
-
-
-def _find_real_command_token(tokens: List[str]) -> Optional[str]:
-    tokens = _strip_leading_env(tokens)
-    if not tokens:
-        return None
-
-    if _is_shell_token(tokens[0]):
-        return _find_real_command_token(_strip_shell_wrapper(tokens))
-
-    if tokens[0].lower() == 'echo':
-        return None
-
-    return tokens[0]
-
-
-def _expand_wrapped_command(tokens: List[str]) -> List[List[str]]:
-    """Expand shell wrappers (bash/sh) and return actual command token lists."""
-    remaining = list(tokens)
-    env_prefix = []
-    while remaining and _is_env_assignment(remaining[0]):
-        env_prefix.append(remaining.pop(0))
-
-    if not remaining:
-        return []
-
-    if _is_shell_token(remaining[0]):
-        remaining.pop(0)
-        while remaining and remaining[0].startswith('-'):
-            remaining.pop(0)
-        remainder = ' '.join(remaining).strip()
-        if not remainder:
-            return []
-        inner_tokens = _tokenize_shell_command(remainder)
-        inner_commands = _split_tokens_into_commands(inner_tokens)
-        expanded = []
-        for inner in inner_commands:
-            if inner:
-                expanded.append(env_prefix + inner)
-        return expanded
-
-    return [env_prefix + remaining]
-
-
-def _split_tokens_into_commands(tokens: List[str]) -> List[List[str]]:
-    commands = []
-    current = []
-    for token in tokens:
-        if token in SHELL_SEPARATORS:
-            if current:
-                commands.extend(_expand_wrapped_command(current))
-                current = []
-        else:
-            current.append(token)
-
-    if current:
-        commands.extend(_expand_wrapped_command(current))
-
-    return [cmd for cmd in commands if cmd]
-
-
-def _split_command_line(command_line: str) -> List[List[str]]:
-    tokens = _tokenize_shell_command(command_line)
-    return _split_tokens_into_commands(tokens)
-
-
-def build_commands_from_command_line(command_line: str, section: str,
-                                     env_vars: Dict[str, str],
-                                     directory: Optional[str]) -> List['Command']:
-    """Split a command line into separate Command objects for each real command."""
-    commands = []
-    tokenized_commands = _split_command_line(command_line)
-    env_prefix = _leading_env_assignments(tokenized_commands[0]) if tokenized_commands else []
-
-    for cmd_tokens in tokenized_commands:
-        cmd_tokens_with_env = list(cmd_tokens)
-        if env_prefix and not cmd_tokens_with_env:
-            continue
-        if env_prefix and not _is_env_assignment(cmd_tokens_with_env[0]):
-            cmd_tokens_with_env = env_prefix + cmd_tokens_with_env
-
-        real_token = _find_real_command_token(cmd_tokens_with_env)
-        if not real_token:
-            continue
-        if os.path.basename(real_token).lower() == 'echo':
-            continue
-
-        command_text = ' '.join(cmd_tokens_with_env).strip()
-        commands.append(
-            Command(
-                section=section,
-                command=command_text,
-                env_vars=dict(env_vars),
-                directory=directory
-            )
-        )
-
-    return commands
-
-
-class Command:
-    """Class representing a parsed command from test runner output"""
-    
-    def __init__(self, section: str, command: str, env_vars: Dict[str, str] = None, 
-                 directory: str = None):
-        self.section = section
-        self.command = command
-        self.env_vars = env_vars or {}
-        self.directory = directory
-        self._last_result = None
-    
-    def execute(self, timeout: int = 300, capture_output: bool = True) -> Tuple[int, str, str]:
-        """
-        Execute the command and return (return_code, stdout, stderr)
-        
-        Args:
-            timeout: Command timeout in seconds
-            capture_output: Whether to capture output or let it go to terminal
-        
-        Returns:
-            Tuple of (return_code, stdout, stderr)
-        """
-        # Prepare environment
-        env = os.environ.copy()
-        env.update(self.env_vars)
-        
-        # Prepare working directory
-        cwd = self.directory if self.directory else None
-        
-        try:
-            if capture_output:
-                result = subprocess.run(
-                    self.command,
-                    shell=True,
-                    env=env,
-                    cwd=cwd,
-                    timeout=timeout,
-                    capture_output=True,
-                    text=True
-                )
-                self._last_result = (result.returncode, result.stdout, result.stderr)
-            else:
-                result = subprocess.run(
-                    self.command,
-                    shell=True,
-                    env=env,
-                    cwd=cwd,
-                    timeout=timeout
-                )
-                self._last_result = (result.returncode, "", "")
-                
-        except subprocess.TimeoutExpired:
-            error_msg = f"Command timed out after {timeout} seconds"
-            self._last_result = (-1, "", error_msg)
-        except Exception as e:
-            error_msg = f"Command execution failed: {str(e)}"
-            self._last_result = (-1, "", error_msg)
-        
-        return self._last_result
-    
-    def get_last_result(self) -> Optional[Tuple[int, str, str]]:
-        """Get the result of the last execution"""
-        return self._last_result
-    
-    def is_success(self) -> bool:
-        """Check if the last execution was successful"""
-        return self._last_result is not None and self._last_result[0] == 0
-    
-    def get_command_name(self) -> str:
-        """Extract a representative command name, unwrapping shell helpers."""
-        command_str = self.command.strip()
-        if not command_str:
-            return ""
-
-        tokens = _tokenize_shell_command(command_str)
-        real_token = _find_real_command_token(tokens)
-
-        def _format_name(token: str) -> str:
-            if '/' in token:
-                return token.split('/')[-1]
-            return token
-
-        if real_token:
-            return _format_name(real_token)
-
-        fallback_parts = command_str.split()
-        if not fallback_parts:
-            return ""
-        return _format_name(fallback_parts[0])
-    
-    def to_bash_string(self) -> str:
-        """Generate bash command string"""
-        parts = []
-        
-        # Add directory change if specified
-        if self.directory:
-            parts.append(f"cd {self.directory}")
-        
-        # Add environment variables and command
-        env_prefix = ""
-        if self.env_vars:
-            env_parts = []
-            for var, value in self.env_vars.items():
-                env_parts.append(f"{var}={value}")
-            env_prefix = " ".join(env_parts) + " "
-        
-        command_line = f"{env_prefix}{self.command}"
-        parts.append(command_line)
-        
-        return " && ".join(parts) if len(parts) > 1 else parts[0]
-    
-    def __str__(self) -> str:
-        cmd_name = self.get_command_name()
-        return f"Command(name='{cmd_name}', section='{self.section}', cmd='{self.command[:50]}...', env_vars={len(self.env_vars)}, dir='{self.directory}')"
-    
-    def __repr__(self) -> str:
-        return self.__str__()
-
-
-class TestRunner:
-    """Class for managing parsed test runner commands"""
-    
-    def __init__(self, commands: List[Command] = None):
-        self.commands = commands or []
-    
-    def add_command(self, command: Command):
-        """Add a command to the test runner"""
-        self.commands.append(command)
-    
-    def get_commands(self) -> List[Command]:
-        """Get all commands"""
-        return self.commands
-    
-    def get_commands_by_section(self, section_pattern: str) -> List[Command]:
-        """Get commands that match a section pattern"""
-        import fnmatch
-        return [cmd for cmd in self.commands if fnmatch.fnmatch(cmd.section, section_pattern)]
-    
-    def get_commands_by_name(self, name_pattern: str) -> List[Command]:
-        """Get commands that match a command name pattern (e.g., 'ark', 'java')"""
-        import fnmatch
-        return [cmd for cmd in self.commands if fnmatch.fnmatch(cmd.get_command_name(), name_pattern)]
-    
-    def get_sections(self) -> List[str]:
-        """Get all unique section names"""
-        return list(set(cmd.section for cmd in self.commands))
-    
-    def get_command_names(self) -> List[str]:
-        """Get all unique command names"""
-        return list(set(cmd.get_command_name() for cmd in self.commands))
-    
-    def count(self) -> int:
-        """Get total number of commands"""
-        return len(self.commands)
-    
-    def execute_all(self, timeout: int = 300, capture_output: bool = True, raw_output: bool = False) -> List[Tuple[Command, int, str, str]]:
-        """
-        Execute all commands and return results
-        
-        Returns:
-            List of tuples (command, return_code, stdout, stderr)
-        """
-        def conditional_print_local(*args_print, **kwargs):
-            """Print only if not in raw output mode"""
-            if not raw_output:
-                print(*args_print, **kwargs)
-        
-        results = []
-        conditional_print_local("\n=== Executing All Commands ===")
-        
-        for i, cmd in enumerate(self.commands, 1):
-            conditional_print_local(f"\n{i}. Executing section: {cmd.section}")
-            conditional_print_local(f"   Command: {cmd.to_bash_string()}")
-            
-            return_code, stdout, stderr = cmd.execute(timeout=timeout, capture_output=capture_output)
-            results.append((cmd, return_code, stdout, stderr))
-            
-            # In raw output mode, output is already forwarded, so no need to print results
-            if not raw_output:
-                if cmd.is_success():
-                    conditional_print_local("   ✓ Success")
-                else:
-                    conditional_print_local(f"   ✗ Failed (return code: {return_code})")
-                    if stderr:
-                        conditional_print_local(f"   Error: {stderr}")
-        
-        # Summary
-        if not raw_output:
-            successful = sum(1 for _, rc, _, _ in results if rc == 0)
-            failed = len(results) - successful
-            
-            conditional_print_local("\n=== Execution Summary ===")
-            conditional_print_local(f"Total commands: {len(results)}")
-            conditional_print_local(f"Successful: {successful}")
-            conditional_print_local(f"Failed: {failed}")
-            
-            if failed > 0:
-                conditional_print_local("\nFailed commands:")
-                for cmd, rc, stdout, stderr in results:
-                    if rc != 0:
-                        conditional_print_local(f"- {cmd.section}: {cmd.command[:50]}... (code: {rc})")
-        
-        return results
-    
-    def execute_interactively(self, raw_output: bool = False):
-        """Execute commands interactively with user prompts"""
-        def conditional_print_local(*args_print, **kwargs):
-            """Print only if not in raw output mode"""
-            if not raw_output:
-                print(*args_print, **kwargs)
-        
-        conditional_print_local("\n=== Interactive Command Execution ===")
-        
-        for i, cmd in enumerate(self.commands, 1):
-            conditional_print_local(f"\n{i}. Section: {cmd.section}")
-            conditional_print_local(f"   Command: {cmd.to_bash_string()}")
-            
-            while True:
-                if raw_output:
-                    # In raw output mode, just execute without prompts
-                    return_code, stdout, stderr = cmd.execute(capture_output=False)
-                    break
-                
-                choice = input("Execute? (y/n/s/q) [y=yes, n=no, s=show details, q=quit]: ").lower().strip()
-                
-                if choice == 'q':
-                    conditional_print_local("Quitting...")
-                    return
-                elif choice == 'n':
-                    conditional_print_local("Skipped.")
-                    break
-                elif choice == 's':
-                    conditional_print_local(f"   Section: {cmd.section}")
-                    conditional_print_local(f"   Command: {cmd.command}")
-                    conditional_print_local(f"   Env vars: {cmd.env_vars}")
-                    conditional_print_local(f"   Directory: {cmd.directory}")
-                    continue
-                elif choice in ['y', '']:
-                    conditional_print_local("Executing...")
-                    return_code, stdout, stderr = cmd.execute()
-                    
-                    conditional_print_local(f"Return code: {return_code}")
-                    if stdout:
-                        conditional_print_local("STDOUT:")
-                        conditional_print_local(stdout)
-                    if stderr:
-                        conditional_print_local("STDERR:")
-                        conditional_print_local(stderr)
-                    
-                    if cmd.is_success():
-                        conditional_print_local("✓ Command completed successfully")
-                    else:
-                        conditional_print_local("✗ Command failed")
-                    break
-                else:
-                    conditional_print_local("Invalid choice. Please enter y, n, s, or q.")
-    
-    def to_bash_script(self) -> str:
-        """Generate bash script from all commands"""
-        script_lines = ["#!/bin/bash", ""]
-        
-        for cmd in self.commands:
-            script_lines.append(f"# Section: {cmd.section}")
-            script_lines.append(cmd.to_bash_string())
-            script_lines.append("")  # Empty line for readability
-        
-        return "\n".join(script_lines)
-    
-    def print_info(self):
-        """Print information about all commands"""
-        print("\n=== Parsed Commands ===")
-        for i, cmd in enumerate(self.commands, 1):
-            print(f"\n{i}. {cmd}")
-            print(f"   Bash: {cmd.to_bash_string()}")
-        
-        print(f"\n=== Summary ===")
-        print(f"Total commands: {self.count()}")
-        print(f"Sections: {self.get_sections()}")
-        print(f"Command names: {self.get_command_names()}")
-        
-        print(f"\n=== Usage ===")
-        print("You can now work with TestRunner and Command objects:")
-        print("- runner.execute_all() - Execute all commands")
-        print("- runner.execute_interactively() - Execute commands interactively")
-        print("- runner.get_commands_by_section('pattern') - Filter commands by section")
-        print("- runner.get_commands_by_name('pattern') - Filter commands by name")
-        print("- runner.to_bash_script() - Generate bash script")
-        print("- cmd.get_command_name() - Get command name (e.g., 'ark')")
-        print("- cmd.execute() - Execute individual command")
-    
-    def __len__(self) -> int:
-        return len(self.commands)
-    
-    def __iter__(self):
-        return iter(self.commands)
-    
-    def __getitem__(self, index):
-        return self.commands[index]
-
-
-def parse_commands(text) -> TestRunner:
-    """Parse test runner output and extract all commands as TestRunner object"""
-    runner = TestRunner()
-    
-    # Find all sections
-    sections = re.split(r'#section:([^\n]+)', text)
-    
-    for i in range(1, len(sections), 2):
-        section_name = sections[i].strip()
-        section_content = sections[i + 1] if i + 1 < len(sections) else ""
-        
-        if '----------rerun:' in section_content:
-            # Parse section with rerun block
-            # Handle cases where rerun line has additional info: ----------rerun:(25/7222)*----------
-            rerun_match = re.search(r'----------rerun:.*?----------(.*?)----------', section_content, re.DOTALL)
-            if rerun_match:
-                rerun_content = rerun_match.group(1).strip()
-                command = parse_rerun_block(rerun_content, section_name)
-                if command:
-                    runner.add_command(command)
-        
-        elif 'Command is:' in section_content:
-            # Parse standard format sections
-            commands = parse_standard_format(section_content, section_name)
-            for command in commands:
-                runner.add_command(command)
-    
-    return runner
-
-
-def parse_rerun_block(rerun_content, section_name) -> Optional[Command]:
-    """Parse rerun block from compile section and return Command object"""
-    lines = rerun_content.split('\n')
-    env_vars = {}
-    cmd_parts = []
-    current_dir = None
-    
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
-            
-        # Remove trailing backslashes
-        if line.endswith('\\\\'):
-            line = line[:-2].strip()
-        
-        # Check for cd command
-        if line.startswith('cd '):
-            current_dir = line.split(' ', 1)[1].rstrip(' &&')
-        # Check for environment variables (format: VAR=value, but not command arguments)
-        elif ('=' in line and not line.startswith('/') and not line.startswith('-') 
-              and ' ' not in line.split('=')[0] and not cmd_parts):
-            var, value = line.split('=', 1)
-            env_vars[var.strip()] = value.strip()
-        # Check for command parts
-        elif line.startswith('/') or (cmd_parts and not line.startswith('cd')) or (not cmd_parts and not line.startswith('cd') and '=' not in line):
-            cmd_parts.append(line)
-    
-    if cmd_parts:
-        command_str = ' '.join(cmd_parts)
-        return Command(
-            section=section_name,
-            command=command_str,
-            env_vars=env_vars,
-            directory=current_dir
-        )
-    
-    return None
-
-
-def parse_standard_format(section_content, section_name) -> List[Command]:
-    """Parse standard format sections and return Command objects."""
-    command_str = None
-    env_vars = {}
-    directory = None
-    command_lines: List[str] = []
-
-    lines = section_content.split('\n')
-    i = 0
-
-    while i < len(lines):
-        line = lines[i].strip()
-
-        if line.startswith('command:'):
-            command_lines.append(line.replace('command:', '', 1).strip())
-
-        if line.startswith('Command is:'):
-            command_str = line.replace('Command is:', '').strip()
-
-        elif line == 'Command environment is:':
-            # Read environment variables until we hit another section or empty line
-            i += 1
-            while i < len(lines):
-                env_line = lines[i].strip()
-                if not env_line or env_line.startswith('Execution directory is:'):
-                    break
-                if ENV_ASSIGNMENT_RE.match(env_line):
-                    var, value = env_line.split('=', 1)
-                    env_vars[var.strip()] = value.strip()
-                else:
-                    break
-                i += 1
-            i -= 1  # Adjust for the outer loop increment
-
-        elif line.startswith('Execution directory is:'):
-            directory = line.replace('Execution directory is:', '').strip()
-
-        i += 1
-
-    commands: List[Command] = []
-
-    if command_str:
-        sources = [command_str]
-    else:
-        sources = command_lines
-
-    for source in sources:
-        commands.extend(build_commands_from_command_line(source, section_name, env_vars, directory))
-
-    if not commands and command_str:
-        commands.append(
-            Command(
-                section=section_name,
-                command=command_str,
-                env_vars=env_vars,
-                directory=directory
-            )
-        )
-
-    return commands
-
-
-def execute_commands_by_names(runner: TestRunner, command_specs: List[Tuple[str, str]], raw_output: bool = False):
-    """Execute specific commands by their names in order"""
-    def conditional_print_local(*args_print, **kwargs):
-        """Print only if not in raw output mode"""
-        if not raw_output:
-            print(*args_print, **kwargs)
-    
-    if not command_specs:
-        conditional_print_local("Error: No command names specified for --run option", file=sys.stderr)
-        sys.exit(1)
-    
-    def format_spec(p, a):
-        return f'"{p} {a}"'.strip() if a else p
-        
-    conditional_print_local(f"\n=== Executing Commands by Names ===")
-    conditional_print_local(f"Requested commands: {', '.join([format_spec(p, a) for p, a in command_specs])}")
-    
-    # Find commands for each name (supporting patterns)
-    commands_to_execute = []
-    for name_pattern, extra_args in command_specs:
-        matching_commands = runner.get_commands_by_name(name_pattern)
-        if not matching_commands:
-            conditional_print_local(f"Warning: No commands found matching pattern '{name_pattern}'")
-        else:
-            conditional_print_local(f"Pattern '{name_pattern}' matched {len(matching_commands)} command(s):")
-            if extra_args:
-                conditional_print_local(f"   ... with extra args: '{extra_args}'")
-            
-            for cmd in matching_commands:
-                conditional_print_local(f"   - {cmd.get_command_name()} ({cmd.section})")
-                
-                if extra_args:
-                    cmd_parts = cmd.command.strip().split(maxsplit=1)
-                    executable = cmd_parts[0]
-                    original_args = cmd_parts[1] if len(cmd_parts) > 1 else ""
-                    
-                    # Safely split and quote user-provided arguments
-                    safe_extra_args_list = [shlex.quote(arg) for arg in shlex.split(extra_args)]
-                    safe_extra_args = " ".join(safe_extra_args_list)
-                    
-                    new_command_str = f"{executable} {safe_extra_args} {original_args}".strip()
-                    
-                    exec_cmd = Command(
-                        section=cmd.section,
-                        command=new_command_str,
-                        env_vars=cmd.env_vars,
-                        directory=cmd.directory
-                    )
-                    commands_to_execute.append(exec_cmd)
-                else:
-                    commands_to_execute.append(cmd)
-    
-    if not commands_to_execute:
-        conditional_print_local("No commands to execute", file=sys.stderr)
-        sys.exit(1)
-    
-    conditional_print_local(f"\nExecuting {len(commands_to_execute)} command(s) in order...")
-    
-    # Execute commands in order
-    results = []
-    for i, cmd in enumerate(commands_to_execute, 1):
-        conditional_print_local(f"\n{i}. Executing: {cmd.get_command_name()} (section: {cmd.section})")
-        conditional_print_local(f"   Command: {cmd.to_bash_string()}")
-        
-        return_code, stdout, stderr = cmd.execute(capture_output=not raw_output)
-        results.append((cmd, return_code, stdout, stderr))
-        
-        # In raw output mode, output is already forwarded, so no need to print results
-        if not raw_output:
-            if cmd.is_success():
-                conditional_print_local("   ✓ Success")
-            else:
-                conditional_print_local(f"   ✗ Failed (return code: {return_code})")
-                if stderr:
-                    conditional_print_local(f"   Error: {stderr}")
-    
-    # Summary
-    if not raw_output:
-        successful = sum(1 for _, rc, _, _ in results if rc == 0)
-        failed = len(results) - successful
-        
-        conditional_print_local("\n=== Execution Summary ===")
-        conditional_print_local(f"Total executed: {len(results)}")
-        conditional_print_local(f"Successful: {successful}")
-        conditional_print_local(f"Failed: {failed}")
-        
-        if failed > 0:
-            conditional_print_local("\nFailed commands:")
-            for cmd, rc, stdout, stderr in results:
-                if rc != 0:
-                    conditional_print_local(f"- {cmd.get_command_name()} ({cmd.section}): code {rc}")
-
-
-def parse_run_specs(run_specs_list: List[str]) -> List[Tuple[str, str]]:
-    """Parse a list of run spec strings into (name_pattern, extra_args) tuples."""
-    command_specs = []
-    for spec in run_specs_list:
-        parts = spec.strip().split(maxsplit=1)
-        name_pattern = parts[0]
-        extra_args = parts[1] if len(parts) > 1 else ""
-        command_specs.append((name_pattern, extra_args))
-    return command_specs
+import shutil
+
+from cmd_argv import CommandLine
+from perf_wrap import PERF_MODES, check_perf
+from result_export import DEFAULT_TAIL_LINES, open_exporters
+from flag_sweep import FlagSweep, SweepAxis
+# The parser and executor live in jtr_commands; their names are re-exported here
+# for callers that import parse_jtr
+from jtr_commands import (  # noqa: F401
+    Command,
+    CommandResult,
+    CpuAffinityPlan,
+    ExecutionOptions,
+    TestRunner,
+    apply_flag_edits,
+    build_commands_from_command_line,
+    describe_run_info,
+    execute_commands_by_names,
+    format_cpu_list,
+    format_run_info,
+    parse_commands,
+    parse_cpu_list,
+    parse_ionice,
+    parse_rerun_block,
+    parse_run_specs,
+    parse_standard_format,
+    parse_test_id,
+    run_commands,
+    with_extra_args,
+)
 
 
 def print_debug_config(runner: TestRunner, name_pattern: str, extra_args: str):
@@ -723,11 +58,12 @@ def print_debug_config(runner: TestRunner, name_pattern: str, extra_args: str):
         safe_extra_args_list = shlex.split(extra_args)
         
     # Prepare original command and args
-    command_parts = shlex.split(command_to_debug.command)
-    program = command_parts[0]
-    original_args = command_parts[1:]
+    argv = CommandLine.parse(command_to_debug.command).primary()
+    program = argv.executable
+    env = dict(command_to_debug.env_vars)
+    env.update(assignment.split('=', 1) for assignment in argv.env)
     
-    final_args = safe_extra_args_list + original_args
+    final_args = argv.apply_args(safe_extra_args_list).to_tokens()[len(argv.env) + 1:]
 
     # Create the launch config dictionary
     launch_config = {
@@ -737,13 +73,110 @@ def print_debug_config(runner: TestRunner, name_pattern: str, extra_args: str):
         "program": program,
         "args": final_args,
         "cwd": command_to_debug.directory or os.getcwd(),
-        "env": command_to_debug.env_vars
+        "env": env
     }
 
     # Print the config as a pretty-printed JSON
     print(json.dumps(launch_config, indent=4))
 
 
+def build_execution_options(args, conditional_print) -> ExecutionOptions:
+    """Build ExecutionOptions from parsed command line arguments, exiting on invalid values"""
+    if args.jobs < 1:
+        conditional_print("Error: --jobs must be at least 1", file=sys.stderr)
+        sys.exit(1)
+
+    affinity = None
+    if args.cpus or args.reserve_cpus:
+        try:
+            cpus = parse_cpu_list(args.cpus) if args.cpus else sorted(os.sched_getaffinity(0))
+            unavailable = set(cpus) - set(os.sched_getaffinity(0))
+            if unavailable:
+                raise ValueError(f"CPU(s) {format_cpu_list(unavailable)} are not available to this process")
+            affinity = CpuAffinityPlan(cpus, workers=args.jobs, reserved=args.reserve_cpus)
+        except ValueError as e:
+            conditional_print(f"Error: invalid CPU configuration: {e}", file=sys.stderr)
+            sys.exit(1)
+
+    if args.measure and args.jobs > 1 and not args.reserve_cpus:
+        conditional_print("Note: no --reserve-cpus, measurement runs wait for all workers and run alone",
+                          file=sys.stderr)
+
+    ionice = None
+    if args.ionice:
+        try:
+            ionice = parse_ionice(args.ionice)
+        except ValueError as e:
+            conditional_print(f"Error: invalid --ionice value: {e}", file=sys.stderr)
+            sys.exit(1)
+        if not shutil.which('ionice'):
+            conditional_print("Warning: 'ionice' not found in PATH, I/O priority will not be applied", file=sys.stderr)
+
+    perf_mode = args.perf
+    if perf_mode:
+        problem = check_perf()
+        if problem:
+            conditional_print(f"Warning: --perf {perf_mode} disabled: {problem}", file=sys.stderr)
+            perf_mode = None
+    if args.input_files:
+        perf_dir = os.path.splitext(os.path.abspath(args.input_files[0]))[0] + ".perf"
+    else:
+        perf_dir = os.path.abspath("perf_output")
+
+    if args.monitor_interval <= 0:
+        conditional_print("Error: --monitor-interval must be positive", file=sys.stderr)
+        sys.exit(1)
+
+    return ExecutionOptions(
+        timeout=args.timeout,
+        jobs=args.jobs,
+        affinity=affinity,
+        measure_pattern=args.measure,
+        nice=args.nice,
+        ionice=ionice,
+        monitor_dir=args.monitor,
+        monitor_interval=args.monitor_interval,
+        perf_mode=perf_mode,
+        perf_pattern=args.perf_filter,
+        perf_dir=perf_dir,
+        perf_events=args.perf_events.split(',') if args.perf_events else None
+    )
+
+
+def run_sweep(tests: List[TestRunner], args, options: ExecutionOptions, conditional_print):
+    """Run the --sweep mode: replay all tests for every variant of the --axis options"""
+    try:
+        axes = [SweepAxis.parse(spec) for spec in args.axis]
+    except ValueError as e:
+        conditional_print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    if not axes:
+        conditional_print("Error: --sweep requires at least one --axis", file=sys.stderr)
+        sys.exit(1)
+
+    sweep = FlagSweep(tests, axes, args.sweep, options=options, sample=args.sample,
+                      seed=args.seed, workdir=args.sweep_workdir)
+    total = len(sweep.variants) * len(tests)
+    conditional_print(f"\n=== Sweeping {len(sweep.variants)} variant(s) x {len(tests)} test(s) = {total} run(s) ===")
+    if options.jobs > 1 and not args.sweep_workdir:
+        conditional_print("Note: variants of one test (and tests sharing an execution directory) run one at a "
+                          "time; use --sweep-workdir to run them in parallel")
+
+    def on_complete(cell, done, count):
+        conditional_print(f"[{done}/{count}] {cell.status():8} {cell.duration:8.2f}s  "
+                          f"{cell.test_id}  {cell.variant.label}")
+        if cell.error:
+            conditional_print(f"    {cell.error}", file=sys.stderr)
+
+    sweep.run(on_complete=on_complete)
+
+    conditional_print("\n=== Sweep Matrix ===")
+    print(sweep.format_matrix())
+    if args.sweep_report:
+        sweep.write_report(args.sweep_report)
+        conditional_print(f"\nReport written to {args.sweep_report}")
+
+
 def main():
     """Main function to parse and work with Command objects"""
     
@@ -758,16 +191,23 @@ def main():
   %(prog)s --run "*compile*"              # Execute all commands matching '*compile*'
   %(prog)s --run "ark --verbose"          # Execute 'ark' with '--verbose' argument
   %(prog)s --run "ark -v" "aot_cmd --debug" # Execute 'ark' with '-v' and 'aot_cmd' with '--debug'
+  %(prog)s --run "ark --gc-type=gen-gc ^--heap-verifier"  # Replace '--gc-type', drop '--heap-verifier'
+  %(prog)s --bash --set-flag "ark*:--gc-type=gen-gc" --drop-flag "ark*:--heap-verifier"  # Rewrite flags
   %(prog)s --raw-output --run ark         # Execute 'ark' with clean output (safer order)
   %(prog)s --run "ark [-b=A,B]" --run-arg-cycle # Cycles through 'ark -b=A' and 'ark -b=B' for execution
   %(prog)s --run "ark [-b=A,B]" --run-arg-seq   # Runs 'ark -b=A' then 'ark -b=A,B'
   %(prog)s --print-debug-cfg "ark --my-arg"   # Prints a debug configuration for the 'ark' command
+  %(prog)s a.jtr b.jtr --sweep "ark*" --axis "gc=--gc-type=g1-gc|--gc-type=gen-gc" --axis "check=--compiler-check-final=true|"
+  %(prog)s --run ark --perf stat            # Count 'ark' hardware events with perf stat
+  %(prog)s --execute-all -j 4 --cpus 0-9 --reserve-cpus 2 --measure ark  # 4 pinned workers, 'ark' timed on CPUs 8-9
+  %(prog)s *.jtr --execute-all --junit results.xml --jsonl results.jsonl  # Streamed machine-readable results
         ''',
         formatter_class=argparse.RawDescriptionHelpFormatter
     )
     
-    parser.add_argument('input_file', nargs='?', 
-                       help='Optional input file with test runner output. '
+    parser.add_argument('input_files', nargs='*', metavar='input_file',
+                       help='Optional input file(s) with test runner output. Commands of several files '
+                            'are handled together; --sweep keeps them apart as separate tests. '
                             'If not provided, uses the built-in output variable.')
     
     # Mode selection (mutually exclusive)
@@ -797,6 +237,76 @@ def main():
     
     mode_group.add_argument('--print-debug-cfg', metavar='"cmd [args...]"',
                            help='Print a launch.json-style debug configuration for a command.')
+    mode_group.add_argument('--sweep', metavar='PATTERN',
+                           help='Replay every test once per combination of the --axis options, adding the '
+                                'flags to commands whose name matches PATTERN, and print a pass/fail and '
+                                'timing matrix.')
+
+    sweep_group = parser.add_argument_group('sweep', 'Options for --sweep')
+    sweep_group.add_argument('--axis', action='append', default=[], metavar='NAME=V1|V2|...',
+                             help='An option axis; each alternative is a string of flags, an empty one '
+                                  'means "not set". Example: --axis "gc=--gc-type=g1-gc|--gc-type=gen-gc"')
+    sweep_group.add_argument('--sample', type=int, metavar='N',
+                             help='Run a random sample of N variants instead of the full cartesian product')
+    sweep_group.add_argument('--seed', type=int, default=0,
+                             help='Random seed for --sample (default: 0)')
+    sweep_group.add_argument('--sweep-workdir', metavar='DIR',
+                             help='Run each variant in a private copy of the test execution directory '
+                                  'under DIR (paths to it in the commands are rewritten), so variants '
+                                  'of one test can run in parallel')
+    sweep_group.add_argument('--sweep-report', metavar='FILE',
+                             help='Write the matrix to FILE (.json, otherwise CSV)')
+
+    edit_group = parser.add_argument_group('flag edits', 'Rewrite flags of the parsed commands before any mode runs')
+    edit_group.add_argument('--set-flag', action='append', default=[], metavar='[PATTERN:]--FLAG[=VALUE]',
+                            help='Set a flag on commands whose name matches PATTERN (default: all), replacing '
+                                 'existing occurrences. Example: --set-flag "ark*:--gc-type=gen-gc"')
+    edit_group.add_argument('--drop-flag', action='append', default=[], metavar='[PATTERN:]--FLAG',
+                            help='Remove a flag (and its value) from commands whose name matches PATTERN. '
+                                 'Example: --drop-flag "ark*:--heap-verifier"')
+
+    export_group = parser.add_argument_group('export', 'Machine-readable results of --execute-all and --run, '
+                                                       'written as each command completes')
+    export_group.add_argument('--junit', metavar='FILE', help='Write JUnit XML results to FILE')
+    export_group.add_argument('--jsonl', metavar='FILE', help='Write one JSON object per command to FILE')
+    export_group.add_argument('--stderr-tail', type=int, default=DEFAULT_TAIL_LINES, metavar='N',
+                              help=f'Lines of stderr kept per command in exports (default: {DEFAULT_TAIL_LINES})')
+
+    sched_group = parser.add_argument_group('scheduling', 'Options for --execute-all and --run')
+    sched_group.add_argument('-j', '--jobs', type=int, default=1,
+                             help='Number of commands to run in parallel (default: 1)')
+    sched_group.add_argument('--progress', action='store_true',
+                             help='Live progress (counts, rate, ETA, longest-running jobs) instead of '
+                                  'per-command lines; periodic one-line updates when stdout is not a terminal')
+    sched_group.add_argument('--progress-interval', type=float, metavar='SEC',
+                             help='Seconds between progress updates (default: 0.5 on a terminal, 30 otherwise)')
+    sched_group.add_argument('--timeout', type=int, default=300,
+                             help='Per-command timeout in seconds (default: 300)')
+    sched_group.add_argument('--cpus', metavar='LIST',
+                             help='Pin workers to disjoint subsets of these CPUs, in taskset syntax '
+                                  '("0-7,12" or a hex mask "0x3F0")')
+    sched_group.add_argument('--reserve-cpus', type=int, default=0, metavar='N',
+                             help='Keep the last N CPUs of --cpus for measurement runs (see --measure)')
+    sched_group.add_argument('--measure', metavar='PATTERN',
+                             help='Commands whose name matches PATTERN are measurement runs: they run one '
+                                  'at a time on the reserved CPUs, or with no other command running if '
+                                  'none are reserved')
+    sched_group.add_argument('--nice', type=int, metavar='N',
+                             help='Niceness increment for executed commands')
+    sched_group.add_argument('--ionice', metavar='CLASS[:LEVEL]',
+                             help='I/O scheduling class and level for executed commands, e.g. "idle" or "2:7"')
+    sched_group.add_argument('--monitor', metavar='DIR',
+                             help='Sample CPU, memory and I/O of each command\'s process tree and write '
+                                  'one CSV time series per command to DIR')
+    sched_group.add_argument('--monitor-interval', type=float, default=0.1, metavar='SEC',
+                             help='Sampling interval for --monitor (default: 0.1)')
+    sched_group.add_argument('--perf', choices=PERF_MODES,
+                             help='Run the selected commands under "perf stat" or "perf record"; output is stored '
+                                  'in <first input_file>.perf/ and stat counters are added to the report')
+    sched_group.add_argument('--perf-filter', default='*', metavar='PATTERN',
+                             help='Only wrap commands whose name matches PATTERN in perf (default: all)')
+    sched_group.add_argument('--perf-events', metavar='LIST',
+                             help='Comma-separated perf events, e.g. "cycles,instructions,cache-misses"')
     
     args = parser.parse_args()
     
@@ -811,10 +321,12 @@ def main():
         mode = 'run'
     elif args.print_debug_cfg:
         mode = 'print_debug_cfg'
+    elif args.sweep:
+        mode = 'sweep'
     else:
         mode = 'info'
     
-    input_file = args.input_file
+    input_files = args.input_files
     raw_output = args.raw_output
     
     def conditional_print(*args_print, **kwargs):
@@ -823,31 +335,59 @@ def main():
             print(*args_print, **kwargs)
     
     # Determine input source
-    if input_file:
-        try:
-            with open(input_file, 'r', encoding='utf-8') as f:
-                text_to_parse = f.read()
-            conditional_print(f"# Parsed from file: {input_file}", file=sys.stderr)
-        except FileNotFoundError:
-            conditional_print(f"Error: File '{input_file}' not found", file=sys.stderr)
-            sys.exit(1)
-        except Exception as e:
-            conditional_print(f"Error reading file '{input_file}': {e}", file=sys.stderr)
-            sys.exit(1)
+    tests = []
+    if input_files:
+        for input_file in input_files:
+            try:
+                with open(input_file, 'r', encoding='utf-8') as f:
+                    text_to_parse = f.read()
+                conditional_print(f"# Parsed from file: {input_file}", file=sys.stderr)
+            except FileNotFoundError:
+                conditional_print(f"Error: File '{input_file}' not found", file=sys.stderr)
+                sys.exit(1)
+            except Exception as e:
+                conditional_print(f"Error reading file '{input_file}': {e}", file=sys.stderr)
+                sys.exit(1)
+            default_id = os.path.splitext(os.path.basename(input_file))[0]
+            tests.append(parse_commands(text_to_parse, test_id=parse_test_id(text_to_parse) or default_id))
     else:
         # Use the output variable
         text_to_parse = output
         conditional_print("# Parsed from built-in output variable", file=sys.stderr)
+        tests.append(parse_commands(text_to_parse))
     
     # Parse commands
-    runner = parse_commands(text_to_parse)
+    if len(tests) == 1:
+        runner = tests[0]
+    else:
+        runner = TestRunner([cmd for test in tests for cmd in test.commands])
     
     if not runner.count():
         conditional_print("No commands found in the output", file=sys.stderr)
         sys.exit(1)
     
+    if args.set_flag or args.drop_flag:
+        try:
+            changed = sum(apply_flag_edits(test, args.set_flag, args.drop_flag,
+                                           warn=lambda message: conditional_print(message, file=sys.stderr))
+                          for test in tests)
+        except ValueError as e:
+            conditional_print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+        conditional_print(f"# Flag edits changed {changed} command(s)", file=sys.stderr)
+
     conditional_print(f"# Found {runner.count()} command(s)", file=sys.stderr)
     
+    exec_options = build_execution_options(args, conditional_print)
+
+    exporters = []
+    if args.junit or args.jsonl:
+        if mode not in ('execute_all', 'run'):
+            conditional_print("Warning: --junit/--jsonl only apply to --execute-all and --run", file=sys.stderr)
+        else:
+            # Every record is flushed as it is written, so the files stay valid if the run is interrupted
+            exporters = open_exporters(args.junit, args.jsonl, args.stderr_tail)
+    
     # Handle --print-debug-cfg first as it's a simple exit mode
     if mode == 'print_debug_cfg':
         spec = args.print_debug_cfg
@@ -857,6 +397,10 @@ def main():
         print_debug_config(runner, name_pattern, extra_args)
         sys.exit(0)
     
+    if mode == 'sweep':
+        run_sweep(tests, args, exec_options, conditional_print)
+        sys.exit(0)
+    
     # Handle --run-arg-cycle and --run-arg-seq logic
     if mode == 'run' and (args.run_arg_cycle or args.run_arg_seq):
         if args.run_arg_cycle and args.run_arg_seq:
@@ -899,8 +443,13 @@ def main():
                 current_run_specs_list[spec_to_process_index] = new_spec_string
                 
                 command_specs = parse_run_specs(current_run_specs_list)
-                execute_commands_by_names(runner, command_specs, raw_output=raw_output)
+                exec_options.run_tag = f"variant{i + 1:02d}"
+                execute_commands_by_names(runner, command_specs, raw_output=raw_output, options=exec_options,
+                                          exporters=exporters, progress=args.progress,
+                                          progress_interval=args.progress_interval)
 
+            for exporter in exporters:
+                exporter.close()
             sys.exit(0) # We are done
         else:
             flag_name = "--run-arg-cycle" if args.run_arg_cycle else "--run-arg-seq"
@@ -923,12 +472,19 @@ def main():
     
     elif mode == 'execute_all':
         # Execute all commands automatically
-        runner.execute_all(capture_output=not raw_output, raw_output=raw_output)
+        runner.execute_all(capture_output=not raw_output, raw_output=raw_output, options=exec_options,
+                           exporters=exporters, progress=args.progress,
+                           progress_interval=args.progress_interval)
     
     elif mode == 'run':
         # Execute specific commands by name in order
         command_specs = parse_run_specs(args.run)
-        execute_commands_by_names(runner, command_specs, raw_output=raw_output)
+        execute_commands_by_names(runner, command_specs, raw_output=raw_output, options=exec_options,
+                                  exporters=exporters, progress=args.progress,
+                                  progress_interval=args.progress_interval)
+
+    for exporter in exporters:
+        exporter.close()
 
 
 if __name__ == "__main__":
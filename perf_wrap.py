@@ -0,0 +1,109 @@
+"""
+Helpers for running replayed commands under Linux `perf`.
+
+`perf stat` is run in CSV mode (-x,) so its counters can be parsed into the
+result report; `perf record` output is only stored for later inspection with
+`perf report`.
+"""
+
+import shutil
+import subprocess
+from typing import Dict, List, Optional
+
+
+PERF_MODES = ("stat", "record")
+
+# Derived metrics computed from `perf stat` counters when both are present
+DERIVED_METRICS = {
+    "IPC": ("instructions", "cycles"),
+    "branch-miss-rate": ("branch-misses", "branches"),
+    "cache-miss-rate": ("cache-misses", "cache-references"),
+}
+
+
+def check_perf() -> Optional[str]:
+    """Return None when `perf` can count events here, or a message explaining why it cannot"""
+    perf = shutil.which('perf')
+    if not perf:
+        return "'perf' not found in PATH (install linux-tools for the running kernel)"
+    try:
+        result = subprocess.run([perf, 'stat', '-x', ',', '-e', 'task-clock', '--', 'true'],
+                                capture_output=True, text=True, timeout=30)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        return f"'perf' could not be started: {e}"
+    if result.returncode != 0:
+        reason = result.stderr.strip().splitlines()
+        hint = reason[0] if reason else f"exit code {result.returncode}"
+        return f"'perf stat' does not work here ({hint}); check /proc/sys/kernel/perf_event_paranoid"
+    return None
+
+
+def perf_output_suffix(mode: str) -> str:
+    return ".perf.csv" if mode == "stat" else ".perf.data"
+
+
+def build_perf_args(mode: str, output_path: str, events: Optional[List[str]] = None) -> List[str]:
+    """perf command prefix writing its results to output_path"""
+    if mode not in PERF_MODES:
+        raise ValueError(f"unsupported perf mode '{mode}', expected one of {', '.join(PERF_MODES)}")
+
+    if mode == "stat":
+        args = ['perf', 'stat', '-x', ',', '-o', output_path]
+    else:
+        args = ['perf', 'record', '-g', '-o', output_path]
+    if events:
+        args += ['-e', ",".join(events)]
+    return args + ['--']
+
+
+def parse_perf_stat_csv(text: str) -> Dict[str, float]:
+    """
+    Parse `perf stat -x,` output into {event: value}.
+
+    Uncounted or unsupported events are skipped. Known ratios (IPC, miss rates)
+    are added when their counters are available.
+    """
+    counters: Dict[str, float] = {}
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        fields = line.split(',')
+        if len(fields) < 3:
+            continue
+        value, event = fields[0], fields[2]
+        if not event:
+            continue
+        try:
+            counters[event] = float(value)
+        except ValueError:
+            # "<not counted>" / "<not supported>"
+            continue
+
+    for name, (numerator, denominator) in DERIVED_METRICS.items():
+        num = _find_counter(counters, numerator)
+        den = _find_counter(counters, denominator)
+        if num is not None and den:
+            counters[name] = num / den
+    return counters
+
+
+def _find_counter(counters: Dict[str, float], event: str) -> Optional[float]:
+    # Events may carry modifiers or PMU prefixes, e.g. "cycles:u" or "cpu_core/cycles/"
+    for name, value in counters.items():
+        if name == event or name.split(':')[0] == event or name.strip('/').split('/')[-1] == event:
+            return value
+    return None
+
+
+def format_perf_counters(counters: Dict[str, float], limit: int = 6) -> str:
+    """Compact one-line representation of the most relevant counters"""
+    preferred = ["task-clock", "cycles", "instructions", "IPC", "branch-miss-rate", "cache-miss-rate",
+                 "context-switches", "page-faults"]
+    names = [n for n in preferred if n in counters]
+    names += [n for n in counters if n not in names]
+    parts = []
+    for name in names[:limit]:
+        value = counters[name]
+        parts.append(f"{name}={value:.3f}" if value < 100 else f"{name}={value:,.0f}")
+    return " ".join(parts)
@@ -0,0 +1,286 @@
+"""
+Lightweight /proc sampler for the process tree of a running command.
+
+Polls /proc/<pid>/stat, status and io of the root process and all its
+descendants at a fixed interval and keeps a compact time series of the whole
+tree: CPU usage, resident and swapped memory, I/O and host swap activity.
+All samplers share one thread and one /proc scan per tick, however many
+commands run in parallel.
+The series is written as CSV; the summary flags memory spikes and swapping,
+so runs that push a host into swap are visible without a profiler.
+"""
+
+import os
+import threading
+import time
+from array import array
+from typing import Dict, List, Optional
+
+
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+
+# Columns of the time series, in CSV order
+COLUMNS = (
+    "time_s",          # seconds since the sampler started
+    "processes",       # live processes in the tree
+    "cpu_percent",     # CPU usage of the tree since the previous sample (100 = one core)
+    "rss_kb",          # sum of VmRSS over the tree
+    "swap_kb",         # sum of VmSwap over the tree
+    "read_bytes",      # cumulative storage reads of live processes
+    "write_bytes",     # cumulative storage writes of live processes
+    "host_swap_out",   # pages swapped out host-wide since the sampler started
+)
+
+# A sample is a spike when RSS exceeds SPIKE_FACTOR times the median RSS of the
+# run and is at least SPIKE_MIN_DELTA_KB above it
+SPIKE_FACTOR = 1.5
+SPIKE_MIN_DELTA_KB = 64 * 1024
+
+
+def _read_file(path: str) -> Optional[str]:
+    try:
+        with open(path, 'r') as f:
+            return f.read()
+    except OSError:
+        # Process exited between listing and reading, or access denied (e.g. io of foreign processes)
+        return None
+
+
+def _parse_stat(text: str) -> List[str]:
+    # comm (field 2) may contain spaces and parentheses; fields after it are space separated
+    return text[text.rindex(')') + 2:].split()
+
+
+def read_children_map() -> Dict[int, List[int]]:
+    """Map of parent pid -> child pids of every live process (one scan of /proc)"""
+    children: Dict[int, List[int]] = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        text = _read_file(f'/proc/{entry}/stat')
+        if not text:
+            continue
+        fields = _parse_stat(text)
+        children.setdefault(int(fields[1]), []).append(int(entry))
+    return children
+
+
+def list_process_tree(root_pid: int, children: Optional[Dict[int, List[int]]] = None) -> List[int]:
+    """Return root_pid and all its live descendants"""
+    if children is None:
+        children = read_children_map()
+    tree = []
+    pending = [root_pid]
+    while pending:
+        pid = pending.pop()
+        tree.append(pid)
+        pending.extend(children.get(pid, []))
+    return tree
+
+
+def read_process_sample(pid: int) -> Optional[Dict[str, int]]:
+    """Read CPU ticks, memory and I/O counters of a single process, or None if it is gone"""
+    stat = _read_file(f'/proc/{pid}/stat')
+    status = _read_file(f'/proc/{pid}/status')
+    if stat is None or status is None:
+        return None
+
+    fields = _parse_stat(stat)
+    # utime, stime, cutime, cstime: cutime/cstime cover reaped children that left the tree
+    sample = {'ticks': sum(int(v) for v in fields[11:15]), 'rss_kb': 0, 'swap_kb': 0,
+              'read_bytes': 0, 'write_bytes': 0}
+
+    for line in status.splitlines():
+        if line.startswith('VmRSS:'):
+            sample['rss_kb'] = int(line.split()[1])
+        elif line.startswith('VmSwap:'):
+            sample['swap_kb'] = int(line.split()[1])
+
+    io = _read_file(f'/proc/{pid}/io')
+    if io:
+        for line in io.splitlines():
+            key, _, value = line.partition(':')
+            if key in ('read_bytes', 'write_bytes'):
+                sample[key] = int(value)
+    return sample
+
+
+def read_host_swap_out() -> int:
+    """Pages swapped out host-wide since boot (pswpout in /proc/vmstat)"""
+    text = _read_file('/proc/vmstat') or ""
+    for line in text.splitlines():
+        if line.startswith('pswpout '):
+            return int(line.split()[1])
+    return 0
+
+
+def find_memory_spikes(times, rss_kb, factor: float = SPIKE_FACTOR,
+                       min_delta_kb: int = SPIKE_MIN_DELTA_KB) -> List[Dict[str, float]]:
+    """
+    Find memory spikes in an RSS series.
+
+    Consecutive samples above the threshold are merged into one spike, reported
+    with its start time, duration and peak RSS.
+    """
+    values = [v for v in rss_kb if v > 0]
+    if not values:
+        return []
+    median = sorted(values)[len(values) // 2]
+    threshold = max(median * factor, median + min_delta_kb)
+
+    spikes = []
+    current = None
+    for t, rss in zip(times, rss_kb):
+        if rss > threshold:
+            if current is None:
+                current = {'start_s': t, 'duration_s': 0.0, 'peak_rss_kb': rss}
+                spikes.append(current)
+            current['duration_s'] = t - current['start_s']
+            current['peak_rss_kb'] = max(current['peak_rss_kb'], rss)
+        else:
+            current = None
+    return spikes
+
+
+class _ProcScanner:
+    """
+    The single background thread behind all ProcessTreeSamplers.
+
+    Each tick lists /proc once and hands the parent/child map to every sampler
+    that is due, so parallel commands do not each scan the whole of /proc.
+    The thread exits when the last sampler is removed.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._samplers: List['ProcessTreeSampler'] = []
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, sampler: 'ProcessTreeSampler'):
+        with self._lock:
+            self._samplers.append(sampler)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="proc-monitor", daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def remove(self, sampler: 'ProcessTreeSampler'):
+        # Samples are taken under the lock, so none is in flight once this returns
+        with self._lock:
+            if sampler in self._samplers:
+                self._samplers.remove(sampler)
+        self._wake.set()
+
+    def _loop(self):
+        while True:
+            with self._lock:
+                if not self._samplers:
+                    self._thread = None
+                    return
+                now = time.monotonic()
+                due = [sampler for sampler in self._samplers if sampler.next_due <= now]
+                if due:
+                    children = read_children_map()
+                    swap_out = read_host_swap_out()
+                    for sampler in due:
+                        sampler.record(children, swap_out, now)
+                delay = min(sampler.next_due for sampler in self._samplers) - time.monotonic()
+            # All remaining trees have exited: sleep until a sampler is added or removed
+            self._wake.wait(max(delay, 0.001) if delay != float('inf') else None)
+            self._wake.clear()
+
+
+_scanner = _ProcScanner()
+
+
+class ProcessTreeSampler:
+    """Samples the process tree of `pid` on the shared monitor thread"""
+
+    def __init__(self, pid: int, interval: float = 0.1, output_path: Optional[str] = None):
+        self.pid = pid
+        self.interval = interval
+        self.output_path = output_path
+        self.series = {name: array('d') for name in COLUMNS}
+        self.next_due = 0.0
+        self._start_time = 0.0
+        self._swap_base = 0
+        self._prev_ticks: Optional[int] = None
+        self._prev_time = 0.0
+
+    def start(self):
+        self._start_time = time.monotonic()
+        self._swap_base = read_host_swap_out()
+        self.next_due = self._start_time
+        _scanner.add(self)
+
+    def stop(self):
+        """Stop sampling and write the series to output_path, if set"""
+        _scanner.remove(self)
+        if self.output_path:
+            self.write_csv(self.output_path)
+
+    def record(self, children: Dict[int, List[int]], host_swap_out: int, now: float):
+        """Append one sample of the tree, given a parent/child map of the host"""
+        self.next_due = now + self.interval
+        elapsed = now - self._start_time
+        samples = [s for s in (read_process_sample(p) for p in list_process_tree(self.pid, children)) if s]
+        if not samples:
+            # The tree has exited; keep the series as it is until stop()
+            self.next_due = float('inf')
+            return
+
+        ticks = sum(s['ticks'] for s in samples)
+        cpu = 0.0
+        if self._prev_ticks is not None and elapsed > self._prev_time:
+            cpu = max(0, ticks - self._prev_ticks) / CLOCK_TICKS / (elapsed - self._prev_time) * 100
+        self._prev_ticks, self._prev_time = ticks, elapsed
+
+        row = (elapsed, len(samples), cpu,
+               sum(s['rss_kb'] for s in samples),
+               sum(s['swap_kb'] for s in samples),
+               sum(s['read_bytes'] for s in samples),
+               sum(s['write_bytes'] for s in samples),
+               host_swap_out - self._swap_base)
+        for name, value in zip(COLUMNS, row):
+            self.series[name].append(value)
+
+    def write_csv(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(",".join(COLUMNS) + "\n")
+            for row in zip(*(self.series[name] for name in COLUMNS)):
+                f.write(",".join(f"{v:g}" for v in row) + "\n")
+
+    def summary(self) -> Dict[str, object]:
+        """Peak values of the run, detected memory spikes and whether anything was swapped"""
+        series = self.series
+        samples = len(series['time_s'])
+        summary = {
+            'samples': samples,
+            'peak_rss_kb': int(max(series['rss_kb'], default=0)),
+            'peak_swap_kb': int(max(series['swap_kb'], default=0)),
+            'peak_cpu_percent': round(max(series['cpu_percent'], default=0.0), 1),
+            'peak_processes': int(max(series['processes'], default=0)),
+            'host_swap_out_pages': int(series['host_swap_out'][-1]) if samples else 0,
+            'spikes': find_memory_spikes(series['time_s'], series['rss_kb']),
+            'csv': self.output_path,
+        }
+        summary['swapping'] = summary['peak_swap_kb'] > 0 or summary['host_swap_out_pages'] > 0
+        return summary
+
+
+def format_summary(summary: Dict[str, object]) -> str:
+    """One-line human-readable form of ProcessTreeSampler.summary()"""
+    text = (f"peak RSS {summary['peak_rss_kb'] / 1024:.1f} MiB, "
+            f"peak CPU {summary['peak_cpu_percent']}%")
+    if summary['samples']:
+        text += f", {summary['samples']} samples"
+    if summary['spikes']:
+        text += f", {len(summary['spikes'])} memory spike(s)"
+    if summary['swapping']:
+        text += (f", SWAPPING (tree {summary['peak_swap_kb']} KiB, "
+                 f"host {summary['host_swap_out_pages']} pages out)")
+    return text
@@ -0,0 +1,165 @@
+"""
+Live progress display for long replays.
+
+Fed from the on_start/on_complete callbacks of parse_jtr.run_commands. On a
+terminal it redraws a small block in place (completed/running/queued counts,
+pass/fail, commands per minute, ETA and the longest-running jobs); otherwise
+it prints one summary line every `interval` seconds. The ETA uses the mean
+duration of completed commands with the same executable name (falling back to
+the mean of all completed commands), spread over the parallel workers.
+"""
+
+import shutil
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+def format_duration(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return "--"
+    seconds = int(round(seconds))
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+class ProgressDisplay:
+    """Progress of a batch of commands; use as a context manager around run_commands"""
+
+    def __init__(self, commands: List[object], jobs: int = 1, stream=None, interval: Optional[float] = None,
+                 top: int = 3, clock: Callable[[], float] = time.monotonic):
+        self.stream = stream or sys.stdout
+        self.tty = hasattr(self.stream, 'isatty') and self.stream.isatty()
+        self.interval = interval or (0.5 if self.tty else 30.0)
+        self.jobs = max(1, jobs)
+        self.top = top
+        self.clock = clock
+        self.total = len(commands)
+        self.passed = 0
+        self.failed = 0
+        self.running: Dict[int, Tuple[str, str, float]] = {}
+        self._queued = Counter(cmd.get_command_name() for cmd in commands)
+        self._durations: Dict[str, List[float]] = {}
+        self._started = clock()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._drawn_lines = 0
+        self._last_frame: List[str] = []
+
+    def __enter__(self) -> 'ProgressDisplay':
+        self._started = self.clock()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self.draw(final=True)
+
+    def start(self, index: int, cmd):
+        name = cmd.get_command_name()
+        with self._lock:
+            self._queued[name] -= 1
+            self.running[index] = (name, cmd.test_id or cmd.section, self.clock())
+
+    def complete(self, index: int, cmd, return_code: int):
+        with self._lock:
+            name, _, started = self.running.pop(index, (cmd.get_command_name(), "", self.clock()))
+            totals = self._durations.setdefault(name, [0.0, 0])
+            totals[0] += self.clock() - started
+            totals[1] += 1
+            if return_code == 0:
+                self.passed += 1
+            else:
+                self.failed += 1
+
+    def log(self, message: str):
+        """Print a line above the live block without breaking it"""
+        with self._lock:
+            self._clear()
+            self.stream.write(message + "\n")
+            self._last_frame = []
+        if self.tty:
+            self.draw()
+
+    def _mean(self, name: str) -> Optional[float]:
+        totals = self._durations.get(name)
+        if totals and totals[1]:
+            return totals[0] / totals[1]
+        total_time = sum(t for t, _ in self._durations.values())
+        count = sum(c for _, c in self._durations.values())
+        return total_time / count if count else None
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            now = self.clock()
+            done = self.passed + self.failed
+            queued = sum(self._queued.values())
+            elapsed = now - self._started
+            remaining_work = 0.0
+            eta: Optional[float] = None
+            if done:
+                for name, count in self._queued.items():
+                    if count > 0:
+                        remaining_work += count * self._mean(name)
+                for name, _, started in self.running.values():
+                    remaining_work += max(self._mean(name) - (now - started), 0.0)
+                workers = min(self.jobs, queued + len(self.running)) or 1
+                eta = remaining_work / workers
+            longest = sorted(((now - started, name, label) for name, label, started in self.running.values()),
+                             reverse=True)[:self.top]
+            return {
+                'total': self.total, 'done': done, 'passed': self.passed, 'failed': self.failed,
+                'running': len(self.running), 'queued': queued, 'elapsed': elapsed,
+                'per_minute': done / elapsed * 60 if elapsed > 0 else 0.0, 'eta': eta, 'longest': longest,
+            }
+
+    def render(self, snap: Dict[str, object]) -> List[str]:
+        head = (f"{snap['done']}/{snap['total']} done  ✓ {snap['passed']}  ✗ {snap['failed']}  "
+                f"running {snap['running']}  queued {snap['queued']}")
+        rate = (f"{snap['per_minute']:.1f} cmd/min  elapsed {format_duration(snap['elapsed'])}  "
+                f"ETA {format_duration(snap['eta'])}")
+        if not self.tty:
+            line = f"[progress] {head}, {rate}"
+            if snap['longest']:
+                age, name, label = snap['longest'][0]
+                line += f"; longest: {name} {format_duration(age)} ({label})"
+            return [line]
+        lines = [f"Progress: {head}", f"Rate: {rate}"]
+        if snap['longest']:
+            lines.append("Longest running:")
+            lines += [f"  {format_duration(age):>6}  {name}  {label}" for age, name, label in snap['longest']]
+        width = shutil.get_terminal_size().columns
+        return [line[:width - 1] for line in lines]
+
+    def _clear(self):
+        if self.tty and self._drawn_lines:
+            # Back to the first line of the block and clear to the end of the screen
+            self.stream.write(f"\x1b[{self._drawn_lines}F\x1b[J")
+            self._drawn_lines = 0
+
+    def draw(self, final: bool = False):
+        lines = self.render(self.snapshot())
+        with self._lock:
+            if self.tty:
+                if lines == self._last_frame and not final:
+                    return
+                self._clear()
+                self.stream.write("".join(line + "\n" for line in lines))
+                self._drawn_lines = len(lines)
+            elif final or lines != self._last_frame:
+                self.stream.write(lines[0] + "\n")
+            self._last_frame = lines
+            self.stream.flush()
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self.draw()
@@ -0,0 +1,153 @@
+"""
+Machine-readable result exporters for replays.
+
+Each exporter writes one record per command as it completes (the on_complete
+callback of parse_jtr.run_commands) and flushes it, so memory stays constant
+however many commands run and an interrupted run leaves a valid file:
+
+- JSON lines: one object per line, readable up to the last complete line.
+- JUnit XML: the closing tags are rewritten after every test case, and the
+  suite counters are fixed-width attributes updated in place.
+"""
+
+import json
+import os
+import re
+import time
+from typing import List, Optional
+from xml.sax.saxutils import escape, quoteattr
+
+
+DEFAULT_TAIL_LINES = 40
+
+# Characters that are not allowed in XML 1.0 documents
+_XML_INVALID_RE = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+
+
+def tail_lines(text: str, count: int) -> str:
+    """Last `count` lines of text"""
+    if count <= 0 or not text:
+        return ""
+    end = len(text.rstrip('\n'))
+    start = end
+    for _ in range(count):
+        start = text.rfind('\n', 0, start)
+        if start < 0:
+            return text[:end]
+    return text[start + 1:end]
+
+
+def result_record(index: int, cmd, return_code: int, stderr: str,
+                  tail: int = DEFAULT_TAIL_LINES) -> dict:
+    """Exported fields of one command result (cmd is a parse_jtr.Command)"""
+    info = cmd.get_last_run_info()
+    duration = info.get('duration', 0.0)
+    record = {
+        'index': index,
+        'test': cmd.test_id,
+        'section': cmd.section,
+        'executable': cmd.get_command_name(),
+        'command': cmd.to_bash_string(),
+        'exit_code': return_code,
+        'start': round(info['start'], 3) if 'start' in info else None,
+        'duration': round(duration, 3),
+        'stderr_tail': tail_lines(stderr, tail),
+    }
+    # Only runs with an affinity plan are pinned; others run wherever the scheduler puts them
+    if info.get('cpus'):
+        record['cpus'] = info['cpus']
+    return record
+
+
+class JsonLinesExporter:
+    """One JSON object per completed command"""
+
+    def __init__(self, path: str, tail: int = DEFAULT_TAIL_LINES):
+        self.path = path
+        self.tail = tail
+        self._file = open(path, 'w', encoding='utf-8')
+
+    def add(self, index: int, cmd, return_code: int, stdout: str, stderr: str):
+        self._file.write(json.dumps(result_record(index, cmd, return_code, stderr, self.tail)) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class JUnitXmlExporter:
+    """
+    A single <testsuite> with one <testcase> per command, classname = test id.
+
+    The document is complete after every add(): the next test case overwrites the
+    closing tags, and the tests/failures/time attributes of the suite are padded
+    to a fixed width so they can be rewritten in place.
+    """
+
+    CLOSING = "</testsuite>\n</testsuites>\n"
+
+    def __init__(self, path: str, suite_name: str = "parse_jtr", tail: int = DEFAULT_TAIL_LINES):
+        self.path = path
+        self.tail = tail
+        self.tests = 0
+        self.failures = 0
+        self.time = 0.0
+        self._file = open(path, 'w+', encoding='utf-8')
+        timestamp = time.strftime('%Y-%m-%dT%H:%M:%S')
+        self._file.write('<?xml version="1.0" encoding="UTF-8"?>\n<testsuites>\n'
+                         f'<testsuite name={quoteattr(suite_name)} timestamp="{timestamp}" ')
+        self._counters_offset = self._file.tell()
+        self._file.write(self._counters() + ">\n")
+        self._end_offset = self._file.tell()
+        self._finish()
+
+    def _counters(self) -> str:
+        return f'tests="{self.tests:010d}" failures="{self.failures:010d}" errors="0" time="{self.time:014.3f}"'
+
+    def _finish(self):
+        self._file.write(self.CLOSING)
+        self._file.truncate()
+        self._file.seek(self._counters_offset)
+        self._file.write(self._counters())
+        self._file.flush()
+
+    def add(self, index: int, cmd, return_code: int, stdout: str, stderr: str):
+        record = result_record(index, cmd, return_code, stderr, self.tail)
+        self.tests += 1
+        self.time += record['duration']
+        name = f"{index}. {record['section']}: {record['executable']}"
+        case = [f'  <testcase classname={quoteattr(record["test"] or record["section"])} '
+                f'name={quoteattr(name)} time="{record["duration"]:.3f}">']
+        if return_code != 0:
+            self.failures += 1
+            message = f"exit code {return_code}"
+            # The stderr tail goes to <system-err> below, once
+            case.append(f'    <failure message={quoteattr(message)} type="exit"/>')
+        case.append(f'    <system-out>{_xml_text(record["command"])}</system-out>')
+        if record['stderr_tail']:
+            case.append(f'    <system-err>{_xml_text(record["stderr_tail"])}</system-err>')
+        case.append('  </testcase>\n')
+
+        self._file.seek(self._end_offset)
+        self._file.write("\n".join(case))
+        self._end_offset = self._file.tell()
+        self._finish()
+
+    def close(self):
+        self._file.close()
+
+
+def _xml_text(text: str) -> str:
+    return escape(_XML_INVALID_RE.sub('?', text))
+
+
+def open_exporters(junit: Optional[str] = None, jsonl: Optional[str] = None,
+                   tail: int = DEFAULT_TAIL_LINES) -> List[object]:
+    """Exporters for the requested output files (creating their directories)"""
+    exporters = []
+    for path, factory in ((junit, JUnitXmlExporter), (jsonl, JsonLinesExporter)):
+        if path:
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            exporters.append(factory(path, tail=tail))
+    return exporters
@@ -4,6 +4,7 @@ if [[ ! -d $STATIC_ROOT_DIR ]]; then
 fi
 
 export ROOT_DIR=${STATIC_ROOT_DIR}/../..
+SCRIPT_DIR=$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)
 
 
 export NODE_TLS_REJECT_UNAUTHORIZED=0
@@ -13,6 +14,8 @@ ninja_build=false
 keep_logs=false
 debug=false
 debug_dump=false
+aot_coverage=false
+stdlib_aot=false
 device=false
 generate=false
 run_only=false
@@ -52,6 +55,14 @@ while [[ $# -gt 0 ]]; do
             debug_dump=true
             shift
             ;;  
+        -A|--aot-coverage)
+            aot_coverage=true
+            shift
+            ;;
+        --stdlib-aot)
+            stdlib_aot=true
+            shift
+            ;;
         -D|--device)
             device=true
             shift
@@ -167,6 +178,17 @@ function run_flaky() {
     return $?
 }
 
+# Runtime options shared by ark_aot and ark; an .an is only loaded by a runtime with the same GC
+ark_runtime_options=(
+    --gc-type=g1-gc
+    --heap-verifier=fail_on_verification:pre:into:before_g1_concurrent:post
+    --full-gc-bombing-frequency=0
+)
+ark_aot_check_options=(
+    --compiler-check-final=true
+    --compiler-ignore-failures=false
+)
+
 function run_ark() {
     aot_options=(
         --compiler-inline-external-methods-aot=true
@@ -195,11 +217,8 @@ function run_ark() {
         echo "Run ark_aot:"
         ark_aot_command=(
             ${BUILD_DIR}/bin/ark_aot
-            --gc-type=g1-gc
-            --heap-verifier=fail_on_verification:pre:into:before_g1_concurrent:post
-            --full-gc-bombing-frequency=0
-            --compiler-check-final=true
-            --compiler-ignore-failures=false
+            "${ark_runtime_options[@]}"
+            "${ark_aot_check_options[@]}"
             "${aot_options[@]}"
             --boot-panda-files=${BUILD_DIR}/plugins/ets/etsstdlib.abc
             --load-runtimes=ets
@@ -217,6 +236,11 @@ function run_ark() {
         fi
     fi
 
+    aot_files=${intermediate_dir}/${test}.ets.an
+    if [[ -n $stdlib_an ]]; then
+        aot_files=${stdlib_an}:${aot_files}
+    fi
+
     echo "Run ark:"
     ark_command=(
         ${BUILD_DIR}/bin/ark
@@ -224,14 +248,12 @@ function run_ark() {
         --log-stream=file
         --log-debug=AOT
         --enable-an:force
-        --gc-type=g1-gc
-        --heap-verifier=fail_on_verification:pre:into:before_g1_concurrent:post
-        --full-gc-bombing-frequency=0
+        "${ark_runtime_options[@]}"
         --boot-panda-files=${BUILD_DIR}/plugins/ets/etsstdlib.abc
         --load-runtimes=ets
         --verification-mode=ahead-of-time
         --aot-files
-        ${intermediate_dir}/${test}.ets.an
+        ${aot_files}
         --compiler-enable-jit=false
         --panda-files=${intermediate_dir}/${test}.ets.abc
         ${intermediate_dir}/${test}.ets.abc
@@ -246,6 +268,9 @@ function run_ark() {
     if [[ $debug == true ]]; then
         echo "${ark_command[@]}"
     fi
+    if [[ $aot_coverage == true ]]; then
+        python3 ${SCRIPT_DIR}/aot_coverage.py --classes ${intermediate_dir}/${test}_ark.log
+    fi
 }
 
 function direct_test() {
@@ -341,111 +366,35 @@ if [ "$ninja_build" = true ]; then
 
 fi
 
-if [[ $generate == true ]]; then
-    for test in ${tests[@]}; do
-        test_yaml="${test%%_*}"
-        test_name=$(echo "$test" | sed 's/[0-9]*$//')
-        ${STATIC_ROOT_DIR}/tests/tests-u-runner/tools/generate-es-checked/main.rb \
-            --out ${BUILD_DIR}/es2p/gen \
-            --tmp ${BUILD_DIR}/es2p/tmp \
-            --ts-node=npx:--prefix:${STATIC_ROOT_DIR}/tests/tests-u-runner/tools/generate-es-checked:ts-node:-P:${STATIC_ROOT_DIR}/tests/tests-u-runner/tools/generate-es-checked/tsconfig.json \
-            --filter "^${test_name}$" \
-            ${STATIC_ROOT_DIR}/plugins/ets/tests/ets_es_checked/${test_yaml}.yaml
+stdlib_an=""
+if [[ $stdlib_aot == true ]]; then
+    # Cached etsstdlib.an, recompiled only when the stdlib, ark_aot or options change.
+    # It is built with the options of run_ark, otherwise ark does not load it.
+    stdlib_aot_options=()
+    for option in "${ark_runtime_options[@]}" "${ark_aot_check_options[@]}" --compiler-emit-debug-info=true; do
+        stdlib_aot_options+=(--option=${option})
     done
+    stdlib_an=$(python3 ${SCRIPT_DIR}/stdlib_aot.py build --build-dir ${BUILD_DIR} "${stdlib_aot_options[@]}") || exit 1
 fi
 
-if [[ $device == true ]]; then
-
-    function HDC() {
-        hdc -s ${HDC_SERVER_IP_PORT} -t ${HDC_DEVICE_SERIAL} ${@}
-    }
-    function HDC_SEND() {
-        hdc -s ${HDC_SERVER_IP_PORT} -t ${HDC_DEVICE_SERIAL} file send ${@}
-    }
-
-    lock_device()
-    {
-        if [[ `HDC shell file $MUTEX` == *"cannot"* ]]; then
-            echo Device is free - locking...
-            HDC shell "echo $USER > $MUTEX"
-            return 0
-        else
-            echo Device is busy by `HDC shell cat $MUTEX` ...
-            return 1
-        fi        
-    }
-    
-    release_device()
-    {
-        echo Release device
-        HDC shell rm $MUTEX
-    }
-
-    MUTEX=/data/local/tmp/mutex
-    MODE=release
-
-    trap release_device EXIT INT TERM HUP
-
-
-    test=${tests[0]}
-
-    set -e
-
-    es2panda_command=(
-        ${BUILD_DIR}/bin/es2panda
-        --arktsconfig=${BUILD_DIR}/tools/es2panda/generated/arktsconfig.json
-        --gen-stdlib=false
-        --extension=ets
-        --opt-level=2
-        --output=${intermediate_dir}/${test}.ets.abc
-        ${BUILD_DIR}/es2p/gen/${test}.ets
-    )
-    "${es2panda_command[@]}"
-
-    ark_aot_command=(
-        ${BUILD_DIR}/bin/ark_aot
-        --gc-type=g1-gc
-        --heap-verifier=fail_on_verification:pre:into:before_g1_concurrent:post
-        --full-gc-bombing-frequency=0
-        --compiler-check-final=true
-        --compiler-ignore-failures=false
-        "${aot_options[@]}"
-        --boot-panda-files=${BUILD_DIR}/plugins/ets/etsstdlib.abc
-        --load-runtimes=ets
-        --paoc-panda-files
-        ${intermediate_dir}/${test}.ets.abc
-        --paoc-output
-        ${intermediate_dir}/${test}.ets.an
-    )
-    "${ark_aot_command[@]}"
-
-    if ! lock_device; then
-        exit
-    fi
-
-    TEMP_DIR=${intermediate_dir}
-    TEST=${test}.ets
-
-    HDC_SEND $TEMP_DIR/$TEST.abc $DEV_HOME/$TEST.abc
-    HDC_SEND $TEMP_DIR/$TEST.an $DEV_HOME/$TEST.an 
+if [[ $generate == true ]]; then
+    # One generator run per yaml, skipped when the yaml and generator are unchanged
+    python3 ${SCRIPT_DIR}/es_generate.py \
+        --static-root ${STATIC_ROOT_DIR} \
+        --build-dir ${BUILD_DIR} \
+        -j ${processes} \
+        "${tests[@]}"
+fi
 
-    ark_command=(
-        --enable-an:force
-        --gc-type=g1-gc
-        --heap-verifier=fail_on_verification:pre:into:before_g1_concurrent:post
-        --full-gc-bombing-frequency=0
-        --boot-panda-files=$DEV_HOME/etsstdlib.abc
-        --load-runtimes=ets
-        --verification-mode=ahead-of-time
-        --aot-files=$DEV_HOME/$TEST.an
-        --compiler-enable-jit=false
-        --panda-files=$DEV_HOME/$TEST.abc
-        $DEV_HOME/$TEST.abc
-        ${test}.ETSGLOBAL::main
-    )
-    HDC shell "(hilog -r) && \time -v /system/bin/taskset -a 3F0 env LD_LIBRARY_PATH=$DEV_HOME/lib $DEV_HOME/ark ${ark_command[@]}"
+if [[ $device == true ]]; then
 
-    release_device
+    # Compiles on the host while the device runs the previous test, pushes only
+    # changed .abc/.an files and waits for a busy device (see device_exec.py).
+    # Uses HDC_SERVER_IP_PORT, HDC_DEVICE_SERIAL and DEV_HOME.
+    python3 ${SCRIPT_DIR}/device_exec.py \
+        --build-dir ${BUILD_DIR} \
+        --intermediate-dir ${intermediate_dir} \
+        "${tests[@]}"
 
 elif [ ${#tests[@]} -eq 0 ]; then
     es2p
@@ -0,0 +1,270 @@
+"""
+Cache of AOT-compiled etsstdlib.an for faster ark startup.
+
+Every ark run in run_es2p.sh boots `plugins/ets/etsstdlib.abc`, so without an
+AOT image of the stdlib its code is interpreted on every test. This module
+compiles `etsstdlib.an` with ark_aot and caches it under a key made of the
+stdlib abc hash, the ark_aot hash (binary and compiler libraries) and the
+compiler options, so it is rebuilt only when one of them changes. File hashes
+are memoized by size and mtime, so repeated lookups do not re-read large
+binaries.
+
+`build` prints the path to add to `--aot-files`; `bench` measures ark startup
+with and without it.
+"""
+
+import argparse
+import fcntl
+import glob
+import hashlib
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+
+# Runtime options run_es2p.sh passes to both ark_aot and ark: an .an file compiled for
+# another GC is rejected by the runtime, so the stdlib image must use the same ones
+RUNTIME_OPTIONS = ["--gc-type=g1-gc", "--heap-verifier=fail_on_verification:pre:into:before_g1_concurrent:post",
+                   "--full-gc-bombing-frequency=0"]
+DEFAULT_OPTIONS = RUNTIME_OPTIONS + ["--compiler-check-final=true", "--compiler-ignore-failures=false",
+                                     "--compiler-emit-debug-info=true"]
+STDLIB_ABC = "plugins/ets/etsstdlib.abc"
+# Libraries that determine the generated code besides the ark_aot binary itself
+COMPILER_LIBS = ["libarkcompiler*.so*", "libarkaotmanager*.so*"]
+
+
+def _log(message: str):
+    print(message, file=sys.stderr)
+
+
+class StdlibAotCache:
+    """Directory of etsstdlib.an images, one subdirectory per key"""
+
+    def __init__(self, cache_dir: str, keep: int = 3):
+        self.cache_dir = cache_dir
+        self.keep = keep
+        self._hash_file = os.path.join(cache_dir, "hashes.json")
+
+    def _file_hashes(self, paths: List[str]) -> List[str]:
+        try:
+            with open(self._hash_file, 'r') as f:
+                memo = json.load(f)
+        except (OSError, ValueError):
+            memo = {}
+        digests = []
+        for path in paths:
+            st = os.stat(path)
+            stamp = [st.st_size, st.st_mtime_ns]
+            cached = memo.get(os.path.abspath(path))
+            if cached and cached[0] == stamp:
+                digests.append(cached[1])
+                continue
+            digest = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(chunk)
+            memo[os.path.abspath(path)] = [stamp, digest.hexdigest()]
+            digests.append(digest.hexdigest())
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = f"{self._hash_file}.{os.getpid()}"
+        with open(tmp_path, 'w') as f:
+            json.dump(memo, f)
+        os.replace(tmp_path, self._hash_file)
+        return digests
+
+    @staticmethod
+    def compiler_files(ark_aot: str) -> List[str]:
+        """ark_aot and the compiler libraries next to it (<bin>/../lib)"""
+        lib_dir = os.path.join(os.path.dirname(os.path.abspath(ark_aot)), os.pardir, "lib")
+        libs = sorted(set(p for pattern in COMPILER_LIBS for p in glob.glob(os.path.join(lib_dir, pattern))))
+        return [ark_aot] + libs
+
+    def key(self, stdlib_abc: str, ark_aot: str, options: List[str]) -> str:
+        abc_hash, *compiler_hashes = self._file_hashes([stdlib_abc] + self.compiler_files(ark_aot))
+        digest = hashlib.sha256()
+        for part in [abc_hash] + compiler_hashes + options:
+            digest.update(part.encode() + b'\0')
+        return digest.hexdigest()[:20]
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key, "etsstdlib.an")
+
+    def compile_command(self, stdlib_abc: str, ark_aot: str, options: List[str], output: str) -> List[str]:
+        return [ark_aot, f"--boot-panda-files={stdlib_abc}", "--load-runtimes=ets",
+                f"--paoc-panda-files={stdlib_abc}", f"--paoc-output={output}"] + options
+
+    def get(self, stdlib_abc: str, ark_aot: str, options: Optional[List[str]] = None, timeout: int = 1800,
+            log: Callable[[str], None] = _log) -> str:
+        """Path of the cached etsstdlib.an for these inputs, compiling it first if needed"""
+        options = DEFAULT_OPTIONS if options is None else options
+        key = self.key(stdlib_abc, ark_aot, options)
+        path = self.path_for(key)
+        if os.path.exists(path):
+            os.utime(os.path.dirname(path))
+            return path
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Parallel runs of run_es2p.sh wait for one compilation instead of starting their own
+        with open(os.path.join(self.cache_dir, ".lock"), 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            if os.path.exists(path):
+                return path
+            entry_dir = os.path.dirname(path)
+            os.makedirs(entry_dir, exist_ok=True)
+            tmp_output = f"{path}.tmp"
+            command = self.compile_command(stdlib_abc, ark_aot, options, tmp_output)
+            log(f"Compiling {os.path.basename(stdlib_abc)} -> {path}")
+            start = time.monotonic()
+            try:
+                result = subprocess.run(command, capture_output=True, text=True, timeout=timeout)
+            except subprocess.TimeoutExpired:
+                shutil.rmtree(entry_dir, ignore_errors=True)
+                raise RuntimeError(f"ark_aot timed out after {timeout} seconds")
+            if result.returncode != 0 or not os.path.exists(tmp_output):
+                shutil.rmtree(entry_dir, ignore_errors=True)
+                raise RuntimeError(f"ark_aot failed with exit code {result.returncode}:\n"
+                                   f"{(result.stdout + result.stderr).strip()}")
+            os.replace(tmp_output, path)
+            with open(os.path.join(entry_dir, "meta.json"), 'w') as f:
+                json.dump({'stdlib': os.path.abspath(stdlib_abc), 'ark_aot': os.path.abspath(ark_aot),
+                           'options': options, 'compile_time': round(time.monotonic() - start, 2)}, f, indent=2)
+        self.prune()
+        return path
+
+    def entries(self) -> List[Dict[str, object]]:
+        """Cached images, most recently used first"""
+        result = []
+        for entry_dir in glob.glob(os.path.join(self.cache_dir, "*", "")):
+            path = os.path.join(entry_dir, "etsstdlib.an")
+            if not os.path.exists(path):
+                continue
+            try:
+                with open(os.path.join(entry_dir, "meta.json"), 'r') as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                meta = {}
+            meta.update({'key': os.path.basename(os.path.dirname(entry_dir)), 'path': path,
+                         'size': os.path.getsize(path), 'used': os.path.getmtime(entry_dir)})
+            result.append(meta)
+        return sorted(result, key=lambda m: m['used'], reverse=True)
+
+    def prune(self, keep: Optional[int] = None):
+        """Remove all but the `keep` most recently used images"""
+        for meta in self.entries()[keep if keep is not None else self.keep:]:
+            shutil.rmtree(os.path.dirname(meta['path']), ignore_errors=True)
+
+
+def startup_command(ark: str, stdlib_abc: str, abc: str, entry: str, aot_files: List[str],
+                    extra: Optional[List[str]] = None) -> List[str]:
+    command = [ark] + RUNTIME_OPTIONS + [f"--boot-panda-files={stdlib_abc}", "--load-runtimes=ets",
+                                         "--compiler-enable-jit=false"]
+    if aot_files:
+        command += ["--enable-an:force", f"--aot-files={':'.join(aot_files)}"]
+    return command + (extra or []) + [f"--panda-files={abc}", abc, entry]
+
+
+def benchmark_startup(commands: Dict[str, List[str]], runs: int = 10, warmup: int = 1,
+                      timeout: int = 300) -> Dict[str, Dict[str, float]]:
+    """
+    Wall time of each named command over `runs` runs, alternating between the
+    commands so drift affects all of them alike. Raises RuntimeError if one fails.
+    """
+    times: Dict[str, List[float]] = {name: [] for name in commands}
+    for iteration in range(warmup + runs):
+        for name, command in commands.items():
+            start = time.monotonic()
+            result = subprocess.run(command, capture_output=True, text=True, timeout=timeout)
+            elapsed = time.monotonic() - start
+            if result.returncode != 0:
+                raise RuntimeError(f"{name} run failed with exit code {result.returncode}:\n"
+                                   f"{(result.stdout + result.stderr).strip()[-2000:]}")
+            if iteration >= warmup:
+                times[name].append(elapsed)
+    return {name: {'runs': len(values), 'min': min(values), 'median': statistics.median(values),
+                   'mean': statistics.mean(values), 'stdev': statistics.stdev(values) if len(values) > 1 else 0.0}
+            for name, values in times.items()}
+
+
+def format_benchmark(stats: Dict[str, Dict[str, float]], baseline: str) -> str:
+    lines = [f"{'':16}{'runs':>6}{'min':>10}{'median':>10}{'mean':>10}{'stdev':>10}{'speedup':>9}"]
+    for name, s in stats.items():
+        speedup = stats[baseline]['median'] / s['median'] if s['median'] else 0.0
+        lines.append(f"{name:16}{s['runs']:>6}{s['min']:>9.3f}s{s['median']:>9.3f}s{s['mean']:>9.3f}s"
+                     f"{s['stdev']:>9.3f}s{speedup:>8.2f}x")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Build, cache and benchmark an AOT-compiled etsstdlib.an.',
+        epilog='''Examples:
+  %(prog)s build --build-dir $BUILD_DIR                     # Print path of the cached image
+  %(prog)s build --build-dir out --option=--compiler-inline-external-methods-aot=true
+  %(prog)s bench --build-dir out --abc intermediate/Array_1.ets.abc --entry Array_1.ETSGLOBAL::main
+  %(prog)s list --build-dir out
+        ''',
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('action', choices=['build', 'bench', 'list', 'prune'], help='What to do')
+    parser.add_argument('--build-dir', required=True, help='Build directory with bin/ and plugins/')
+    parser.add_argument('--cache-dir', help='Cache directory (default: <build-dir>/es2p/stdlib_aot)')
+    parser.add_argument('--option', action='append', dest='options', metavar='FLAG',
+                        help=f'ark_aot option for the stdlib, repeatable (default: {" ".join(DEFAULT_OPTIONS)})')
+    parser.add_argument('--keep', type=int, default=3, help='Cached images to keep (default: 3)')
+    bench_group = parser.add_argument_group('bench')
+    bench_group.add_argument('--abc', help='Program to start, e.g. intermediate/Array_1.ets.abc')
+    bench_group.add_argument('--entry', help='Entry point, e.g. Array_1.ETSGLOBAL::main')
+    bench_group.add_argument('--an', help="The program's own .an, used in both configurations")
+    bench_group.add_argument('--runs', type=int, default=10, help='Measured runs per configuration (default: 10)')
+    bench_group.add_argument('--warmup', type=int, default=1, help='Unmeasured runs first (default: 1)')
+    args = parser.parse_args()
+
+    bin_dir = os.path.join(args.build_dir, "bin")
+    stdlib_abc = os.path.join(args.build_dir, STDLIB_ABC)
+    cache = StdlibAotCache(args.cache_dir or os.path.join(args.build_dir, "es2p", "stdlib_aot"), args.keep)
+
+    if args.action == 'list':
+        for meta in cache.entries():
+            print(f"{meta['key']}  {meta['size'] / (1 << 20):8.1f} MiB  {' '.join(meta.get('options', []))}")
+        return
+    if args.action == 'prune':
+        cache.prune()
+        return
+
+    if not os.path.exists(stdlib_abc):
+        print(f"Error: '{stdlib_abc}' not found", file=sys.stderr)
+        sys.exit(1)
+    try:
+        stdlib_an = cache.get(stdlib_abc, os.path.join(bin_dir, "ark_aot"), args.options)
+    except RuntimeError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if args.action == 'build':
+        print(stdlib_an)
+        return
+
+    if not args.abc or not args.entry:
+        print("Error: bench needs --abc and --entry", file=sys.stderr)
+        sys.exit(1)
+    own = [args.an] if args.an else []
+    ark = os.path.join(bin_dir, "ark")
+    commands = {
+        'without stdlib': startup_command(ark, stdlib_abc, args.abc, args.entry, own),
+        'with stdlib': startup_command(ark, stdlib_abc, args.abc, args.entry, [stdlib_an] + own),
+    }
+    try:
+        stats = benchmark_startup(commands, args.runs, args.warmup)
+    except RuntimeError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    print(format_benchmark(stats, 'without stdlib'))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import json
+import os
+import tempfile
+import unittest
+
+from aot_coverage import (
+    AotLogPatterns,
+    collect_coverage,
+    coverage_report,
+    diff_coverage,
+    method_class,
+)
+
+
+BASE_LOG = """[TID 0012ab] I/aot: Loaded AOT file: /tmp/inter/Test1.ets.an
+[TID 0012ab] I/aot: Found AOT entrypoint [0x7f00:0x7f40] for method: Test1.ETSGLOBAL::main
+[TID 0012ab] I/aot: Found AOT entrypoint [0x7f40:0x7f80] for method: Test1.Foo::bar
+[TID 0012ab] D/aot: No AOT code for method: Test1.Foo::baz
+[TID 0012ab] I/runtime: unrelated message
+"""
+
+NEW_LOG = """[TID 0012ab] I/aot: Found AOT entrypoint [0x7f00:0x7f40] for method: Test1.ETSGLOBAL::main
+[TID 0012ab] D/aot: No AOT code for method: Test1.Foo::bar
+[TID 0012ab] E/aot: Failed to load AOT file: /tmp/inter/std.an
+"""
+
+
+class AotCoverageTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.base_dir = os.path.join(self.tmp.name, "base")
+        self.new_dir = os.path.join(self.tmp.name, "new")
+        for directory, text in ((self.base_dir, BASE_LOG), (self.new_dir, NEW_LOG)):
+            os.makedirs(directory)
+            with open(os.path.join(directory, "Test1_ark.log"), "w") as f:
+                f.write(text)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_method_class(self):
+        self.assertEqual(method_class("std.core.Object::<ctor>"), "std.core.Object")
+        self.assertEqual(method_class("main"), "")
+
+    def test_report_per_test_and_class(self):
+        report = coverage_report(collect_coverage([self.base_dir]))
+        test = report["tests"][0]
+        self.assertEqual(test["test"], "Test1")
+        self.assertEqual(test["aot"], 2)
+        self.assertEqual(test["interpreter"], 1)
+        self.assertEqual(test["classes"]["Test1.Foo"], {"aot": 1, "interpreter": 1})
+        self.assertEqual(test["files_loaded"], ["/tmp/inter/Test1.ets.an"])
+
+    def test_diff_reports_lost_methods_and_failures(self):
+        diff = diff_coverage(collect_coverage([self.base_dir]), collect_coverage([self.new_dir]))
+        self.assertEqual(diff["regressions"], 1)
+        self.assertEqual(diff["tests"][0]["lost"], ["Test1.Foo::bar"])
+        self.assertEqual(diff["tests"][0]["new_load_failures"], ["/tmp/inter/std.an"])
+
+    def test_saved_report_round_trip(self):
+        path = os.path.join(self.tmp.name, "base.json")
+        with open(path, "w") as f:
+            json.dump(coverage_report(collect_coverage([self.base_dir])), f)
+        diff = diff_coverage(collect_coverage([path]), collect_coverage([self.base_dir]))
+        self.assertEqual(diff["tests"], [])
+
+    def test_pattern_override(self):
+        patterns = AotLogPatterns.with_overrides([r"aot=compiled method (?P<method>\S+)"])
+        self.assertEqual(patterns.classify("compiled method A::b"), ("aot", "A::b"))
+        with self.assertRaises(ValueError):
+            AotLogPatterns.with_overrides(["aot=no group here"])
+
+    def test_override_is_not_dropped_by_prefilter(self):
+        patterns = AotLogPatterns.with_overrides([r"interpreter=(?P<method>\S+) runs slow"])
+        self.assertEqual(patterns.classify("Foo::bar runs slow"), ("interpreter", "Foo::bar"))
+        self.assertEqual(AotLogPatterns().classify("Failed to load an file: /tmp/std"),
+                         ("load_failure", "/tmp/std"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+import unittest
+
+from cmd_argv import CommandArgv, CommandLine, edit_command_line, parse_flag_edit
+from parse_jtr import Command, TestRunner as JtrRunner, apply_flag_edits, with_extra_args
+
+
+class CommandArgvTests(unittest.TestCase):
+    def test_parse_env_options_and_positionals(self):
+        argv = CommandLine.parse(
+            "LD_LIBRARY_PATH=/lib /bin/ark_aot --gc-type=g1-gc --paoc-output a.an --verbose file.abc"
+        ).primary()
+        self.assertEqual(argv.env, ["LD_LIBRARY_PATH=/lib"])
+        self.assertEqual(argv.name, "ark_aot")
+        self.assertEqual(argv.get_option("--gc-type"), "g1-gc")
+        self.assertEqual(argv.get_option("paoc-output"), "a.an")
+        self.assertEqual(argv.get_option("--verbose"), "")
+        self.assertEqual(argv.positionals, ["file.abc"])
+
+    def test_set_replaces_in_place_and_drops_duplicates(self):
+        argv = CommandArgv.from_tokens(["ark", "--gc-type=g1-gc", "x.abc", "--gc-type=epsilon"])
+        argv.set_option("--gc-type", "gen-gc")
+        self.assertEqual(argv.to_string(), "ark --gc-type=gen-gc x.abc")
+
+    def test_remove_drops_separate_value(self):
+        argv = CommandArgv.from_tokens(["ark", "--aot-files", "a.an", "--heap-verifier=pre:post", "x.abc"])
+        self.assertEqual(argv.remove_option("--aot-files"), 1)
+        argv.remove_option("--heap-verifier")
+        self.assertEqual(argv.to_string(), "ark x.abc")
+
+    def test_append_keeps_trailing_program_args(self):
+        argv = CommandArgv.from_tokens(["ark", "x.abc", "main", "--", "-TestCaseID", "ALL"])
+        argv.append("--log-debug=AOT")
+        self.assertEqual(argv.to_string(), "ark x.abc main --log-debug=AOT -- -TestCaseID ALL")
+
+    def test_round_trip_keeps_expansions_live(self):
+        line = CommandLine.parse('bash -ce "/bin/ark_aot --x a.abc; /bin/ark --y"; echo "Exit code: $?"')
+        self.assertEqual([c.name for c in line.find("ark*")], ["ark_aot", "ark"])
+        self.assertEqual(line.to_string(), 'bash -ce "/bin/ark_aot --x a.abc; /bin/ark --y"; echo "Exit code: $?"')
+
+    def test_redirections_are_kept_verbatim(self):
+        line = CommandLine.parse("/bin/ark a.abc > out.txt 2>&1 < in.txt; /bin/ark_aot b.abc &> log 2>> err")
+        ark, aot = line.simple_commands()
+        self.assertEqual(ark.positionals, ["a.abc"])
+        self.assertEqual(aot.positionals, ["b.abc"])
+        ark.set_option("--gc-type", "gen-gc")
+        aot.append("--verbose")
+        self.assertEqual(line.to_string(), "/bin/ark --gc-type=gen-gc a.abc > out.txt 2>&1 < in.txt; "
+                                           "/bin/ark_aot b.abc --verbose &> log 2>> err")
+
+    def test_background_separator_and_redirect_without_spaces(self):
+        line = CommandLine.parse("/bin/ark a.abc>out 2>/dev/null & wait")
+        self.assertEqual([c.name for c in line.simple_commands()], ["ark", "wait"])
+        self.assertEqual(line.separators, ["&"])
+        line.simple_commands()[0].append("-v")
+        self.assertEqual(line.to_string(), "/bin/ark a.abc -v >out 2>/dev/null & wait")
+
+    def test_single_quoted_dollar_stays_literal(self):
+        argv = CommandLine.parse("/bin/ark --tag='$LIT' \"$HOME\" 'a b' x\\ y").primary()
+        self.assertEqual(argv.get_option("--tag"), "$LIT")
+        self.assertEqual(argv.positionals, ["$HOME", "a b", "x y"])
+        argv.set_option("--gc-type", "g1-gc")
+        self.assertEqual(argv.to_string(), "/bin/ark --gc-type=g1-gc --tag='$LIT' \"$HOME\" 'a b' x\\ y")
+
+    def test_edit_inside_shell_wrapper(self):
+        edited = edit_command_line("V=1 bash -ce '/bin/ark --gc-type=g1-gc --heap-verifier=pre a.abc'",
+                                   "ark", set_flags=["--gc-type=gen-gc"], remove_flags=["--heap-verifier"])
+        self.assertEqual(edited, "V=1 bash -ce '/bin/ark --gc-type=gen-gc a.abc'")
+
+    def test_parse_flag_edit(self):
+        self.assertEqual(parse_flag_edit("ark*:--gc-type=gen-gc"), ("ark*", "--gc-type=gen-gc"))
+        self.assertEqual(parse_flag_edit("--heap-verifier"), ("*", "--heap-verifier"))
+        with self.assertRaises(ValueError):
+            parse_flag_edit("ark:gc")
+
+
+class ExtraArgsTests(unittest.TestCase):
+    def test_extra_args_go_after_env_assignments(self):
+        cmd = Command("s", "LD_LIBRARY_PATH=/lib /bin/c2abc in.abc")
+        self.assertEqual(with_extra_args(cmd, "-v").command, "LD_LIBRARY_PATH=/lib /bin/c2abc -v in.abc")
+
+    def test_extra_args_override_and_remove(self):
+        cmd = Command("s", "/bin/ark --gc-type=g1-gc --heap-verifier=pre x.abc")
+        new = with_extra_args(cmd, "--gc-type=gen-gc ^--heap-verifier --verbose")
+        self.assertEqual(new.command, "/bin/ark --verbose --gc-type=gen-gc x.abc")
+
+    def test_extra_args_with_separate_values(self):
+        cmd = Command("s", "/bin/ark --boot-panda-files=/s.abc --aot-files a.an x.abc main")
+        self.assertEqual(with_extra_args(cmd, "--aot-files b.an").command,
+                         "/bin/ark --boot-panda-files=/s.abc --aot-files b.an x.abc main")
+        self.assertEqual(with_extra_args(cmd, "--log-file ark.log").command,
+                         "/bin/ark --log-file ark.log --boot-panda-files=/s.abc --aot-files a.an x.abc main")
+        self.assertEqual(with_extra_args(cmd, "--boot-panda-files /t.abc").command,
+                         "/bin/ark --boot-panda-files /t.abc --aot-files a.an x.abc main")
+
+    def test_flag_edits_skip_commands_without_executable(self):
+        runner = JtrRunner([Command("env", "TZ=UTC"), Command("run", "/bin/ark --gc-type=g1-gc a.abc")])
+        warnings = []
+        self.assertEqual(apply_flag_edits(runner, ["ark:--gc-type=gen-gc"], [], warn=warnings.append), 1)
+        self.assertEqual(runner.commands[1].command, "/bin/ark --gc-type=gen-gc a.abc")
+        self.assertEqual(warnings, [])
+        self.assertEqual(apply_flag_edits(runner, [], ["--gc-type"], warn=warnings.append), 1)
+        self.assertEqual(runner.commands[0].command, "TZ=UTC")
+        self.assertEqual(len(warnings), 1)
+
+    def test_extra_args_keep_redirections_and_quoting(self):
+        cmd = Command("s", "/bin/ark a.abc > out.txt 2>&1; echo '$LIT' \"$?\"")
+        new = with_extra_args(cmd, "--gc-type=gen-gc")
+        self.assertEqual(new.command, "/bin/ark --gc-type=gen-gc a.abc > out.txt 2>&1; echo '$LIT' \"$?\"")
+
+    def test_extra_args_inside_bash_wrapper(self):
+        cmd = Command("s", "bash -ce '/bin/ark_aot --paoc-output a.an; /bin/ark a.abc'")
+        new = with_extra_args(cmd, "--gc-type=gen-gc", "ark*")
+        self.assertEqual(new.command, "bash -ce '/bin/ark_aot --gc-type=gen-gc --paoc-output a.an; "
+                                      "/bin/ark --gc-type=gen-gc a.abc'")
+
+
+if __name__ == "__main__":
+    unittest.main()
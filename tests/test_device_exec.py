@@ -0,0 +1,142 @@
+import os
+import stat
+import sys
+import tempfile
+import textwrap
+import unittest
+
+from device_exec import DeviceExecutor, DeviceLock, Hdc, parse_time_v
+
+
+FAKE_HDC = textwrap.dedent('''\
+    #!{python}
+    # Local stand-in for hdc: "shell LINE" runs LINE with sh, "file send A B" copies A to B
+    import os, shutil, subprocess, sys
+    args = sys.argv[1:]
+    while args and args[0] in ('-s', '-t'):
+        args = args[2:]
+    with open(os.environ['FAKE_HDC_LOG'], 'a') as log:
+        log.write(' '.join(args[:2]) + (' ' + args[2] if args[:2] == ['file', 'send'] else '') + '\\n')
+    if args[0] == 'shell':
+        result = subprocess.run(['sh', '-c', args[1]], capture_output=True, text=True)
+        sys.stdout.write(result.stdout + result.stderr)
+    elif args[:2] == ['file', 'send']:
+        shutil.copy(args[2], args[3])
+        print('FileTransfer finish')
+''')
+
+FAKE_TIME = '''#!/bin/sh
+"$@"
+code=$?
+printf 'Real time (s): 0.250\\nUser time (s): 0.200\\nSystem time (s): 0.050\\nMax RSS (KiB): 4096\\n' >&2
+exit $code
+'''
+
+# es2panda and ark_aot stand-ins: copy the .ets source to --output, copy the .abc to --paoc-output
+FAKE_ES2PANDA = '''#!/bin/sh
+for a in "$@"; do case $a in --output=*) out=${a#--output=};; *) src=$a;; esac; done
+cp "$src" "$out"
+'''
+FAKE_ARK_AOT = '''#!/bin/sh
+while [ $# -gt 0 ]; do case $1 in --paoc-panda-files) abc=$2; shift;; --paoc-output) an=$2; shift;; esac; shift; done
+cp "$abc" "$an"
+'''
+FAKE_ARK = '''#!/bin/sh
+grep -q fail "$(echo "$@" | tr ' ' '\\n' | grep '\\.abc$' | tail -1)" && exit 3
+echo ran
+'''
+
+
+def write_script(path: str, text: str):
+    with open(path, 'w') as f:
+        f.write(text)
+    os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR)
+
+
+class DeviceExecTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        root = self._tmp.name
+        self.build = os.path.join(root, "build")
+        self.device = os.path.join(root, "device")
+        self.log = os.path.join(root, "hdc.log")
+        for path in ("bin", "plugins/ets", "es2p/gen"):
+            os.makedirs(os.path.join(self.build, path))
+        os.makedirs(self.device)
+        write_script(os.path.join(self.build, "bin", "es2panda"), FAKE_ES2PANDA)
+        write_script(os.path.join(self.build, "bin", "ark_aot"), FAKE_ARK_AOT)
+        write_script(os.path.join(self.device, "ark"), FAKE_ARK)
+        write_script(os.path.join(root, "time"), FAKE_TIME)
+        self.hdc_path = os.path.join(root, "hdc")
+        write_script(self.hdc_path, FAKE_HDC.format(python=sys.executable))
+        with open(os.path.join(self.build, "plugins/ets/etsstdlib.abc"), "w") as f:
+            f.write("stdlib")
+        for test, body in (("Array_1", "ok"), ("Array_2", "fail")):
+            with open(os.path.join(self.build, "es2p/gen", f"{test}.ets"), "w") as f:
+                f.write(body)
+        os.environ['FAKE_HDC_LOG'] = self.log
+
+    def tearDown(self):
+        os.environ.pop('FAKE_HDC_LOG', None)
+        self._tmp.cleanup()
+
+    def executor(self) -> DeviceExecutor:
+        executor = DeviceExecutor(Hdc(self.hdc_path, "127.0.0.1:8710", "SERIAL"), self.build,
+                                  os.path.join(self._tmp.name, "intermediate"), self.device,
+                                  mutex=os.path.join(self.device, "mutex"))
+        os.makedirs(executor.intermediate_dir, exist_ok=True)
+        executor.pre_command = ""
+        executor.time_command = os.path.join(self._tmp.name, "time")
+        executor.taskset = ""
+        return executor
+
+    def sends(self):
+        with open(self.log) as f:
+            return [line.split()[-1] for line in f if line.startswith("file send")]
+
+    def test_batch_run_pushes_only_changed_artifacts(self):
+        results = self.executor().run(["Array_1", "Array_2"], log=lambda msg: None)
+        self.assertEqual([r.status() for r in results], ["PASS", "FAIL(3)"])
+        self.assertEqual(results[0].pushed, ["Array_1.ets.abc", "Array_1.ets.an"])
+        info = results[0].run_info
+        self.assertEqual((info['duration'], info['cpus'], info['monitor']['peak_rss_kb']), (0.25, [4, 5, 6, 7, 8, 9], 4096))
+        self.assertEqual(len(self.sends()), 5)
+        self.assertFalse(os.path.exists(os.path.join(self.device, "mutex")))
+
+        results = self.executor().run(["Array_1"], log=lambda msg: None)
+        self.assertEqual((results[0].pushed, results[0].unchanged), ([], ["Array_1.ets.abc", "Array_1.ets.an"]))
+        self.assertEqual(len(self.sends()), 5)
+
+    def test_lock_retries_with_backoff(self):
+        mutex = os.path.join(self.device, "mutex")
+        with open(mutex, "w") as f:
+            f.write("someone\n")
+        delays = []
+        lock = DeviceLock(Hdc(self.hdc_path), mutex, owner="me")
+
+        def _sleep(delay):
+            delays.append(delay)
+            if len(delays) == 3:
+                os.remove(mutex)
+
+        lock.acquire(attempts=5, backoff=1, max_backoff=3, sleep=_sleep, log=lambda msg: None)
+        self.assertEqual(delays, [1, 2, 3])
+        with open(mutex) as f:
+            self.assertEqual(f.read().strip(), "me")
+
+        self.assertEqual(DeviceLock(Hdc(self.hdc_path), mutex, owner="other").try_acquire(), "me")
+        with self.assertRaises(RuntimeError):
+            DeviceLock(Hdc(self.hdc_path), mutex, owner="other").acquire(
+                attempts=2, backoff=1, sleep=lambda d: None, log=lambda msg: None)
+
+    def test_parse_gnu_time_v(self):
+        timing = parse_time_v("\tUser time (seconds): 1.50\n\tSystem time (seconds): 0.25\n"
+                              "\tPercent of CPU this job got: 175%\n"
+                              "\tElapsed (wall clock) time (h:mm:ss or m:ss): 1:01.50\n"
+                              "\tMaximum resident set size (kbytes): 123456\n\tExit status: 0\n")
+        self.assertEqual(timing, {'user_s': 1.5, 'sys_s': 0.25, 'cpu_percent': 175.0, 'wall_s': 61.5,
+                                  'max_rss_kb': 123456.0, 'exit_status': 0.0})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import os
+import stat
+import sys
+import tempfile
+import textwrap
+import unittest
+
+from es_generate import MANIFEST, EsCheckedGenerator, combined_filter, group_tests
+
+
+# Stand-in for main.rb: the yaml lists "name: count"; writes <name><i>.ets for names matching --filter
+FAKE_MAIN = textwrap.dedent('''\
+    #!{python}
+    import os, re, sys
+    args = sys.argv[1:]
+    out = args[args.index('--out') + 1]
+    pattern = re.compile(args[args.index('--filter') + 1])
+    with open(os.environ['FAKE_GEN_LOG'], 'a') as log:
+        log.write(os.path.basename(args[-1]) + ' ' + pattern.pattern + '\\n')
+    for line in open(args[-1]):
+        name, count = line.split(':')
+        if pattern.match(name.strip()):
+            for i in range(int(count)):
+                open(os.path.join(out, f'{{name.strip()}}{{i}}.ets'), 'w').write(line)
+''')
+
+
+class EsGenerateTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self._tmp.name, "static")
+        self.build = os.path.join(self._tmp.name, "build")
+        gen_dir = os.path.join(self.root, "tests/tests-u-runner/tools/generate-es-checked")
+        self.yaml_dir = os.path.join(self.root, "plugins/ets/tests/ets_es_checked")
+        os.makedirs(gen_dir)
+        os.makedirs(self.yaml_dir)
+        self.main_rb = os.path.join(gen_dir, "main.rb")
+        with open(self.main_rb, "w") as f:
+            f.write(FAKE_MAIN.format(python=sys.executable))
+        os.chmod(self.main_rb, os.stat(self.main_rb).st_mode | stat.S_IXUSR)
+        self.write_yaml("Array", "Array_: 3\nArray_slice_: 2\n")
+        self.write_yaml("Map", "Map_: 2\n")
+        self.log = os.path.join(self._tmp.name, "gen.log")
+        os.environ['FAKE_GEN_LOG'] = self.log
+
+    def tearDown(self):
+        os.environ.pop('FAKE_GEN_LOG', None)
+        self._tmp.cleanup()
+
+    def write_yaml(self, name: str, text: str):
+        with open(os.path.join(self.yaml_dir, f"{name}.yaml"), "w") as f:
+            f.write(text)
+
+    def calls(self):
+        if not os.path.exists(self.log):
+            return []
+        with open(self.log) as f:
+            return f.read().splitlines()
+
+    def generate(self, tests):
+        return [r.status() for r in EsCheckedGenerator(self.root, self.build).generate(tests)]
+
+    def test_grouping_and_filter(self):
+        tests = ["Array_1", "Map_0", "Array_slice_1", "Array_2"]
+        self.assertEqual(group_tests(tests), {"Array": ["Array_1", "Array_slice_1", "Array_2"], "Map": ["Map_0"]})
+        self.assertEqual(combined_filter(["Array_1", "Array_slice_1", "Array_2"]), "^(Array_|Array_slice_)$")
+
+    def test_one_run_per_yaml_and_cache(self):
+        self.assertEqual(self.generate(["Array_1", "Array_slice_0", "Map_1"]), ["OK", "OK"])
+        self.assertEqual(self.calls(), ["Array.yaml ^(Array_|Array_slice_)$", "Map.yaml ^Map_$"])
+        self.assertTrue(os.path.exists(os.path.join(self.build, "es2p/gen", MANIFEST)))
+
+        self.assertEqual(self.generate(["Array_1", "Map_1"]), ["CACHED", "CACHED"])
+        self.assertEqual(len(self.calls()), 2)
+
+        # A changed yaml, a changed generator or a test not generated before invalidate the cache
+        self.write_yaml("Map", "Map_: 3\n")
+        self.assertEqual(self.generate(["Array_1", "Map_2"]), ["CACHED", "OK"])
+        with open(self.main_rb, "a") as f:
+            f.write("# changed\n")
+        self.assertEqual(self.generate(["Array_1"]), ["OK"])
+        self.assertEqual(self.generate(["Array_1", "Array_2"]), ["OK"])
+        self.assertEqual(len(self.calls()), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
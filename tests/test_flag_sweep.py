@@ -0,0 +1,154 @@
+import os
+import stat
+import tempfile
+import time
+import unittest
+
+from flag_sweep import FlagSweep, SweepAxis, Variant, apply_variant, expand_variants
+from parse_jtr import Command, ExecutionOptions, TestRunner as JtrRunner
+
+
+STUB = """#!/bin/sh
+case "$*" in
+    *--bad*) exit 3 ;;
+esac
+exit 0
+"""
+
+
+class SweepAxisTests(unittest.TestCase):
+    def test_parse_axis_with_unset_alternative(self):
+        axis = SweepAxis.parse("check=--compiler-check-final=true|")
+        self.assertEqual(axis.name, "check")
+        self.assertEqual(axis.values, ["--compiler-check-final=true", ""])
+
+    def test_parse_rejects_single_alternative(self):
+        with self.assertRaises(ValueError):
+            SweepAxis.parse("gc=--gc-type=g1-gc")
+
+    def test_cartesian_product_and_sample(self):
+        axes = [SweepAxis("a", ["1", "2", "3"]), SweepAxis("b", ["x", ""])]
+        variants = expand_variants(axes)
+        self.assertEqual(len(variants), 6)
+        self.assertEqual(variants[1].extra_args, "1")
+        self.assertEqual(variants[0].label, "a=1 b=x")
+        sampled = expand_variants(axes, sample=4, seed=1)
+        self.assertEqual(len(sampled), 4)
+        self.assertEqual([v.label for v in sampled], [v.label for v in expand_variants(axes, sample=4, seed=1)])
+
+
+class FlagSweepTests(unittest.TestCase):
+    def test_matrix_marks_failing_variants(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            stub = os.path.join(tmp, "ark")
+            with open(stub, "w") as f:
+                f.write(STUB)
+            os.chmod(stub, os.stat(stub).st_mode | stat.S_IEXEC)
+
+            tests = [JtrRunner([Command("run", f"{stub} main.abc")], test_id=f"t{i}") for i in range(2)]
+            axes = [SweepAxis("mode", ["--good", "--bad"])]
+            sweep = FlagSweep(tests, axes, "ark", options=ExecutionOptions(timeout=10, jobs=2),
+                              workdir=os.path.join(tmp, "work"))
+            sweep.run()
+
+            matrix = sweep.matrix()
+            self.assertEqual([c.status() for c in matrix[0]], ["PASS", "PASS"])
+            self.assertEqual([c.status() for c in matrix[1]], ["FAIL(3)", "FAIL(3)"])
+            self.assertEqual(matrix[1][0].failed_command, "ark")
+            lines = sweep.format_matrix().splitlines()
+            self.assertTrue(lines[1].startswith("mode=--good") and "2/2" in lines[1])
+            self.assertIn("0/2", lines[2])
+
+    def _stub(self, tmp, body):
+        stub = os.path.join(tmp, "ark")
+        with open(stub, "w") as f:
+            f.write("#!/bin/sh\n" + body)
+        os.chmod(stub, os.stat(stub).st_mode | stat.S_IEXEC)
+        return stub
+
+    def test_tests_without_directory_run_in_parallel(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            stub = self._stub(tmp, "sleep 0.4\n")
+            tests = [JtrRunner([Command("run", f"{stub} main.abc")], test_id=f"t{i}") for i in range(4)]
+            sweep = FlagSweep(tests, [SweepAxis("mode", ["--a", ""])], "ark",
+                              options=ExecutionOptions(timeout=10, jobs=4))
+            start = time.monotonic()
+            sweep.run()
+            elapsed = time.monotonic() - start
+        self.assertTrue(all(c.passed for c in sweep.cells))
+        # 8 runs of 0.4s on 4 workers; fully serialized this would take 3.2s
+        self.assertLess(elapsed, 2.0)
+
+    def test_variants_of_one_test_do_not_overlap(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            guard = os.path.join(tmp, "running")
+            stub = self._stub(tmp, f"mkdir {guard} || exit 9\nsleep 0.1\nrmdir {guard}\n")
+            tests = [JtrRunner([Command("run", f"{stub} main.abc")], test_id="t0")]
+            sweep = FlagSweep(tests, [SweepAxis("mode", ["--a", "--b", "--c"])], "ark",
+                              options=ExecutionOptions(timeout=10, jobs=3))
+            sweep.run()
+        self.assertEqual([c.status() for c in sweep.cells], ["PASS"] * 3)
+
+    def test_workdir_rewrites_paths_to_the_execution_directory(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, "exec")
+            os.makedirs(source)
+            with open(os.path.join(source, "input"), "w") as f:
+                f.write("data")
+            stub = self._stub(tmp, 'cat "$OUT_DIR/input" > "$1/out"\n')
+            runner = JtrRunner([Command("run", f"{stub} {source}", env_vars={"OUT_DIR": source},
+                                        directory=source)], test_id="t0")
+            commands = apply_variant(runner, Variant([("mode", "--x")]), "none", {source: "/work/v0"})
+            self.assertEqual(commands[0].command, f"{stub} /work/v0")
+            self.assertEqual(commands[0].env_vars, {"OUT_DIR": "/work/v0"})
+            self.assertEqual(commands[0].directory, "/work/v0")
+            self.assertEqual(apply_variant(JtrRunner([Command("run", f"ls {source}2")]), Variant([]), "none",
+                                           {source: "/work/v0"})[0].command, f"ls {source}2")
+
+            sweep = FlagSweep([runner], [SweepAxis("mode", ["--a", "--b"])], "none",
+                              options=ExecutionOptions(timeout=10, jobs=2), workdir=os.path.join(tmp, "work"))
+            sweep.run()
+            self.assertEqual([c.status() for c in sweep.cells], ["PASS", "PASS"])
+            self.assertFalse(os.path.exists(os.path.join(source, "out")))
+            outputs = sorted(os.listdir(os.path.join(tmp, "work", "t0")))
+            self.assertEqual(outputs, ["v000", "v001"])
+            with open(os.path.join(tmp, "work", "t0", "v001", "out")) as f:
+                self.assertEqual(f.read(), "data")
+
+    def test_workdir_copies_every_execution_directory(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            first, second = os.path.join(tmp, "compile"), os.path.join(tmp, "run")
+            for directory in (first, second):
+                os.makedirs(directory)
+                with open(os.path.join(directory, "name"), "w") as f:
+                    f.write(os.path.basename(directory))
+            runner = JtrRunner([Command("compile", "cp name out", directory=first),
+                                Command("run", f"cat {first}/out name > both", directory=second)], test_id="t0")
+            sweep = FlagSweep([runner], [SweepAxis("mode", ["--a", "--b"])], "none",
+                              options=ExecutionOptions(timeout=10), workdir=os.path.join(tmp, "work"))
+            sweep.run()
+            self.assertEqual([c.status() for c in sweep.cells], ["PASS", "PASS"])
+            copy = os.path.join(tmp, "work", "t0", "v000")
+            self.assertEqual(sorted(os.listdir(copy)), ["0_compile", "1_run"])
+            with open(os.path.join(copy, "1_run", "both")) as f:
+                self.assertEqual(f.read(), "compilerun")
+            self.assertEqual(sorted(os.listdir(first)), ["name"])
+
+    def test_broken_pair_is_reported_as_error(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, "exec")
+            os.makedirs(source)
+            # The work directory cannot be created under a regular file
+            blocker = os.path.join(tmp, "file")
+            open(blocker, "w").close()
+            tests = [JtrRunner([Command("run", "true", directory=source)], test_id="t0")]
+            sweep = FlagSweep(tests, [SweepAxis("mode", ["--a", "--b"])], "none",
+                              options=ExecutionOptions(timeout=10), workdir=blocker)
+            sweep.run()
+            self.assertEqual([c.status() for c in sweep.cells], ["ERROR", "ERROR"])
+            self.assertIn("Error", sweep.cells[0].error)
+            self.assertEqual(sweep.to_json()['cells'][0]['status'], "ERROR")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+
+from inline_log import (
+    DEFAULT_PATTERNS, INLINED, REJECTED, REQUIRED_GROUPS, diff_decisions, filter_decisions, parse_inline_log,
+)
+from log_patterns import apply_overrides
+
+
+WITH_EXTERNAL = """[TID 0012ab] I/compiler: Compile method: Test1.ETSGLOBAL::main
+[TID 0012ab] D/compiler: Try to inline(id=3, size=12, depth=0): Test1.ETSGLOBAL::helper
+[TID 0012ab] D/compiler:   Try to inline(id=7, size=40, depth=1): std.core.Math::abs
+[TID 0012ab] D/compiler:   Successfully inlined: std.core.Math::abs
+[TID 0012ab] D/compiler: Successfully inlined: Test1.ETSGLOBAL::helper
+[TID 0012ab] D/compiler: Try to inline(id=9, size=900, depth=0): std.core.String::format
+[TID 0012ab] D/compiler: Method is too big
+[TID 0012ab] I/compiler: Compile method: Test1.Foo::bar
+[TID 0012ab] D/compiler: Try to inline(id=2, size=5, depth=0): Test1.Foo::get
+[TID 0012ab] D/compiler: Failed to inline: Test1.Foo::get - virtual call
+"""
+
+WITHOUT_EXTERNAL = """[TID 0012ab] I/compiler: Compile method: Test1.ETSGLOBAL::main
+[TID 0012ab] D/compiler: Try to inline(id=3, size=12, depth=0): Test1.ETSGLOBAL::helper
+[TID 0012ab] D/compiler:   Try to inline(id=7, size=40, depth=1): std.core.Math::abs
+[TID 0012ab] D/compiler:   Callee is external
+[TID 0012ab] D/compiler: Successfully inlined: Test1.ETSGLOBAL::helper
+"""
+
+
+class InlineLogTests(unittest.TestCase):
+    def test_decisions_with_depth_and_reasons(self):
+        rows = [d.as_row() for d in parse_inline_log(WITH_EXTERNAL.splitlines())]
+        self.assertEqual(rows, [
+            ("Test1.ETSGLOBAL::helper", "std.core.Math::abs", INLINED, "", 1, True),
+            ("Test1.ETSGLOBAL::main", "Test1.ETSGLOBAL::helper", INLINED, "", 0, False),
+            ("Test1.ETSGLOBAL::main", "std.core.String::format", REJECTED, "Method is too big", 0, True),
+            ("Test1.Foo::bar", "Test1.Foo::get", REJECTED, "virtual call", 0, False),
+        ])
+
+    def test_query_external_inlined(self):
+        decisions = list(parse_inline_log(WITH_EXTERNAL.splitlines()))
+        selected = filter_decisions(decisions, callee="std.*", decision=INLINED, external=True)
+        self.assertEqual([d.callee for d in selected], ["std.core.Math::abs"])
+
+    def test_diff_between_runs(self):
+        base = list(parse_inline_log(WITHOUT_EXTERNAL.splitlines()))
+        new = list(parse_inline_log(WITH_EXTERNAL.splitlines()))
+        diff = diff_decisions(base, new)
+        self.assertEqual(diff["newly_inlined"], [{
+            "caller": "Test1.ETSGLOBAL::helper", "callee": "std.core.Math::abs",
+            "base_reason": "Callee is external",
+        }])
+        self.assertEqual(diff["no_longer_inlined"], [])
+
+    def test_pattern_override_needs_named_groups(self):
+        patterns = apply_overrides(DEFAULT_PATTERNS, [r"try=Inline (?P<callee>\S+)"], REQUIRED_GROUPS)
+        self.assertEqual(patterns["try"], [r"Inline (?P<callee>\S+)"])
+        self.assertEqual(patterns["method"], DEFAULT_PATTERNS["method"])
+        for spec in [r"method=Compile (\S+)", r"try=Inline (?P<caller>\S+)", "try=(", "unknown=x"]:
+            with self.assertRaises(ValueError):
+                apply_overrides(DEFAULT_PATTERNS, [spec], REQUIRED_GROUPS)
+
+
+if __name__ == "__main__":
+    unittest.main()
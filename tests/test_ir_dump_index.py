@@ -0,0 +1,125 @@
+import os
+import tempfile
+import unittest
+
+from ir_dump_index import DumpIndex, diff_stats
+
+
+IR_TEMPLATE = """Method: {method}
+Pass: {pass_name}
+BB 0
+prop: start
+{insts}BB 1  preds: [bb 0]
+"""
+
+DISASM = """METHOD_INFO:
+  name: Test1.ETSGLOBAL::main
+  code_size: 48
+DISASSEMBLY:
+  0000: stp x29, x30, [sp, #-16]!
+  0004: mov x29, sp
+  0008: ret
+METHOD_INFO:
+  name: Test1.ETSGLOBAL::helper
+  code_size: 16
+DISASSEMBLY:
+  0000: ret
+"""
+
+
+ASM = """.record Test1.ETSGLOBAL <ets.abstract> {
+\ti32 counter
+}
+
+.function void Test1.ETSGLOBAL.main() <static, access.function=public> {
+\tldai 0x1
+\tjmp jump_label_0
+jump_label_0:
+\tsta v0 # offset: 0x0008
+\treturn.void
+}
+
+.function i32 Test1.ETSGLOBAL.helper(i32 a0) <static> {
+\tlda a0
+\treturn
+}
+"""
+
+
+def write_dump(root: str, main_insts: int, main_size: int, test: str = "Test1"):
+    ir_dir = os.path.join(root, f"{test}_ir_dump")
+    os.makedirs(ir_dir, exist_ok=True)
+    for index, (pass_name, count) in enumerate([("IrBuilder", main_insts + 2), ("Lowering", main_insts)]):
+        insts = "".join(f"    {i}.i32  Add  v1, v2 -> (v3)\n" for i in range(count))
+        with open(os.path.join(ir_dir, f"1_pass_{index:04d}_Test1_ETSGLOBAL_main_{pass_name}.ir"), "w") as f:
+            f.write(IR_TEMPLATE.format(method="Test1.ETSGLOBAL::main", pass_name=pass_name, insts=insts))
+    with open(os.path.join(root, f"{test}_disasm.txt"), "w") as f:
+        f.write(DISASM.replace("code_size: 48", f"code_size: {main_size}"))
+
+
+class IrDumpIndexTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.base = os.path.join(self._tmp.name, "base")
+        self.new = os.path.join(self._tmp.name, "new")
+        write_dump(self.base, main_insts=5, main_size=48)
+        write_dump(self.new, main_insts=3, main_size=40)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_lookup_method_after_pass(self):
+        index = DumpIndex.build(self.base)
+        entries = index.find_ir("*::main", "Lowering")
+        self.assertEqual([(e.method, e.pass_name, e.instructions, e.blocks) for e in entries],
+                         [("Test1.ETSGLOBAL::main", "Lowering", 5, 2)])
+        self.assertIn("Pass: Lowering", index.read(entries[0]))
+
+        section = index.find_disasm("*::helper")[0]
+        self.assertEqual((section.instructions, section.code_size), (1, 16))
+        self.assertTrue(index.read(section).startswith("METHOD_INFO:"))
+
+    def test_code_size_only_from_method_header(self):
+        path = os.path.join(self.base, "Test1_disasm.txt")
+        with open(path, "w") as f:
+            f.write("METHOD_INFO:\n  name: Test1.ETSGLOBAL::main\n  stack_size: 32\nDISASSEMBLY:\n"
+                    "  0000: sub sp, sp, #0x20  // frame size: 32\n"
+                    "  size: 99\n")
+        section = DumpIndex.build(self.base).find_disasm("*::main")[0]
+        self.assertEqual((section.instructions, section.code_size), (1, None))
+
+    def test_stats_and_cache(self):
+        stats = DumpIndex.build(self.base).stats()
+        self.assertEqual(stats[("Test1", "Test1.ETSGLOBAL::main")],
+                         {'passes': 2, 'ir_first': 7, 'ir_last': 5, 'last_pass': 'Lowering',
+                          'disasm_instructions': 3, 'code_size': 48})
+        self.assertTrue(os.path.exists(os.path.join(self.base, ".ir_dump_index.json")))
+        self.assertEqual(DumpIndex.build(self.base).stats(), stats)
+
+    def test_diff_folders(self):
+        rows = diff_stats(DumpIndex.build(self.base).stats(), DumpIndex.build(self.new).stats())
+        self.assertEqual(rows, [{'test': "Test1", 'method': "Test1.ETSGLOBAL::main",
+                                 'changes': {'ir_last': (5, 3), 'code_size': (48, 40)}}])
+
+    def test_same_method_in_other_test_is_kept_apart(self):
+        # Both tests dump methods named Test1.ETSGLOBAL::main, e.g. after copying a test file
+        write_dump(self.base, main_insts=8, main_size=64, test="Test2")
+        stats = DumpIndex.build(self.base).stats()
+        self.assertEqual(stats[("Test1", "Test1.ETSGLOBAL::main")]['passes'], 2)
+        self.assertEqual(stats[("Test2", "Test1.ETSGLOBAL::main")]['code_size'], 64)
+        rows = diff_stats(DumpIndex.build(self.new).stats(), stats)
+        self.assertEqual([(row['test'], row.get('only_in')) for row in rows],
+                         [("Test1", None), ("Test2", "new"), ("Test2", "new")])
+
+    def test_bytecode_listing(self):
+        with open(os.path.join(self.base, "Test1.ets.abc.asm"), "w") as f:
+            f.write(ASM)
+        index = DumpIndex.build(self.base)
+        self.assertEqual([(e.method, e.instructions) for e in index.find_bytecode()],
+                         [("Test1.ETSGLOBAL::main", 4), ("Test1.ETSGLOBAL::helper", 2)])
+        self.assertTrue(index.read(index.find_bytecode("*::helper")[0]).endswith("\treturn\n}"))
+        self.assertEqual(index.stats()[("Test1", "Test1.ETSGLOBAL::main")]['bytecode_instructions'], 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
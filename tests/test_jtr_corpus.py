@@ -0,0 +1,72 @@
+import os
+import tempfile
+import unittest
+
+import jtr_bench
+import jtr_corpus
+from parse_jtr import parse_commands
+
+
+class CorpusTests(unittest.TestCase):
+    def test_every_preset_parses_to_the_expected_commands(self):
+        for preset in sorted(jtr_corpus.PRESETS):
+            for index in range(3):
+                text = jtr_corpus.generate_jtr(index, jtr_corpus.PRESETS[preset], seed=5)
+                runner = parse_commands(text)
+                self.assertEqual(runner.count(), jtr_corpus.read_expected_commands(text), preset)
+                self.assertTrue(runner.test_id.startswith("api/"))
+
+    def test_shapes_of_the_generated_commands(self):
+        options = jtr_corpus.CorpusOptions(chain=5, out1_lines=50, env_vars=40, rerun_sections=2, rerun_args=3)
+        runner = parse_commands(jtr_corpus.generate_jtr(7, options))
+        names = [cmd.get_command_name() for cmd in runner]
+        self.assertEqual(names, ["javac", "javac", "c2abc", "ark_aot", "ark", "ark_aot", "ark", "ark_aot"])
+
+        javac = runner.commands[0]
+        self.assertEqual(set(javac.env_vars), {"HOME", "LANG", "PATH"})
+        self.assertTrue(javac.directory.endswith("/scratch/compile0"))
+        self.assertTrue(javac.command.endswith("Tests.java"))
+        self.assertEqual(len(runner.commands[-1].env_vars), 40)
+
+    def test_generation_is_deterministic(self):
+        options = jtr_corpus.PRESETS['small']
+        self.assertEqual(jtr_corpus.generate_jtr(3, options, seed=1), jtr_corpus.generate_jtr(3, options, seed=1))
+        self.assertNotEqual(jtr_corpus.generate_jtr(3, options, seed=1), jtr_corpus.generate_jtr(3, options, seed=2))
+
+    def test_write_corpus_buckets_files(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            totals = jtr_corpus.write_corpus(tmp, 5, preset='mixed')
+            self.assertEqual(totals['files'], 5)
+            self.assertEqual(sorted(os.listdir(tmp)), ["000"])
+            self.assertEqual(len(os.listdir(os.path.join(tmp, "000"))), 5)
+            self.assertEqual(jtr_corpus.corpus_path(tmp, 1234), os.path.join(tmp, "001", "index_synth001234.jtr"))
+
+            texts = list(jtr_bench.corpus_texts(tmp, 10, 'small', 0))
+            self.assertEqual(sum(jtr_corpus.read_expected_commands(t) for t in texts), totals['commands'])
+
+
+class BenchTests(unittest.TestCase):
+    def test_small_run_reports_every_metric(self):
+        results = jtr_bench.run_benchmarks(files=6, preset='mixed', memory_files=3, spawn_count=3)
+        metrics = results['metrics']
+        for name in jtr_bench.METRICS:
+            self.assertGreater(metrics[name], 0, name)
+        self.assertEqual(metrics['parse.files'], 6)
+        self.assertEqual(metrics['filter.matches.no_such_tool'], 0)
+        self.assertEqual(metrics['spawn.failed'], 0)
+
+    def test_compare_results_flags_regressions_in_both_directions(self):
+        baseline = {'metrics': {'parse.files_per_s': 100.0, 'filter.ms_per_call': 10.0,
+                                'memory.bytes_per_command': 1000.0}}
+        current = {'metrics': {'parse.files_per_s': 70.0, 'filter.ms_per_call': 11.0,
+                               'memory.bytes_per_command': 1500.0}}
+        rows = {row[0]: row for row in jtr_bench.compare_results(current, baseline, threshold=0.25)}
+        self.assertEqual(set(rows), {'parse.files_per_s', 'filter.ms_per_call', 'memory.bytes_per_command'})
+        self.assertTrue(rows['parse.files_per_s'][4])
+        self.assertFalse(rows['filter.ms_per_call'][4])
+        self.assertTrue(rows['memory.bytes_per_command'][4])
+        self.assertAlmostEqual(rows['filter.ms_per_call'][3], -0.1)
+
+
+if __name__ == "__main__":
+    unittest.main()
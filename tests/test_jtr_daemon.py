@@ -0,0 +1,130 @@
+import os
+import stat
+import tempfile
+import threading
+import unittest
+
+from jtr_client import DaemonError, request
+from jtr_daemon import JtrCorpus, ReplayServer, ReplayService
+
+
+STUB = """#!/bin/sh
+case "$*" in
+    *--bad*) exit 3 ;;
+esac
+exit 0
+"""
+
+JTR = """test=api/Stub\\#{name}
+#section:compile
+Command is: {stub} --compile {name}.abc
+#section:run
+Command is: {stub} --run {name}.abc --bad
+"""
+
+
+class JtrDaemonTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.work = os.path.join(self._tmp.name, "work")
+        os.makedirs(self.work)
+        self.stub = os.path.join(self._tmp.name, "stub")
+        with open(self.stub, "w") as f:
+            f.write(STUB)
+        os.chmod(self.stub, os.stat(self.stub).st_mode | stat.S_IXUSR)
+        self.write_jtr("one")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def write_jtr(self, name: str) -> str:
+        path = os.path.join(self.work, f"{name}.jtr")
+        with open(path, "w") as f:
+            f.write(JTR.format(name=name, stub=self.stub))
+        return path
+
+    def test_corpus_scan_is_incremental(self):
+        corpus = JtrCorpus()
+        self.assertEqual(len(corpus.scan(self.work)[0]), 1)
+        self.assertEqual(corpus.scan(self.work), ([], []))
+        two = self.write_jtr("two")
+        self.assertEqual(corpus.scan(self.work), ([two], []))
+        self.assertEqual(corpus.count(), (2, 4))
+        self.assertEqual([i for _, i, _ in corpus.find_by_name("stub")], [0, 1, 0, 1])
+        os.remove(two)
+        self.assertEqual(corpus.scan(self.work), ([], [two]))
+        self.assertEqual(corpus.command_names(), {'stub': 2})
+
+        # A changed file replaces its entries in the name index
+        one = os.path.join(self.work, "one.jtr")
+        with open(one, "w") as f:
+            f.write("test=api/Stub\\#one\n#section:run\nCommand is: /bin/echo run\n")
+        corpus.ingest(one)
+        self.assertEqual(corpus.command_names(), {'echo': 1})
+        self.assertEqual(corpus.find_by_name("stub"), [])
+        self.assertEqual([r.test_id for _, r in corpus.select(["*#one"])], ["api/Stub#one"])
+
+    def test_scan_skips_files_that_vanish_or_fail(self):
+        corpus = JtrCorpus()
+        one = os.path.join(self.work, "one.jtr")
+        two = self.write_jtr("two")
+        ingest = corpus.ingest
+
+        def flaky_ingest(path):
+            if path == one:
+                raise FileNotFoundError(path)
+            if path == two:
+                raise UnicodeError("broken")
+            return ingest(path)
+
+        corpus.ingest = flaky_ingest
+        messages = []
+        self.assertEqual(corpus.scan(self.work, messages.append), ([], []))
+        self.assertEqual(corpus.count(), (0, 0))
+        self.assertEqual(messages, [f"Cannot parse {two}: broken"])
+        # The failed file is not retried until it changes
+        self.assertEqual(corpus.scan(self.work, messages.append), ([], []))
+        self.assertEqual(len(messages), 1)
+
+        corpus.ingest = ingest
+        self.assertEqual(corpus.scan(self.work), ([one], []))
+        self.write_jtr("two")
+        os.utime(two, (0, 0))
+        self.assertEqual(corpus.scan(self.work), ([two], []))
+        self.assertEqual(corpus.count(), (2, 4))
+
+    def test_requests_over_socket(self):
+        corpus = JtrCorpus()
+        corpus.scan(self.work)
+        socket_path = os.path.join(self._tmp.name, "daemon.sock")
+        server = ReplayServer(socket_path, ReplayService(corpus))
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            self.assertEqual(stat.S_IMODE(os.stat(socket_path).st_mode), 0o600)
+            status = request(socket_path, {'op': 'status'})
+            self.assertEqual((status['tests'], status['command_names']), (1, {'stub': 2}))
+            rows = request(socket_path, {'op': 'query', 'section': 'run'})
+            self.assertEqual([(r['test'], r['index']) for r in rows], [("api/Stub#one", 1)])
+
+            events = []
+            result = request(socket_path, {'op': 'run', 'tests': ['*#one']}, events.append)
+            self.assertEqual(result, {'total': 2, 'failed': 1})
+            self.assertEqual([e['return_code'] for e in events], [0, 3])
+
+            result = request(socket_path, {'op': 'run', 'specs': ['stub ^--bad']})
+            self.assertEqual(result, {'total': 2, 'failed': 0})
+
+            self.write_jtr("two")
+            loaded = request(socket_path, {'op': 'load', 'paths': [self.work]})
+            self.assertEqual(len(loaded['loaded']), 1)
+
+            with self.assertRaises(DaemonError):
+                request(socket_path, {'op': 'bogus'})
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,17 @@
+import os
+import tempfile
 import unittest
 
-from parse_jtr import Command, build_commands_from_command_line
+from parse_jtr import (
+    Command,
+    CpuAffinityPlan,
+    ExecutionOptions,
+    build_commands_from_command_line,
+    format_cpu_list,
+    parse_cpu_list,
+    parse_ionice,
+    run_commands,
+)
 
 
 class CommandNameTests(unittest.TestCase):
@@ -72,5 +83,64 @@ class CommandSplitTests(unittest.TestCase):
         self.assertEqual(commands[1].get_command_name(), "cmd2")
 
 
+class CpuAffinityTests(unittest.TestCase):
+    def test_parse_cpu_list(self):
+        self.assertEqual(parse_cpu_list("0-3,8,10-11"), [0, 1, 2, 3, 8, 10, 11])
+        self.assertEqual(parse_cpu_list("0x3F0"), [4, 5, 6, 7, 8, 9])
+        self.assertEqual(format_cpu_list([0, 1, 2, 3, 8, 10, 11]), "0-3,8,10-11")
+        with self.assertRaises(ValueError):
+            parse_cpu_list("3-1")
+
+    def test_parse_ionice(self):
+        self.assertEqual(parse_ionice("idle"), (3, None))
+        self.assertEqual(parse_ionice("2:7"), (2, 7))
+        with self.assertRaises(ValueError):
+            parse_ionice("2:9")
+
+    def test_plan_splits_workers_and_reserves_measurement_cores(self):
+        plan = CpuAffinityPlan(list(range(10)), workers=3, reserved=2)
+        self.assertEqual(plan.measurement_cpus, [8, 9])
+        self.assertEqual(plan.worker_cpus, [[0, 1, 2], [3, 4, 5], [6, 7]])
+
+    def test_plan_requires_a_worker_core(self):
+        with self.assertRaises(ValueError):
+            CpuAffinityPlan([0, 1], workers=1, reserved=2)
+
+    def test_execution_records_cpus(self):
+        cpu = min(os.sched_getaffinity(0))
+        plan = CpuAffinityPlan([cpu], workers=2)
+        options = ExecutionOptions(timeout=10, jobs=2, affinity=plan, nice=1)
+        commands = [Command(section=str(i), command="grep Cpus_allowed_list /proc/self/status")
+                    for i in range(3)]
+        results = run_commands(commands, options)
+        self.assertEqual([cmd.section for cmd, _, _, _ in results], ["0", "1", "2"])
+        for cmd, rc, stdout, _ in results:
+            self.assertEqual(rc, 0)
+            self.assertEqual(stdout.split()[-1], str(cpu))
+            self.assertEqual(cmd.get_last_run_info()["cpus"], [cpu])
+            self.assertEqual(cmd.get_last_run_info()["nice"], 1)
+
+    def test_measurement_runs_alone_without_reserved_cpus(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            busy = "touch {0}/run.{1}; sleep {2}; rm {0}/run.{1}"
+            commands = [Command(section="a", command=busy.format(tmp, 1, 0.1)),
+                        Command(section="b", command=busy.format(tmp, 2, 0.5)),
+                        Command(section="m", command=f"ls {tmp}"),
+                        Command(section="c", command=busy.format(tmp, 3, 0.1))]
+            results = run_commands(commands, ExecutionOptions(timeout=10, jobs=2, measure_pattern="ls"))
+            self.assertEqual([rc for _, rc, _, _ in results], [0, 0, 0, 0])
+            self.assertEqual(results[2][2], "")
+
+    def test_nice_and_affinity_apply_to_shell_command_lines(self):
+        cpu = min(os.sched_getaffinity(0))
+        cmd = Command(section="s", command="echo start; nice; grep Cpus_allowed_list /proc/self/status")
+        rc, stdout, _ = cmd.execute(timeout=10, cpus=[cpu], nice=3)
+        self.assertEqual(rc, 0)
+        lines = stdout.split("\n")
+        self.assertEqual(lines[0], "start")
+        self.assertEqual(int(lines[1]), min(os.nice(0) + 3, 19))
+        self.assertEqual(lines[2].split()[-1], str(cpu))
+
+
 if __name__ == "__main__":
     unittest.main()
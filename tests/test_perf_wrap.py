@@ -0,0 +1,58 @@
+import os
+import unittest
+
+from jtr_commands import Command, ExecutionOptions, _prefix_command_line
+from perf_wrap import build_perf_args, parse_perf_stat_csv
+
+
+PERF_STAT_OUTPUT = """# started on Thu Nov 13 12:00:05 2025
+
+12.50,msec,task-clock,12500000,100.00,0.950,CPUs utilized
+3,,context-switches,12500000,100.00,240.000,/sec
+40000000,,cycles,12500000,100.00,3.200,GHz
+60000000,,instructions,12500000,100.00,1.50,insn per cycle
+<not supported>,,cache-misses,0,100.00,,
+"""
+
+
+class PerfStatParseTests(unittest.TestCase):
+    def test_counters_and_ipc(self):
+        counters = parse_perf_stat_csv(PERF_STAT_OUTPUT)
+        self.assertEqual(counters["task-clock"], 12.5)
+        self.assertEqual(counters["cycles"], 40000000)
+        self.assertAlmostEqual(counters["IPC"], 1.5)
+        self.assertNotIn("cache-misses", counters)
+
+    def test_modifiers_are_matched_for_derived_metrics(self):
+        counters = parse_perf_stat_csv("100,,cycles:u,1,100.00,,\n250,,instructions:u,1,100.00,,\n")
+        self.assertAlmostEqual(counters["IPC"], 2.5)
+
+
+class PerfWrapTests(unittest.TestCase):
+    def test_wrapper_goes_after_env_assignments(self):
+        prefix = build_perf_args("stat", "/tmp/out.csv")
+        wrapped = _prefix_command_line("LD_LIBRARY_PATH=/a:/b /bin/ark --gc-type=g1-gc x.abc", prefix)
+        self.assertEqual(
+            wrapped,
+            "LD_LIBRARY_PATH=/a:/b perf stat -x , -o /tmp/out.csv -- /bin/ark --gc-type=g1-gc x.abc"
+        )
+
+    def test_shell_constructs_are_wrapped_in_sh(self):
+        wrapped = _prefix_command_line("/bin/ark a; echo $?", ["ionice", "-c", "3"])
+        self.assertEqual(wrapped, "ionice -c 3 /bin/sh -c '/bin/ark a; echo $?'")
+
+    def test_output_names_include_the_run_tag(self):
+        cmd = Command(section="s", command="/bin/ark --x")
+        options = ExecutionOptions(perf_mode="stat", perf_dir="perf")
+        self.assertEqual(options.perf_output(3, cmd), os.path.join("perf", "00003_ark.perf.csv"))
+        options.run_tag = "variant01"
+        self.assertEqual(options.perf_output(3, cmd), os.path.join("perf", "variant01_00003_ark.perf.csv"))
+        self.assertIsNone(ExecutionOptions(perf_mode="stat", perf_pattern="ark_aot").perf_output(3, cmd))
+
+    def test_unknown_mode_is_rejected(self):
+        with self.assertRaises(ValueError):
+            build_perf_args("trace", "/tmp/out")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import os
+import sys
+import subprocess
+import tempfile
+import threading
+import time
+import unittest
+
+from parse_jtr import Command, ExecutionOptions
+from proc_monitor import COLUMNS, ProcessTreeSampler, find_memory_spikes, list_process_tree
+
+
+class MemorySpikeTests(unittest.TestCase):
+    def test_flat_series_has_no_spikes(self):
+        times = [0.1 * i for i in range(10)]
+        self.assertEqual(find_memory_spikes(times, [100_000] * 10), [])
+
+    def test_consecutive_samples_merge_into_one_spike(self):
+        times = [0.0, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6]
+        rss = [100_000, 100_000, 400_000, 500_000, 100_000, 100_000, 100_000]
+        spikes = find_memory_spikes(times, rss)
+        self.assertEqual(len(spikes), 1)
+        self.assertEqual(spikes[0]['start_s'], 0.2)
+        self.assertEqual(spikes[0]['peak_rss_kb'], 500_000)
+
+
+class SamplerTests(unittest.TestCase):
+    def test_process_tree_includes_self(self):
+        self.assertIn(os.getpid(), list_process_tree(os.getpid()))
+
+    def test_execute_with_monitor_writes_series(self):
+        script = "import time; data = bytearray(64 * 1024 * 1024); time.sleep(0.3)"
+        cmd = Command(section="s", command=f"{sys.executable} -c '{script}'")
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "run.csv")
+            rc, _, _ = cmd.execute(timeout=10, monitor_interval=0.02, monitor_path=path)
+            self.assertEqual(rc, 0)
+            with open(path) as f:
+                lines = f.read().splitlines()
+
+        self.assertEqual(lines[0], ",".join(COLUMNS))
+        self.assertGreater(len(lines), 3)
+        summary = cmd.get_last_run_info()['monitor']
+        self.assertGreater(summary['peak_rss_kb'], 60 * 1024)
+        self.assertEqual(summary['csv'], path)
+
+    def test_parallel_samplers_share_one_thread(self):
+        processes = [subprocess.Popen([sys.executable, "-c", "import time; time.sleep(0.5)"]) for _ in range(3)]
+        samplers = [ProcessTreeSampler(p.pid, interval=0.02) for p in processes]
+        try:
+            for sampler in samplers:
+                sampler.start()
+            time.sleep(0.2)
+            monitors = [t for t in threading.enumerate() if t.name == "proc-monitor"]
+            self.assertEqual(len(monitors), 1)
+        finally:
+            for sampler in samplers:
+                sampler.stop()
+            for p in processes:
+                p.wait()
+        for sampler in samplers:
+            self.assertGreater(len(sampler.series['time_s']), 2)
+            self.assertGreaterEqual(sampler.summary()['peak_processes'], 1)
+        monitors[0].join(timeout=2)
+        self.assertFalse(monitors[0].is_alive())
+
+    def test_run_tag_keeps_variant_outputs_apart(self):
+        cmd = Command(section="s", command="/bin/ark --x")
+        options = ExecutionOptions(monitor_dir="mon")
+        self.assertEqual(options.monitor_path(1, cmd), os.path.join("mon", "00001_ark.csv"))
+        options.run_tag = "variant02"
+        self.assertEqual(options.monitor_path(1, cmd), os.path.join("mon", "variant02_00001_ark.csv"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import io
+import unittest
+
+from parse_jtr import Command
+from progress import ProgressDisplay, format_duration
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeTerminal(io.StringIO):
+    def isatty(self):
+        return True
+
+
+class ProgressTests(unittest.TestCase):
+    def setUp(self):
+        self.commands = [Command("s", "ark a"), Command("s", "ark b"), Command("s", "ark_aot c"),
+                         Command("s", "ark d", test_id="api/T#d")]
+        self.clock = FakeClock()
+
+    def test_counts_rate_eta_and_longest(self):
+        display = ProgressDisplay(self.commands, jobs=2, stream=io.StringIO(), clock=self.clock)
+        display.start(1, self.commands[0])
+        display.start(2, self.commands[2])
+        self.clock.now = 30.0
+        display.complete(1, self.commands[0], 0)
+        display.start(3, self.commands[1])
+        self.clock.now = 60.0
+
+        snap = display.snapshot()
+        self.assertEqual((snap['done'], snap['passed'], snap['running'], snap['queued']), (1, 1, 2, 1))
+        self.assertEqual(snap['per_minute'], 1.0)
+        # Queued 'ark' 30s + running 'ark' 30-30=0 + running 'ark_aot' (mean of all: 30s) 30-60<0 -> 30s on 2 workers
+        self.assertEqual(snap['eta'], 15.0)
+        self.assertEqual([(age, name) for age, name, _ in snap['longest']], [(60.0, "ark_aot"), (30.0, "ark")])
+
+        display.draw()
+        self.assertTrue(display.stream.getvalue().startswith("[progress] 1/4 done  ✓ 1  ✗ 0  running 2  queued 1"))
+
+    def test_terminal_redraws_in_place(self):
+        stream = FakeTerminal()
+        display = ProgressDisplay(self.commands, stream=stream, clock=self.clock)
+        display.start(1, self.commands[3])
+        display.draw()
+        first = stream.getvalue()
+        self.assertIn("api/T#d", first)
+        self.assertNotIn("\x1b[", first)
+        display.draw()
+        self.assertEqual(stream.getvalue(), first)
+        display.log("✗ 1. ark (s): code 1")
+        self.assertIn(f"\x1b[{first.count(chr(10))}F\x1b[J✗ 1. ark (s): code 1\n", stream.getvalue())
+
+    def test_format_duration(self):
+        self.assertEqual([format_duration(v) for v in (None, 5, 125, 3725)], ["--", "5s", "2m05s", "1h02m"])
+
+
+if __name__ == '__main__':
+    unittest.main()
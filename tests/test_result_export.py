@@ -0,0 +1,66 @@
+import json
+import os
+import tempfile
+import unittest
+import xml.etree.ElementTree as ET
+
+from parse_jtr import Command, ExecutionOptions, run_commands
+from result_export import JsonLinesExporter, JUnitXmlExporter, tail_lines
+
+
+class ResultExportTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.junit = os.path.join(self._tmp.name, "results.xml")
+        self.jsonl = os.path.join(self._tmp.name, "results.jsonl")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_tail_lines(self):
+        self.assertEqual(tail_lines("a\nb\nc\n", 2), "b\nc")
+        self.assertEqual(tail_lines("a\nb", 5), "a\nb")
+        self.assertEqual(tail_lines("a\nb", 0), "")
+
+    def test_streamed_exports_stay_valid(self):
+        commands = [
+            Command("compile", "echo built", test_id="api/X#a"),
+            Command("run", "printf 'l1\\nl2\\nl3\\n' >&2; exit 4", test_id="api/X#a"),
+        ]
+        exporters = [JUnitXmlExporter(self.junit, tail=2), JsonLinesExporter(self.jsonl, tail=2)]
+        snapshots = []
+
+        def on_complete(i, result):
+            cmd, return_code, stdout, stderr = result
+            for exporter in exporters:
+                exporter.add(i, cmd, return_code, stdout, stderr)
+            # A run interrupted here must leave a parseable document
+            snapshots.append(ET.parse(self.junit).getroot())
+
+        results = run_commands(commands, ExecutionOptions(), on_complete=on_complete, keep_output=False)
+        self.assertEqual([(rc, out, err) for _, rc, out, err in results], [(0, "", ""), (4, "", "")])
+
+        self.assertEqual(snapshots[0].find('testsuite').get('tests'), "0000000001")
+        suite = ET.parse(self.junit).getroot().find('testsuite')
+        self.assertEqual((int(suite.get('tests')), int(suite.get('failures'))), (2, 1))
+        cases = suite.findall('testcase')
+        self.assertEqual([c.get('name') for c in cases], ["1. compile: echo", "2. run: printf"])
+        self.assertEqual(cases[1].find('failure').get('message'), "exit code 4")
+        self.assertIsNone(cases[1].find('failure').text)
+        self.assertEqual(cases[1].find('system-err').text, "l2\nl3")
+
+        for exporter in exporters:
+            exporter.close()
+        with open(self.jsonl) as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual([(r['test'], r['section'], r['exit_code']) for r in records],
+                         [("api/X#a", "compile", 0), ("api/X#a", "run", 4)])
+        self.assertEqual(records[1]['stderr_tail'], "l2\nl3")
+        self.assertIn("exit 4", records[1]['command'])
+        # Start times are taken when each command starts; no affinity plan, so no cpus
+        self.assertLessEqual(records[0]['start'] + records[0]['duration'], records[1]['start'] + 0.01)
+        self.assertNotIn('cpus', records[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import json
+import os
+import stat
+import tempfile
+import unittest
+
+from stdlib_aot import RUNTIME_OPTIONS, StdlibAotCache, benchmark_startup, startup_command
+
+
+# Writes its --boot-panda-files input to --paoc-output and counts invocations
+FAKE_ARK_AOT = '''#!/bin/sh
+for a in "$@"; do case $a in --paoc-output=*) out=${a#--paoc-output=};; --boot-panda-files=*) abc=${a#*=};; esac; done
+echo x >> "$(dirname "$0")/compiles"
+cp "$abc" "$out"
+'''
+
+
+class StdlibAotTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        root = self._tmp.name
+        os.makedirs(os.path.join(root, "bin"))
+        self.ark_aot = os.path.join(root, "bin", "ark_aot")
+        self.abc = os.path.join(root, "etsstdlib.abc")
+        self.write(self.ark_aot, FAKE_ARK_AOT)
+        os.chmod(self.ark_aot, os.stat(self.ark_aot).st_mode | stat.S_IXUSR)
+        self.write(self.abc, "stdlib v1")
+        self.cache = StdlibAotCache(os.path.join(root, "cache"), keep=2)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def write(self, path: str, text: str):
+        with open(path, "w") as f:
+            f.write(text)
+
+    def compiles(self) -> int:
+        with open(os.path.join(self._tmp.name, "bin", "compiles")) as f:
+            return len(f.readlines())
+
+    def get(self, options=None):
+        return self.cache.get(self.abc, self.ark_aot, options, log=lambda msg: None)
+
+    def test_cache_key_covers_stdlib_compiler_and_options(self):
+        first = self.get()
+        self.assertEqual(self.get(), first)
+        self.assertEqual(self.compiles(), 1)
+        with open(first) as f:
+            self.assertEqual(f.read(), "stdlib v1")
+
+        self.assertNotEqual(self.get(["--compiler-check-final=false"]), first)
+        self.write(self.abc, "stdlib v2")
+        self.assertNotEqual(self.get(), first)
+        self.assertEqual(self.compiles(), 3)
+        # keep=2: the least recently used image was pruned
+        self.assertEqual(len(self.cache.entries()), 2)
+        self.assertFalse(os.path.exists(first))
+
+    def test_aot_files_and_startup_benchmark(self):
+        command = startup_command("ark", "std.abc", "t.abc", "T.ETSGLOBAL::main", ["std.an", "t.an"])
+        self.assertIn("--aot-files=std.an:t.an", command)
+        # The image is compiled for the GC the runtime uses, or ark would not load it
+        self.assertIn("--gc-type=g1-gc", command)
+        with open(os.path.join(os.path.dirname(self.get()), "meta.json")) as f:
+            self.assertEqual(json.load(f)['options'][:len(RUNTIME_OPTIONS)], RUNTIME_OPTIONS)
+
+        stats = benchmark_startup({'a': ["true"], 'b': ["true"]}, runs=3, warmup=1)
+        self.assertEqual(sorted(stats), ['a', 'b'])
+        self.assertEqual(stats['a']['runs'], 3)
+        with self.assertRaises(RuntimeError):
+            benchmark_startup({'bad': ["false"]}, runs=1, warmup=0)
+
+
+if __name__ == '__main__':
+    unittest.main()